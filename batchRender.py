@@ -0,0 +1,252 @@
+# batchRender.py
+# 功能：无界面的批量地图渲染入口，使用离屏 Qt 平台按任务列表渲染地图并导出为 PNG/JPEG/PDF，多个任务在工作进程中并行执行
+
+import os
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')  # 必须在创建 QApplication 之前设置
+
+import sys
+import json
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import Qt
+
+IMAGE_FORMATS = {'png': b"PNG", 'jpg': b"JPEG", 'jpeg': b"JPEG", 'pdf': None, 'svg': None, 'tif': None,
+                 'tiff': None}  # 支持的输出格式
+TILED_FORMATS = ('png', 'tif', 'tiff')  # 分块流式写出的格式，不受 QImage 尺寸限制
+VECTOR_FORMATS = ('pdf', 'svg')  # 直接写出矢量几何的格式
+MAX_VIEW_SIZE = 4096  # 离屏视图的最大边长
+DEFAULT_SIZE = (1920, 1080)  # 默认输出尺寸（像素）
+
+_app = None  # 每个进程一个 QApplication
+_widget = None  # 每个进程复用一个地图小部件
+_loaded = {'shapefile': None, 'nodes': None}  # 当前小部件中已加载的文件，相同文件的任务不再重复读取
+_transform_threads = None  # 每个进程内投影转换使用的线程数，None 表示 CPU 核数
+
+
+def get_app() -> QApplication:
+    """
+    获取（必要时创建）当前进程的 QApplication
+    """
+    global _app
+    _app = QApplication.instance() or QApplication(['batchRender'])
+    return _app
+
+
+def get_widget():
+    """
+    获取当前进程的离屏地图小部件，绘制样式与界面中的 MapWidget 完全相同
+    """
+    global _widget
+    if _widget is None:
+        get_app()
+        from ui.mapWidget import MapWidget
+        _widget = MapWidget(None)
+        _widget.setAttribute(Qt.WA_DontShowOnScreen)  # 不在屏幕上显示
+        _widget.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        _widget.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        _widget.show()  # 显示后视口尺寸才会生效
+    return _widget
+
+
+def normalize_job(job: dict) -> dict:
+    """
+    检查任务并补全默认值
+    参数:
+        job (dict): 任务，必须包含 shapefile 和 output，可选 nodes、projection、width、height、format、
+                    x_column、y_column，以及 dpi 和 PNG/GeoTIFF 使用的 world_file
+    返回:
+        dict: 补全后的任务
+    """
+    if not job.get('shapefile') or not job.get('output'):
+        raise ValueError(f"Job must specify 'shapefile' and 'output': {job}")
+    job = dict(job)
+    image_format = (job.get('format') or os.path.splitext(job['output'])[1].lstrip('.') or 'png').lower()
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported output format: {image_format}")
+    job['format'] = image_format
+    job['width'] = int(job.get('width') or DEFAULT_SIZE[0])
+    job['height'] = int(job.get('height') or DEFAULT_SIZE[1])
+    job.setdefault('x_column', 'Longitude')
+    job.setdefault('y_column', 'Latitude')
+    return job
+
+
+def render_job(job: dict) -> str:
+    """
+    渲染单个任务并写出文件（在工作进程中执行）
+    参数:
+        job (dict): 任务，见 normalize_job
+    返回:
+        str: 输出文件路径
+    """
+    job = normalize_job(job)
+    widget = get_widget()
+    # 视图尺寸即输出尺寸（JPEG 按视图比例渲染），分块和矢量导出时细节层级另按输出分辨率选择
+    widget.resize(min(job['width'], MAX_VIEW_SIZE), min(job['height'], MAX_VIEW_SIZE))
+    get_app().processEvents()
+
+    map_data, node_data = widget.map_data, widget.node_data
+    map_data.transform_workers = node_data.transform_workers = _transform_threads
+    if _loaded['shapefile'] != job['shapefile']:
+        map_data.load_shapefile(job['shapefile'])
+        _loaded['shapefile'], _loaded['nodes'] = job['shapefile'], None
+    nodes = job.get('nodes')
+    if _loaded['nodes'] != nodes:
+        if widget.node_layer is not None:
+            widget.scene.removeItem(widget.node_layer)  # 移除上一个任务的节点
+            widget.node_layer = None
+        node_data.clear_nodes()
+        if nodes:
+            node_data.import_nodes(nodes, job['x_column'], job['y_column'])
+        _loaded['nodes'] = nodes
+
+    # 直接设置投影（界面中的 change_projection 出错时会弹出对话框）
+    projection = job.get('projection') or map_data.crs
+    map_data.change_projection(projection.split(' - ')[0])
+    node_data.set_projection(map_data.crs, map_data.proj_string)
+    node_data.get_transformed_nodes()  # 先在这里投影节点，出错时直接抛出而不是弹出对话框
+    widget.update_pen_width()
+    widget.draw_map()
+    widget.draw_nodes()
+
+    output = job['output']
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    dpi = float(job.get('dpi') or 96)
+    if job['format'] in VECTOR_FORMATS:
+        # 页面尺寸为输出像素尺寸在指定分辨率下的物理尺寸
+        widget.export_vector(output, job['width'] / dpi * 25.4, job['height'] / dpi * 25.4, dpi,
+                             file_format=job['format'])
+    elif job['format'] in TILED_FORMATS:
+        widget.export_tiled(output, job['width'], job['height'], dpi=dpi, world_file=bool(job.get('world_file')),
+                            file_format=job['format'])
+    else:
+        widget.save_image(output, IMAGE_FORMATS[job['format']], job['width'], job['height'])
+    logging.info(f"Rendered {job['shapefile']} ({map_data.proj_string}) to {output}")
+    return output
+
+
+def init_worker(log_level: int, transform_threads: int = None) -> None:
+    """
+    工作进程初始化：配置日志、设置投影转换线程数并创建离屏 QApplication
+    """
+    global _transform_threads
+    logging.basicConfig(level=log_level, format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s')
+    _transform_threads = transform_threads
+    get_app()
+
+
+def run_jobs(jobs: list, workers: int = None, log_level: int = logging.INFO, threads: int = None) -> list:
+    """
+    批量执行渲染任务，workers 大于 1 时在多个工作进程中并行执行
+    参数:
+        jobs (list): 任务列表
+        workers (int): 工作进程数，默认为 CPU 核数
+        log_level (int): 工作进程的日志级别
+        threads (int): 每个进程中投影转换的线程数，默认把 CPU 核数平均分给各进程
+    返回:
+        list: 每个任务的结果 (任务, 错误信息)，成功时错误信息为 None，顺序与任务列表相同
+    """
+    global _transform_threads
+    jobs = [normalize_job(job) for job in jobs]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    results = [None] * len(jobs)
+    if workers == 1:
+        _transform_threads = threads
+        for position, job in enumerate(jobs):
+            try:
+                render_job(job)
+                results[position] = (job, None)
+            except Exception as e:
+                logging.error(f"Failed to render {job['output']}: {e}")
+                results[position] = (job, str(e))
+        return results
+
+    # 相同 Shapefile 的任务交给同一批次，工作进程可以复用已加载的数据
+    order = sorted(range(len(jobs)), key=lambda position: jobs[position]['shapefile'])
+    context = multiprocessing.get_context('spawn')  # Qt 不能在 fork 出的子进程中安全使用
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=init_worker, initargs=(log_level, threads)) as executor:
+        futures = {executor.submit(render_job, jobs[position]): position for position in order}
+        for future in as_completed(futures):
+            position = futures[future]
+            try:
+                future.result()
+                results[position] = (jobs[position], None)
+            except Exception as e:
+                logging.error(f"Failed to render {jobs[position]['output']}: {e}")
+                results[position] = (jobs[position], str(e))
+    return results
+
+
+def load_jobs(path: str) -> list:
+    """
+    读取任务列表文件（JSON 数组，或每行一个 JSON 对象）
+    参数:
+        path (str): 任务文件路径
+    返回:
+        list: 任务列表
+    """
+    with open(path, encoding='utf-8') as f:
+        text = f.read().strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def parse_size(text: str) -> tuple:
+    try:
+        width, height = (int(value) for value in text.lower().split('x'))
+        return width, height
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid size '{text}', expected WIDTHxHEIGHT")
+
+
+def main(argv: list = None) -> int:
+    """
+    命令行入口
+    返回:
+        int: 退出码，有任务失败时为 1
+    """
+    parser = argparse.ArgumentParser(description="Render maps without the GUI.")
+    parser.add_argument('shapefile', nargs='?', help="Shapefile to render")
+    parser.add_argument('-o', '--output', help="Output file (.png, .jpg, .tif, .pdf or .svg)")
+    parser.add_argument('-n', '--nodes', help="Optional node file (CSV, Parquet/Arrow or Excel)")
+    parser.add_argument('-p', '--projection', help="Target projection, e.g. EPSG:3857")
+    parser.add_argument('-s', '--size', type=parse_size, default=DEFAULT_SIZE, help="Output size WIDTHxHEIGHT")
+    parser.add_argument('-f', '--format', choices=sorted(IMAGE_FORMATS), help="Output format (default: from extension)")
+    parser.add_argument('--dpi', type=float, default=96, help="Output resolution (PNG/GeoTIFF metadata, PDF/SVG page size)")
+    parser.add_argument('--world-file', action='store_true', help="Also write a world file (.pgw/.tfw)")
+    parser.add_argument('-j', '--jobs', help="JSON job list; each job has the keys above plus width/height")
+    parser.add_argument('-w', '--workers', type=int, help="Number of worker processes (default: CPU count)")
+    parser.add_argument('-t', '--threads', type=int,
+                        help="Projection threads per worker process (default: CPU count / workers)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Only log warnings and errors")
+    args = parser.parse_args(argv)
+
+    log_level = logging.WARNING if args.quiet else logging.INFO
+    logging.basicConfig(level=log_level, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.jobs:
+        jobs = load_jobs(args.jobs)
+    elif args.shapefile and args.output:
+        jobs = [{'shapefile': args.shapefile, 'output': args.output, 'nodes': args.nodes,
+                 'projection': args.projection, 'width': args.size[0], 'height': args.size[1],
+                 'format': args.format, 'dpi': args.dpi, 'world_file': args.world_file}]
+    else:
+        parser.error("either --jobs or a shapefile with --output is required")
+
+    results = run_jobs(jobs, args.workers, log_level, args.threads)
+    failed = [(job, error) for job, error in results if error]
+    logging.info(f"Rendered {len(results) - len(failed)} of {len(results)} maps.")
+    for job, error in failed:
+        print(f"FAILED {job['output']}: {error}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
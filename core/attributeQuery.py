@@ -0,0 +1,350 @@
+# core/attributeQuery.py
+# 功能：提供基于列和索引的属性查询引擎，支持 = != < > <= >= BETWEEN IN LIKE 以及 AND/OR/NOT 组合，结果为要素掩码
+#       空值按 SQL 的三值逻辑处理：与空值的比较结果未知，不匹配任何条件（包括 != 和 NOT）
+
+import re
+import numpy as np
+
+
+class QuerySyntaxError(ValueError):
+    """
+    查询表达式语法错误
+    """
+    pass
+
+
+def to_column(values: list) -> np.ndarray:
+    """
+    把一个字段的取值转换为类型化的列：全部为数值（或空值）时为 float64，否则为字符串
+    参数:
+        values (list): 字段取值
+    返回:
+        np.ndarray: float64 或 Unicode 字符串数组
+    """
+    if all(v is None or (isinstance(v, (int, float)) and not isinstance(v, bool)) for v in values):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.array(['' if v is None else str(v) for v in values], dtype=str)
+
+
+class AttributeIndex:
+    """
+    单个字段的列和按需构建的索引（哈希索引用于等值查询，排序索引用于范围查询）
+    """
+    def __init__(self, values: np.ndarray, null_mask: np.ndarray = None):
+        """
+        参数:
+            values (np.ndarray): 类型化的列
+            null_mask (np.ndarray): 空值掩码，None 表示没有空值（数值列中的 NaN 总是视为空值）
+        """
+        self.values = values  # 类型化的列
+        self.is_numeric = values.dtype.kind == 'f'  # 是否为数值列
+        not_null = np.ones(len(values), dtype=bool) if null_mask is None else ~np.asarray(null_mask, dtype=bool)
+        if self.is_numeric:
+            not_null &= ~np.isnan(values)
+        self.not_null = not_null  # 非空值的行
+        self._hash_index = None  # 取值 -> 行号数组
+        self._sorted_order = None  # 按取值排序后的行号
+        self._sorted_values = None  # 排序后的取值
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def hash_index(self) -> dict:
+        """
+        哈希索引：每个不同取值对应的行号数组（首次使用时构建）
+        """
+        if self._hash_index is None:
+            order = self.sorted_order
+            keys, starts = np.unique(self.sorted_values, return_index=True)
+            ends = np.append(starts[1:], len(order))
+            self._hash_index = {key: order[start:end] for key, start, end in
+                                zip(keys.tolist(), starts.tolist(), ends.tolist())}
+        return self._hash_index
+
+    @property
+    def sorted_order(self) -> np.ndarray:
+        """
+        排序索引：按取值稳定排序后的行号（首次使用时构建）
+        """
+        if self._sorted_order is None:
+            self.build_sorted_index()
+        return self._sorted_order
+
+    @property
+    def sorted_values(self) -> np.ndarray:
+        """
+        与排序索引对应的有序取值
+        """
+        if self._sorted_values is None:
+            self.build_sorted_index()
+        return self._sorted_values
+
+    def build_sorted_index(self) -> None:
+        self._sorted_order = np.argsort(self.values, kind='stable')
+        self._sorted_values = self.values[self._sorted_order]
+
+    def coerce(self, value):
+        """
+        把查询中的字面量转换为与列相同的类型，无法转换时返回 None
+        """
+        if self.is_numeric:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    def mask_from_rows(self, rows) -> np.ndarray:
+        mask = np.zeros(len(self.values), dtype=bool)
+        if rows is not None and len(rows):
+            mask[rows] = True
+        return mask
+
+    def equal(self, value) -> np.ndarray:
+        """
+        等值查询（哈希索引）
+        """
+        value = self.coerce(value)
+        return self.mask_from_rows(self.hash_index.get(value) if value is not None else None)
+
+    def isin(self, values: list) -> np.ndarray:
+        """
+        集合查询（哈希索引）
+        """
+        keys = {self.coerce(value) for value in values} - {None}
+        rows = [self.hash_index[key] for key in keys if key in self.hash_index]
+        return self.mask_from_rows(np.concatenate(rows) if rows else None)
+
+    def range(self, low=None, high=None, include_low: bool = True, include_high: bool = True) -> np.ndarray:
+        """
+        范围查询（排序索引），low 或 high 为 None 时表示不限
+        """
+        sorted_values = self.sorted_values
+        start, end = 0, len(sorted_values)
+        if self.is_numeric:
+            end = int(np.searchsorted(sorted_values, np.nan, side='left'))  # NaN 排在最后，不参与比较
+        if low is not None:
+            low = self.coerce(low)
+            if low is None:
+                return self.mask_from_rows(None)
+            start = int(np.searchsorted(sorted_values[:end], low, side='left' if include_low else 'right'))
+        if high is not None:
+            high = self.coerce(high)
+            if high is None:
+                return self.mask_from_rows(None)
+            end = int(np.searchsorted(sorted_values[:end], high, side='right' if include_high else 'left'))
+        return self.mask_from_rows(self.sorted_order[start:end] if end > start else None)
+
+    def like(self, pattern: str) -> np.ndarray:
+        """
+        模式匹配（% 匹配任意字符串，_ 匹配单个字符），只在不同取值上匹配一次
+        """
+        regex = re.compile(''.join('.*' if c == '%' else '.' if c == '_' else re.escape(c) for c in str(pattern)),
+                           re.IGNORECASE | re.DOTALL)
+        rows = [rows for key, rows in self.hash_index.items()
+                if regex.fullmatch(self.format_key(key))]
+        return self.mask_from_rows(np.concatenate(rows) if rows else None)
+
+    def format_key(self, key) -> str:
+        if self.is_numeric and float(key).is_integer():
+            return str(int(key))
+        return str(key)
+
+
+class AttributeQueryEngine:
+    """
+    属性查询引擎：每个字段首次被查询时才转换为列并建立索引，查询结果为长度等于要素数的布尔掩码
+    """
+    _token_pattern = re.compile(r"""
+        \s*(?:
+            (?P<string>'(?:[^']|'')*')
+          | (?P<number>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+          | (?P<operator><=|>=|!=|<>|=|<|>)
+          | (?P<punct>[(),])
+          | (?P<name>"[^"]+"|[A-Za-z_一-鿿][\w一-鿿]*)
+        )""", re.VERBOSE)
+    _keywords = {'AND', 'OR', 'NOT', 'IN', 'LIKE', 'BETWEEN'}
+
+    def __init__(self, records):
+        """
+        初始化查询引擎
+        参数:
+            records: 属性记录序列（每条记录为字典），或提供 column(field) 方法的列式存储
+        """
+        self.records = records
+        self._indexes = {}  # 字段名 -> AttributeIndex
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get_index(self, field: str) -> AttributeIndex:
+        """
+        获取字段的列和索引，首次使用时构建
+        参数:
+            field (str): 字段名
+        返回:
+            AttributeIndex: 字段索引
+        """
+        index = self._indexes.get(field)
+        if index is None:
+            if hasattr(self.records, 'column'):
+                values = self.records.column(field)  # 列式存储直接提供类型化的列
+                null_mask = self.records.null_mask(field) if hasattr(self.records, 'null_mask') else None
+            else:
+                if len(self.records) and field not in self.records[0]:
+                    raise KeyError(f"Unknown field: {field}")
+                raw = [record.get(field) for record in self.records]
+                values = to_column(raw)
+                null_mask = np.fromiter((value is None for value in raw), dtype=bool, count=len(raw))
+            index = AttributeIndex(values, null_mask)
+            self._indexes[field] = index
+        return index
+
+    def compare(self, field: str, operator: str, value) -> np.ndarray:
+        """
+        单个字段的比较查询，空值不满足任何比较
+        参数:
+            field (str): 字段名
+            operator (str): 比较运算符 = != <> < > <= >=
+            value: 比较值
+        返回:
+            np.ndarray: 要素布尔掩码
+        """
+        index = self.get_index(field)
+        if operator == '=':
+            mask = index.equal(value)
+        elif operator in ('!=', '<>'):
+            mask = ~index.equal(value)
+        elif operator == '<':
+            mask = index.range(high=value, include_high=False)
+        elif operator == '<=':
+            mask = index.range(high=value)
+        elif operator == '>':
+            mask = index.range(low=value, include_low=False)
+        elif operator == '>=':
+            mask = index.range(low=value)
+        else:
+            raise QuerySyntaxError(f"Unsupported operator: {operator}")
+        return mask & index.not_null
+
+    def query(self, expression: str) -> np.ndarray:
+        """
+        执行查询表达式，例如 "CONTINENT IN ('Europe', 'Asia') AND POP_EST > 1e7"
+        参数:
+            expression (str): 查询表达式
+        返回:
+            np.ndarray: 要素布尔掩码
+        """
+        self._tokens = self.tokenize(expression)
+        self._position = 0
+        mask, _ = self._parse_or()
+        if self._position != len(self._tokens):
+            raise QuerySyntaxError(f"Unexpected token: {self._tokens[self._position][1]}")
+        return mask
+
+    def tokenize(self, expression: str) -> list:
+        """
+        把表达式拆分为 (类型, 值) 记号列表
+        """
+        tokens = []
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = self._token_pattern.match(expression, position)
+            if match is None:
+                raise QuerySyntaxError(f"Invalid syntax near: {expression[position:position + 20]}")
+            kind = match.lastgroup
+            text = match.group(kind)
+            if kind == 'string':
+                tokens.append(('literal', text[1:-1].replace("''", "'")))
+            elif kind == 'number':
+                tokens.append(('literal', float(text)))
+            elif kind == 'name' and text.upper() in self._keywords:
+                tokens.append(('keyword', text.upper()))
+            elif kind == 'name':
+                tokens.append(('name', text.strip('"')))
+            else:
+                tokens.append((kind, text))
+            position = match.end()
+        return tokens
+
+    def _peek(self, kind: str = None, value=None) -> bool:
+        if self._position >= len(self._tokens):
+            return False
+        token_kind, token_value = self._tokens[self._position]
+        return (kind is None or token_kind == kind) and (value is None or token_value == value)
+
+    def _next(self, kind: str = None, value=None):
+        if not self._peek(kind, value):
+            found = self._tokens[self._position][1] if self._position < len(self._tokens) else 'end of query'
+            raise QuerySyntaxError(f"Expected {value or kind}, found {found}")
+        token = self._tokens[self._position]
+        self._position += 1
+        return token[1]
+
+    # 以下解析函数返回 (成立, 未知) 两个掩码，按三值逻辑组合，最终结果只取成立的要素
+
+    def _parse_or(self) -> tuple:
+        true, unknown = self._parse_and()
+        while self._peek('keyword', 'OR'):
+            self._next()
+            other_true, other_unknown = self._parse_and()
+            true = true | other_true
+            unknown = (unknown | other_unknown) & ~true
+        return true, unknown
+
+    def _parse_and(self) -> tuple:
+        true, unknown = self._parse_not()
+        while self._peek('keyword', 'AND'):
+            self._next()
+            other_true, other_unknown = self._parse_not()
+            false = ~(true | unknown) | ~(other_true | other_unknown)
+            true = true & other_true
+            unknown = ~true & ~false
+        return true, unknown
+
+    def _parse_not(self) -> tuple:
+        if self._peek('keyword', 'NOT'):
+            self._next()
+            true, unknown = self._parse_not()
+            return ~(true | unknown), unknown  # NOT 未知仍为未知
+        if self._peek('punct', '('):
+            self._next()
+            result = self._parse_or()
+            self._next('punct', ')')
+            return result
+        return self._parse_predicate()
+
+    def _parse_predicate(self) -> tuple:
+        field = self._next('name')
+        negate = False
+        if self._peek('keyword', 'NOT'):
+            self._next()
+            negate = True
+        if self._peek('operator') and not negate:
+            mask = self.compare(field, self._next(), self._next('literal'))
+            return mask, ~self.get_index(field).not_null
+        if self._peek('keyword', 'IN'):
+            self._next()
+            self._next('punct', '(')
+            values = [self._next('literal')]
+            while self._peek('punct', ','):
+                self._next()
+                values.append(self._next('literal'))
+            self._next('punct', ')')
+            mask = self.get_index(field).isin(values)
+        elif self._peek('keyword', 'LIKE'):
+            self._next()
+            mask = self.get_index(field).like(self._next('literal'))
+        elif self._peek('keyword', 'BETWEEN'):
+            self._next()
+            low = self._next('literal')
+            self._next('keyword', 'AND')
+            mask = self.get_index(field).range(low=low, high=self._next('literal'))
+        else:
+            raise QuerySyntaxError(f"Expected operator after field {field}")
+        not_null = self.get_index(field).not_null
+        return (~mask if negate else mask) & not_null, ~not_null
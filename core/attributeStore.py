@@ -0,0 +1,272 @@
+# core/attributeStore.py
+# 功能：以类型化的列存储 DBF 属性（数值列为 NumPy 数组，字符串列为字典编码），按需为单个要素生成属性字典
+
+import numpy as np
+
+
+class NumericColumn:
+    """
+    数值列：int64 或 float64 数组，空值由掩码记录
+    """
+    def __init__(self, values: np.ndarray, null_mask: np.ndarray = None):
+        self.values = values  # 类型化的取值
+        self.null_mask = null_mask if null_mask is not None and null_mask.any() else None  # 空值掩码，无空值时为 None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def get(self, index: int):
+        if self.null_mask is not None and self.null_mask[index]:
+            return None
+        return self.values[index].item()
+
+    def to_numpy(self) -> np.ndarray:
+        """
+        查询使用的列：float64，空值为 NaN
+        """
+        values = self.values.astype(np.float64)
+        if self.null_mask is not None:
+            values[self.null_mask] = np.nan
+        return values
+
+    def is_null(self) -> np.ndarray:
+        """
+        每行是否为空值
+        """
+        return self.null_mask.copy() if self.null_mask is not None else np.zeros(len(self.values), dtype=bool)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + (self.null_mask.nbytes if self.null_mask is not None else 0)
+
+
+class DictionaryColumn:
+    """
+    字典编码的字符串列：每行只存储 int32 编码，不同取值只保存一份
+    """
+    def __init__(self, codes: np.ndarray, categories: list):
+        self.codes = codes  # 每行的编码
+        self.categories = categories  # 编码对应的取值
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def get(self, index: int):
+        return self.categories[self.codes[index]]
+
+    def to_numpy(self) -> np.ndarray:
+        """
+        查询使用的列：Unicode 字符串数组，空值为空字符串
+        """
+        categories = np.array(['' if value is None else str(value) for value in self.categories], dtype=str)
+        return categories[self.codes]
+
+    def is_null(self) -> np.ndarray:
+        """
+        每行是否为空值
+        """
+        return np.array([value is None for value in self.categories], dtype=bool)[self.codes]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + sum(len(str(value)) for value in self.categories)
+
+
+class ObjectColumn:
+    """
+    其他类型（日期、逻辑值或类型不一致）的列，按原样保存
+    """
+    def __init__(self, values: list):
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def get(self, index: int):
+        return self.values[index]
+
+    def to_numpy(self) -> np.ndarray:
+        return np.array(['' if value is None else str(value) for value in self.values], dtype=str)
+
+    def is_null(self) -> np.ndarray:
+        """
+        每行是否为空值
+        """
+        return np.fromiter((value is None for value in self.values), dtype=bool, count=len(self.values))
+
+    @property
+    def nbytes(self) -> int:
+        return 8 * len(self.values)
+
+
+class AttributeStore:
+    """
+    列式属性存储，行为与属性字典列表一致（按索引返回单个要素的属性字典）
+    """
+    def __init__(self, fields: list, columns: list, length: int):
+        self.fields = list(fields)  # 字段名（保持 DBF 中的顺序）
+        self.columns = dict(zip(self.fields, columns))  # 字段名 -> 列
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.record(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("record index out of range")
+        return self.record(index)
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self.record(index)
+
+    def record(self, index: int) -> dict:
+        """
+        生成单个要素的属性字典
+        参数:
+            index (int): 要素索引
+        返回:
+            dict: 字段名 -> 取值
+        """
+        return {field: self.columns[field].get(index) for field in self.fields}
+
+    def value(self, index: int, field: str):
+        """
+        读取单个要素的单个字段
+        """
+        return self.columns[field].get(index)
+
+    def column(self, field: str) -> np.ndarray:
+        """
+        获取字段的类型化列（供属性查询使用）
+        参数:
+            field (str): 字段名
+        返回:
+            np.ndarray: float64 或 Unicode 字符串数组
+        """
+        if field not in self.columns:
+            raise KeyError(f"Unknown field: {field}")
+        return self.columns[field].to_numpy()
+
+    def null_mask(self, field: str) -> np.ndarray:
+        """
+        获取字段的空值掩码（供属性查询使用，字符串列的空值在 column 中为空字符串，无法区分）
+        参数:
+            field (str): 字段名
+        返回:
+            np.ndarray: 布尔数组，空值为 True
+        """
+        if field not in self.columns:
+            raise KeyError(f"Unknown field: {field}")
+        return self.columns[field].is_null()
+
+    @property
+    def nbytes(self) -> int:
+        """
+        属性数据占用的大致字节数
+        """
+        return sum(column.nbytes for column in self.columns.values())
+
+
+class AttributeStoreBuilder:
+    """
+    逐条添加 DBF 记录构建 AttributeStore，每积累一批记录就转换为类型化的列，避免保留逐行的 Python 对象
+    """
+    def __init__(self, fields: list, chunk_size: int = 10000):
+        """
+        参数:
+            fields (list): shapefile.Reader.fields（不含 DeletionFlag）
+            chunk_size (int): 每批转换的记录数
+        """
+        self.names = [field[0] for field in fields]
+        self.kinds = [self.field_kind(field) for field in fields]  # 每个字段的存储方式
+        self.chunk_size = chunk_size
+        self._rows = []  # 尚未转换的记录
+        self._chunks = [[] for _ in fields]  # 每个字段已转换的数据块
+        self._lookups = [{} for _ in fields]  # 字符串字段的取值 -> 编码
+        self._length = 0
+
+    @staticmethod
+    def field_kind(field) -> str:
+        """
+        按 DBF 字段类型选择存储方式
+        """
+        field_type, decimal = str(getattr(field[1], 'value', field[1])), field[3]
+        if field_type == 'N' and decimal == 0:
+            return 'int'
+        if field_type in ('N', 'F'):
+            return 'float'
+        if field_type == 'C':
+            return 'str'
+        return 'object'
+
+    def add(self, record) -> None:
+        """
+        添加一条记录
+        参数:
+            record: shapefile 记录（按字段顺序的取值序列）
+        """
+        self._rows.append(record)
+        if len(self._rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        把暂存的记录转换为类型化的数据块
+        """
+        if not self._rows:
+            return
+        for position, values in enumerate(zip(*self._rows)):
+            self._chunks[position].append(self.convert(position, values))
+        self._length += len(self._rows)
+        self._rows = []
+
+    def convert(self, position: int, values: tuple):
+        kind = self.kinds[position]
+        if kind == 'str':
+            lookup = self._lookups[position]
+            return np.fromiter((lookup.setdefault(value, len(lookup)) for value in values),
+                               dtype=np.int32, count=len(values))
+        if kind in ('int', 'float'):
+            null_mask = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+            try:
+                return np.array([0 if value is None else value for value in values],
+                                dtype=np.int64 if kind == 'int' else np.float64), null_mask
+            except (TypeError, ValueError, OverflowError):
+                self.demote(position)  # 存在无法转换的值，改为按原样保存
+        return list(values)
+
+    def demote(self, position: int) -> None:
+        """
+        把数值字段改为按原样保存，已转换的数据块还原为 Python 对象
+        """
+        chunks = self._chunks[position]
+        self._chunks[position] = [[None if null else value for value, null in zip(values.tolist(), nulls.tolist())]
+                                  for values, nulls in chunks]
+        self.kinds[position] = 'object'
+
+    def build(self) -> AttributeStore:
+        """
+        生成 AttributeStore
+        返回:
+            AttributeStore: 列式属性存储
+        """
+        self.flush()
+        columns = []
+        for position, kind in enumerate(self.kinds):
+            chunks = self._chunks[position]
+            if kind == 'str':
+                codes = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int32)
+                columns.append(DictionaryColumn(codes, list(self._lookups[position])))
+            elif kind in ('int', 'float'):
+                dtype = np.int64 if kind == 'int' else np.float64
+                values = np.concatenate([values for values, _ in chunks]) if chunks else np.empty(0, dtype=dtype)
+                null_mask = np.concatenate([nulls for _, nulls in chunks]) if chunks else np.empty(0, dtype=bool)
+                columns.append(NumericColumn(values, null_mask))
+            else:
+                columns.append(ObjectColumn([value for chunk in chunks for value in chunk]))
+        return AttributeStore(self.names, columns, self._length)
@@ -0,0 +1,85 @@
+# core/featureRegistry.py
+# 功能：提供要素索引登记表，以要素索引为键在常数时间内找到属性记录、几何部件和场景项
+
+import numpy as np
+
+
+class FeatureRegistry:
+    """
+    要素登记表：要素索引即记录在 .dbf 中的行号，在图层的整个生命周期内保持不变
+    属性表、地图选择和属性查询都通过要素索引互相定位
+    """
+    def __init__(self, geometry_array=None, records=None):
+        """
+        初始化要素登记表
+        参数:
+            geometry_array (GeometryArray): 图层几何，部件按要素顺序排列
+            records: 属性记录序列
+        """
+        self.records = records if records is not None else []
+        part_features = geometry_array.part_features if geometry_array is not None else np.empty(0, dtype=np.int64)
+        self.part_features = part_features  # 每个部件所属的要素索引
+        count = max(len(self.records), int(part_features.max()) + 1 if len(part_features) else 0)
+        # 第 i 个要素的部件为 part_offsets[i]:part_offsets[i + 1]
+        self.part_offsets = np.searchsorted(part_features, np.arange(count + 1), side='left')
+        self.items = {}  # 要素索引 -> 场景项
+
+    def __len__(self) -> int:
+        return len(self.part_offsets) - 1  # 要素数量
+
+    def __contains__(self, feature_id: int) -> bool:
+        return 0 <= feature_id < len(self)
+
+    def record(self, feature_id: int) -> dict:
+        """
+        获取要素的属性字典
+        参数:
+            feature_id (int): 要素索引
+        返回:
+            dict: 属性字典，要素没有属性记录时为空字典
+        """
+        return self.records[feature_id] if feature_id < len(self.records) else {}
+
+    def parts(self, feature_id: int) -> np.ndarray:
+        """
+        获取要素的几何部件索引
+        参数:
+            feature_id (int): 要素索引
+        返回:
+            np.ndarray: 部件索引
+        """
+        return np.arange(self.part_offsets[feature_id], self.part_offsets[feature_id + 1])
+
+    def features_of_parts(self, part_ids: np.ndarray) -> np.ndarray:
+        """
+        把部件索引转换为要素索引（去重并排序）
+        参数:
+            part_ids (np.ndarray): 部件索引
+        返回:
+            np.ndarray: 要素索引
+        """
+        return np.unique(self.part_features[part_ids])
+
+    def register_item(self, feature_id: int, item) -> None:
+        """
+        登记要素的场景项
+        """
+        self.items[feature_id] = item
+
+    def item(self, feature_id: int):
+        """
+        获取要素的场景项，未绘制时返回 None
+        """
+        return self.items.get(feature_id)
+
+    def remove_item(self, feature_id: int):
+        """
+        注销要素的场景项并返回它
+        """
+        return self.items.pop(feature_id, None)
+
+    def clear_items(self) -> None:
+        """
+        注销所有场景项（重新绘制前调用）
+        """
+        self.items.clear()
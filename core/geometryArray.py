@@ -0,0 +1,305 @@
+# core/geometryArray.py
+# 功能：以连续坐标数组和偏移数组存储图层几何，支持整个图层批量投影转换（大图层按块并行）
+
+from functools import cached_property
+import numpy as np
+import shapely
+from core.projection import transform_coords
+
+
+class GeometryArray:
+    """
+    图层几何的扁平化存储（与 GeoArrow 的偏移布局一致）
+    属性:
+        coords (np.ndarray): (N, 2) float64 连续坐标数组
+        ring_offsets (np.ndarray): (R + 1,) 每个环或线在 coords 中的起止位置
+        part_offsets (np.ndarray): (P + 1,) 每个部件在环数组中的起止位置，多边形部件的第一个环为外环
+        part_features (np.ndarray): (P,) 每个部件所属的要素索引
+        part_is_polygon (np.ndarray): (P,) 部件是否为多边形（否则为线）
+    """
+    def __init__(self, coords=None, ring_offsets=None, part_offsets=None,
+                 part_features=None, part_is_polygon=None):
+        self.coords = np.empty((0, 2), dtype=np.float64) if coords is None else coords
+        self.ring_offsets = np.zeros(1, dtype=np.int64) if ring_offsets is None else ring_offsets
+        self.part_offsets = np.zeros(1, dtype=np.int64) if part_offsets is None else part_offsets
+        self.part_features = np.empty(0, dtype=np.int64) if part_features is None else part_features
+        self.part_is_polygon = np.empty(0, dtype=bool) if part_is_polygon is None else part_is_polygon
+
+    def __len__(self) -> int:
+        return len(self.part_features)  # 部件数量
+
+    @cached_property
+    def polygon_ring_ids(self) -> np.ndarray:
+        """
+        所有多边形部件外环的环索引
+        """
+        return self.part_offsets[:-1][self.part_is_polygon]
+
+    @cached_property
+    def polygon_part_ids(self) -> np.ndarray:
+        """
+        所有多边形部件的部件索引（与 polygon_ring_ids 一一对应）
+        """
+        return np.flatnonzero(self.part_is_polygon)
+
+    @cached_property
+    def line_part_ids(self) -> np.ndarray:
+        """
+        所有线部件的部件索引（与 line_ring_ids 一一对应）
+        """
+        return np.flatnonzero(~self.part_is_polygon)
+
+    @cached_property
+    def line_ring_ids(self) -> np.ndarray:
+        """
+        所有线部件的环索引
+        """
+        return self.part_offsets[:-1][~self.part_is_polygon]
+
+    @cached_property
+    def polygon_feature_runs(self) -> dict:
+        """
+        每个要素的多边形部件在 polygon_ring_ids 序列中的连续区间
+        返回:
+            dict: {要素索引: (起始序号, 结束序号)}
+        """
+        return _feature_runs(self.part_features[self.polygon_part_ids])
+
+    @cached_property
+    def line_feature_runs(self) -> dict:
+        """
+        每个要素的线部件在 line_ring_ids 序列中的连续区间
+        返回:
+            dict: {要素索引: (起始序号, 结束序号)}
+        """
+        return _feature_runs(self.part_features[self.line_part_ids])
+
+    def transform(self, transformer, workers: int = None) -> np.ndarray:
+        """
+        批量转换整个图层的坐标，坐标很多时按块在多个线程中并行转换
+        参数:
+            transformer (Transformer): pyproj 转换器
+            workers (int): 转换线程数，None 表示使用默认线程数，1 表示一次转换
+        返回:
+            np.ndarray: (N, 2) 转换后的连续坐标数组
+        """
+        if len(self.coords) == 0:
+            return self.coords.copy()
+        return transform_coords(transformer, self.coords, workers)
+
+    def ring_views(self, coords: np.ndarray, ring_ids: np.ndarray) -> list:
+        """
+        从坐标数组中按环切出视图（不复制数据）
+        参数:
+            coords (np.ndarray): 与本几何数组对应的坐标数组（原始或转换后）
+            ring_ids (np.ndarray): 要切出的环索引
+        返回:
+            list: 每个环对应的 (n, 2) 坐标视图
+        """
+        starts = self.ring_offsets[ring_ids]
+        ends = self.ring_offsets[ring_ids + 1]
+        return [coords[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+
+    def to_polygons(self, coords: np.ndarray, part_ids: np.ndarray) -> np.ndarray:
+        """
+        将指定的多边形部件批量转换为 shapely 多边形（包含内环）
+        参数:
+            coords (np.ndarray): 与本几何数组对应的坐标数组（原始或转换后）
+            part_ids (np.ndarray): 多边形部件索引
+        返回:
+            np.ndarray: shapely 多边形数组，含无效坐标或环点数不足的部件为 None
+        """
+        polygons = np.full(len(part_ids), None, dtype=object)
+        if len(part_ids) == 0:
+            return polygons
+        ring_counts = self.part_offsets[part_ids + 1] - self.part_offsets[part_ids]
+        ring_ids = _ranges(self.part_offsets[part_ids], ring_counts)
+        ring_starts = self.ring_offsets[ring_ids]
+        ring_lengths = self.ring_offsets[ring_ids + 1] - ring_starts
+        # 每个环中有效（有限）坐标的数量
+        finite = np.concatenate(([0], np.cumsum(np.isfinite(coords).all(axis=1))))
+        ring_ok = (ring_lengths >= 4) & (finite[ring_starts + ring_lengths] - finite[ring_starts] == ring_lengths)
+        part_ok = np.add.reduceat(ring_ok, np.cumsum(ring_counts) - ring_counts) == ring_counts
+        if not part_ok.any():
+            return polygons
+        keep = np.repeat(part_ok, ring_counts)
+        ring_starts, ring_lengths = ring_starts[keep], ring_lengths[keep]
+        ring_offsets = np.concatenate(([0], np.cumsum(ring_lengths)))
+        polygon_offsets = np.concatenate(([0], np.cumsum(ring_counts[part_ok])))
+        polygons[part_ok] = shapely.from_ragged_array(
+            shapely.GeometryType.POLYGON,
+            np.ascontiguousarray(coords[_ranges(ring_starts, ring_lengths)]),
+            (ring_offsets, polygon_offsets))
+        return polygons
+
+    def to_lines(self, coords: np.ndarray, part_ids: np.ndarray) -> np.ndarray:
+        """
+        将指定的线部件批量转换为 shapely 线
+        参数:
+            coords (np.ndarray): 与本几何数组对应的坐标数组（原始或转换后）
+            part_ids (np.ndarray): 线部件索引
+        返回:
+            np.ndarray: shapely 线数组，含无效坐标或点数不足的部件为 None
+        """
+        lines = np.full(len(part_ids), None, dtype=object)
+        if len(part_ids) == 0:
+            return lines
+        ring_ids = self.part_offsets[part_ids]
+        starts = self.ring_offsets[ring_ids]
+        lengths = self.ring_offsets[ring_ids + 1] - starts
+        finite = np.concatenate(([0], np.cumsum(np.isfinite(coords).all(axis=1))))
+        ok = (lengths >= 2) & (finite[starts + lengths] - finite[starts] == lengths)
+        if not ok.any():
+            return lines
+        lines[ok] = shapely.from_ragged_array(
+            shapely.GeometryType.LINESTRING,
+            np.ascontiguousarray(coords[_ranges(starts[ok], lengths[ok])]),
+            (np.concatenate(([0], np.cumsum(lengths[ok]))),))
+        return lines
+
+
+def _feature_runs(feature_ids: np.ndarray) -> dict:
+    """
+    把按要素连续排列的部件序列划分为每个要素的区间
+    """
+    if len(feature_ids) == 0:
+        return {}
+    breaks = np.flatnonzero(np.diff(feature_ids)) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [len(feature_ids)]))
+    return {feature: (start, end) for feature, start, end in
+            zip(feature_ids[starts].tolist(), starts.tolist(), ends.tolist())}
+
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    把多个区间 [start, start + length) 展开拼接为一个索引数组
+    """
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+
+SPILL_CHUNK_SIZE = 1 << 20  # 写出到磁盘时每块的坐标数量
+
+
+class GeometryArrayBuilder:
+    """
+    逐要素构建 GeometryArray，输入为 __geo_interface__ 格式的几何映射
+    默认在内存中收集各环的坐标，build 时拼接为连续数组（峰值约为坐标数据的两倍）
+    给出 spill_path 时坐标按块追加写入该文件，内存中只保留一块，build 返回文件的只读内存映射，
+    用于超大图层的延迟加载；偏移数组仍在内存中，大小与环的数量成正比
+    """
+    def __init__(self, spill_path: str = None, chunk_size: int = SPILL_CHUNK_SIZE):
+        """
+        参数:
+            spill_path (str): 坐标写出文件的路径（原始 float64 数据），None 表示在内存中构建
+            chunk_size (int): 写出模式下累积多少个坐标写出一次
+        """
+        self._rings = []  # 每个环的坐标数组（写出模式下只保存尚未写出的环）
+        self._ring_counts = []  # 每个部件包含的环数量
+        self._part_features = []  # 每个部件所属的要素索引
+        self._part_is_polygon = []  # 每个部件是否为多边形
+        self.spill_path = spill_path
+        self.chunk_size = chunk_size
+        self._ring_lengths = []  # 写出模式下每个环的坐标数量
+        self._pending = 0  # 尚未写出的坐标数量
+        self._written = 0  # 已写出的坐标数量
+        self._spill_file = open(spill_path, 'wb') if spill_path is not None else None
+
+    def add(self, feature_index: int, geo: dict) -> None:
+        """
+        添加一个要素的几何
+        参数:
+            feature_index (int): 要素索引
+            geo (dict): __geo_interface__ 格式的几何映射
+        """
+        geom_type = geo.get('type')
+        coordinates = geo.get('coordinates')
+        if not coordinates:
+            return
+        if geom_type == 'Polygon':
+            self._add_polygon(feature_index, coordinates)
+        elif geom_type == 'MultiPolygon':
+            for polygon in coordinates:
+                self._add_polygon(feature_index, polygon)
+        elif geom_type == 'LineString':
+            self._add_line(feature_index, coordinates)
+        elif geom_type == 'MultiLineString':
+            for line in coordinates:
+                self._add_line(feature_index, line)
+
+    def _add_polygon(self, feature_index: int, rings) -> None:
+        rings = [ring for ring in rings if len(ring) > 0]
+        if not rings:
+            return
+        for ring in rings:
+            self._add_ring(np.asarray(ring, dtype=np.float64)[:, :2])  # 丢弃 Z 值
+        self._ring_counts.append(len(rings))
+        self._part_features.append(feature_index)
+        self._part_is_polygon.append(True)
+
+    def _add_line(self, feature_index: int, line) -> None:
+        if len(line) == 0:
+            return
+        self._add_ring(np.asarray(line, dtype=np.float64)[:, :2])
+        self._ring_counts.append(1)
+        self._part_features.append(feature_index)
+        self._part_is_polygon.append(False)
+
+    def _add_ring(self, ring: np.ndarray) -> None:
+        self._rings.append(ring)
+        if self._spill_file is not None:
+            self._ring_lengths.append(len(ring))
+            self._pending += len(ring)
+            if self._pending >= self.chunk_size:
+                self._flush()
+
+    def _flush(self) -> None:
+        """
+        把尚未写出的环拼接为一块写入文件
+        """
+        if self._rings:
+            np.ascontiguousarray(np.concatenate(self._rings), dtype=np.float64).tofile(self._spill_file)
+            self._written += self._pending
+            self._rings, self._pending = [], 0
+
+    def close(self) -> None:
+        """
+        关闭写出文件（build 会自动关闭，构建中止时由调用方关闭）
+        """
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def build(self) -> GeometryArray:
+        """
+        生成 GeometryArray
+        返回:
+            GeometryArray: 扁平化的几何数组，写出模式下 coords 为只读内存映射
+        """
+        if self._spill_file is not None:
+            self._flush()
+            self.close()
+            ring_lengths = self._ring_lengths
+            if self._written:
+                coords = np.memmap(self.spill_path, dtype=np.float64, mode='r', shape=(self._written, 2))
+            else:
+                coords = np.empty((0, 2), dtype=np.float64)
+        elif self._rings:
+            coords = np.ascontiguousarray(np.concatenate(self._rings), dtype=np.float64)
+            ring_lengths = [len(ring) for ring in self._rings]
+        else:
+            return GeometryArray()
+        if not ring_lengths:
+            return GeometryArray()
+        ring_offsets = np.zeros(len(ring_lengths) + 1, dtype=np.int64)
+        np.cumsum(ring_lengths, out=ring_offsets[1:])
+        part_offsets = np.zeros(len(self._ring_counts) + 1, dtype=np.int64)
+        np.cumsum(self._ring_counts, out=part_offsets[1:])
+        return GeometryArray(
+            coords=coords,
+            ring_offsets=ring_offsets,
+            part_offsets=part_offsets,
+            part_features=np.asarray(self._part_features, dtype=np.int64),
+            part_is_polygon=np.asarray(self._part_is_polygon, dtype=bool),
+        )
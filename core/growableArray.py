@@ -0,0 +1,61 @@
+# core/growableArray.py
+# 功能：提供可追加的 NumPy 数组，容量按倍数增长，流式导入时追加的总复制量与元素数量成正比
+
+import numpy as np
+
+GROWTH_FACTOR = 2  # 容量不足时的扩容倍数
+
+
+class GrowableArray:
+    """
+    可追加的数组：数据保存在容量可能大于元素数量的缓冲区中，values 返回前 size 个元素的视图
+    追加只写入已使用部分之后的位置，已返回的视图内容不变
+    """
+    def __init__(self, shape: tuple = (), dtype=np.float64):
+        """
+        参数:
+            shape (tuple): 每个元素的形状，例如坐标为 (2,)
+            dtype: 元素的数据类型
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self._buffer = np.empty((0,) + self.shape, dtype=self.dtype)
+        self._size = 0  # 已使用的元素数量
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def values(self) -> np.ndarray:
+        """
+        已使用部分的视图（可以原地修改）
+        """
+        return self._buffer[:self._size]
+
+    def set(self, values: np.ndarray) -> None:
+        """
+        替换全部内容，容量等于新的元素数量
+        参数:
+            values (np.ndarray): 新的数组
+        """
+        self._buffer = np.ascontiguousarray(values, dtype=self.dtype).reshape((-1,) + self.shape)
+        self._size = len(self._buffer)
+
+    def append(self, values: np.ndarray) -> None:
+        """
+        在末尾追加元素，容量不足时按 GROWTH_FACTOR 倍扩容
+        参数:
+            values (np.ndarray): 要追加的数组
+        """
+        values = np.asarray(values, dtype=self.dtype).reshape((-1,) + self.shape)
+        end = self._size + len(values)
+        if end > len(self._buffer):
+            buffer = np.empty((max(end, GROWTH_FACTOR * len(self._buffer)),) + self.shape, dtype=self.dtype)
+            buffer[:self._size] = self._buffer[:self._size]
+            self._buffer = buffer
+        self._buffer[self._size:end] = values
+        self._size = end
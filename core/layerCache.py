@@ -0,0 +1,360 @@
+# core/layerCache.py
+# 功能：提供解析结果和投影结果的磁盘缓存，按文件路径、修改时间、大小和目标投影区分，数组以 .npy 保存并通过内存映射读取
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import logging
+import time
+import datetime
+import numpy as np
+from core.geometryArray import GeometryArray
+from core.attributeStore import AttributeStore, NumericColumn, DictionaryColumn, ObjectColumn
+
+CACHE_VERSION = 2  # 缓存格式版本，格式改变时递增使旧缓存失效（2：对象列改为 JSON，不再使用 pickle）
+SOURCE_EXTENSIONS = ('.shp', '.shx', '.dbf', '.prj', '.cpg')  # 影响解析结果的文件
+GEOMETRY_ARRAYS = ('coords', 'ring_offsets', 'part_offsets', 'part_features', 'part_is_polygon')
+DEFAULT_MAX_SIZE = 4 * 1024 ** 3  # 缓存目录的默认容量上限（字节）
+TEMPORARY_MAX_AGE = 24 * 3600  # 超过该时间（秒）的临时文件视为中断的写入，清理时删除
+
+
+def default_cache_dir() -> str:
+    """
+    默认缓存目录：环境变量 PYGISS_CACHE_DIR，否则为 ~/.cache/pygiss
+    """
+    return os.environ.get('PYGISS_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'pygiss')
+
+
+class LayerCache:
+    """
+    图层磁盘缓存，每个数据源一个目录：
+        layer.json            坐标参考系、字段和列类型
+        geometry/*.npy        GeometryArray 的坐标和偏移数组
+        attributes/*.npy      属性列（数值、空值掩码、字典编码）
+        attributes/*.json     其他类型的属性列（JSON，缓存中的任何文件都不使用 pickle，内嵌在项目文件中也可以安全读取）
+        projected/<投影>.npy  投影后的坐标
+    源文件的路径、修改时间或大小改变后，缓存目录名随之改变，旧缓存在下次写入缓存时由 prune 删除
+    """
+    def __init__(self, cache_dir: str = None, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        参数:
+            cache_dir (str): 缓存目录，默认为 default_cache_dir()
+            max_size (int): 缓存目录的容量上限（字节），超过时删除最久未使用的缓存，None 表示不限制
+        """
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_size = max_size
+
+    def source_key(self, filepath: str, encoding: str = 'utf-8') -> str:
+        """
+        数据源的缓存键：绝对路径、编码以及各组成文件的修改时间和大小的摘要
+        """
+        base = os.path.splitext(os.path.abspath(filepath))[0]
+        stats = []
+        for extension in SOURCE_EXTENSIONS:
+            path = base + extension
+            if os.path.exists(path):
+                stat = os.stat(path)
+                stats.append((extension, stat.st_mtime_ns, stat.st_size))
+        text = json.dumps([CACHE_VERSION, os.path.abspath(filepath), encoding, stats])
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def entry_dir(self, filepath: str, encoding: str = 'utf-8') -> str:
+        return os.path.join(self.cache_dir, self.source_key(filepath, encoding))
+
+    def load_layer(self, filepath: str, encoding: str = 'utf-8', attributes: bool = True) -> dict:
+        """
+        读取缓存的图层，数组以只读内存映射方式打开
+        参数:
+            filepath (str): Shapefile 文件路径
+            encoding (str): 文件编码
+            attributes (bool): 是否读取属性列
+        返回:
+            dict: 包含 'geometry_array'、'crs'、'feature_count'，以及 attributes 为 True 时的
+                  'records'（AttributeStore，未缓存属性时为 None）；没有缓存时返回 None
+        """
+        directory = self.entry_dir(filepath, encoding)
+        try:
+            with open(os.path.join(directory, 'layer.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+            geometry_array = GeometryArray(**{name: self._load(directory, 'geometry', name)
+                                              for name in GEOMETRY_ARRAYS})
+            records = self._load_attributes(directory, meta) if attributes else None
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable layer cache {directory}: {e}")
+            return None
+        self._touch(directory)  # 记录使用时间，超过容量上限时最久未使用的缓存先被删除
+        logging.info(f"Loaded cached layer for {filepath}.")
+        return {'geometry_array': geometry_array, 'crs': meta['crs'], 'feature_count': meta['feature_count'],
+                'records': records}
+
+    def store_layer(self, filepath: str, encoding: str, geometry_array: GeometryArray, crs: str,
+                    feature_count: int, records=None) -> None:
+        """
+        把解析结果写入缓存（先写入临时目录再改名，其他进程不会读到不完整的缓存）
+        参数:
+            filepath (str): Shapefile 文件路径
+            encoding (str): 文件编码
+            geometry_array (GeometryArray): 几何数据
+            crs (str): 坐标参考系
+            feature_count (int): 要素数量
+            records: 属性记录，只有 AttributeStore 会被缓存
+        """
+        directory = self.entry_dir(filepath, encoding)
+        cached_attributes = self.has_layer(filepath, encoding)
+        if cached_attributes is not None and (cached_attributes or not isinstance(records, AttributeStore)):
+            return  # 已有缓存（只缺属性时用完整的解析结果替换）
+        temporary = f"{directory}.tmp-{os.getpid()}"
+        try:
+            for name in GEOMETRY_ARRAYS:
+                self._save(temporary, 'geometry', name, getattr(geometry_array, name))
+            meta = {'version': CACHE_VERSION, 'source': os.path.abspath(filepath), 'encoding': encoding,
+                    'crs': crs, 'feature_count': feature_count, 'attributes': None}
+            if isinstance(records, AttributeStore):
+                meta['attributes'] = self._save_attributes(temporary, records)
+            with open(os.path.join(temporary, 'layer.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            if os.path.exists(directory):
+                shutil.rmtree(directory)  # 替换只有几何或不完整的缓存
+            os.replace(temporary, directory)
+            logging.info(f"Cached layer for {filepath} in {directory}.")
+        except Exception as e:
+            logging.warning(f"Failed to cache layer for {filepath}: {e}")
+        finally:
+            shutil.rmtree(temporary, ignore_errors=True)
+        self.prune(keep=directory)
+
+    def has_layer(self, filepath: str, encoding: str = 'utf-8'):
+        """
+        检查数据源是否已缓存
+        返回:
+            bool: 已缓存时返回是否包含属性列，未缓存时返回 None
+        """
+        try:
+            with open(os.path.join(self.entry_dir(filepath, encoding), 'layer.json'), encoding='utf-8') as f:
+                return json.load(f).get('attributes') is not None
+        except (OSError, ValueError):
+            return None
+
+    def load_projection(self, filepath: str, encoding: str, crs: str) -> np.ndarray:
+        """
+        读取缓存的投影坐标
+        参数:
+            filepath (str): Shapefile 文件路径
+            encoding (str): 文件编码
+            crs (str): 目标投影
+        返回:
+            np.ndarray: (N, 2) 投影后的坐标（只读内存映射），没有缓存时返回 None
+        """
+        path = self.projection_path(filepath, encoding, crs)
+        if not os.path.exists(path):
+            return None
+        try:
+            coords = np.load(path, mmap_mode='r')
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable projection cache {path}: {e}")
+            return None
+        logging.info(f"Loaded cached {crs} coordinates for {filepath}.")
+        return coords
+
+    def store_projection(self, filepath: str, encoding: str, crs: str, coords: np.ndarray) -> None:
+        """
+        把投影后的坐标写入缓存（图层本身已缓存时才写入）
+        """
+        directory = self.entry_dir(filepath, encoding)
+        if not os.path.exists(os.path.join(directory, 'layer.json')):
+            return
+        path = self.projection_path(filepath, encoding, crs)
+        temporary = f"{path}.tmp-{os.getpid()}.npy"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            np.save(temporary, np.ascontiguousarray(coords))
+            os.replace(temporary, path)
+        except Exception as e:
+            logging.warning(f"Failed to cache {crs} coordinates for {filepath}: {e}")
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def projection_path(self, filepath: str, encoding: str, crs: str) -> str:
+        name = re.sub(r'[^A-Za-z0-9]+', '_', crs).strip('_')[:40]
+        digest = hashlib.sha1(crs.encode('utf-8')).hexdigest()[:8]  # 区分化简后同名的投影字符串
+        return os.path.join(self.entry_dir(filepath, encoding), 'projected', f"{name}-{digest}.npy")
+
+    def clear(self) -> None:
+        """
+        删除所有缓存
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def prune(self, keep: str = None) -> int:
+        """
+        清理缓存目录：删除数据源已修改或已删除的缓存、中断写入留下的临时文件，
+        总大小超过 max_size 时再按最近使用时间删除最旧的缓存
+        参数:
+            keep (str): 不删除的缓存目录（刚写入的缓存）
+        返回:
+            int: 删除的缓存和临时文件数量
+        """
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return 0
+        removed = 0
+        entries = []  # (最近使用时间, 大小, 目录)
+        now = time.time()
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if '.tmp' in name:  # 临时目录（*.tmp-<pid>）和延迟加载的坐标临时文件
+                    if now - os.path.getmtime(path) > TEMPORARY_MAX_AGE:
+                        self._remove(path)
+                        removed += 1
+                    continue
+                meta_path = os.path.join(path, 'layer.json')
+                if not os.path.isfile(meta_path):
+                    continue  # 不是缓存目录
+                with open(meta_path, encoding='utf-8') as f:
+                    meta = json.load(f)
+                stale = name != self.source_key(meta['source'], meta.get('encoding', 'utf-8'))
+            except (OSError, ValueError, KeyError, TypeError):
+                stale = True  # 无法读取的缓存
+            if stale and os.path.abspath(path) != os.path.abspath(keep or ''):
+                self._remove(path)
+                removed += 1
+            elif not stale:
+                entries.append((os.path.getmtime(meta_path), self._size(path), path))
+        if self.max_size is not None:
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):  # 最久未使用的在前
+                if total <= self.max_size:
+                    break
+                if os.path.abspath(path) == os.path.abspath(keep or ''):
+                    continue
+                self._remove(path)
+                total -= size
+                removed += 1
+        if removed:
+            logging.info(f"Pruned {removed} stale or excess entries from {self.cache_dir}.")
+        return removed
+
+    @staticmethod
+    def _touch(directory: str) -> None:
+        try:
+            os.utime(os.path.join(directory, 'layer.json'))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _size(directory: str) -> int:
+        size = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # 仍在使用的文件（例如 Windows 上被内存映射的文件）下次再清理
+
+    @staticmethod
+    def _save(directory: str, group: str, name: str, array: np.ndarray) -> None:
+        os.makedirs(os.path.join(directory, group), exist_ok=True)
+        np.save(os.path.join(directory, group, f"{name}.npy"), array, allow_pickle=False)
+
+    @staticmethod
+    def _load(directory: str, group: str, name: str) -> np.ndarray:
+        return np.load(os.path.join(directory, group, f"{name}.npy"), mmap_mode='r', allow_pickle=False)
+
+    @staticmethod
+    def _save_values(directory: str, name: str, values: list) -> None:
+        """
+        以 JSON 保存对象列，日期和字节串带类型标记，其他类型保存为字符串
+        """
+        encoded = []
+        for value in values:
+            if value is None or isinstance(value, (bool, int, float, str)):
+                encoded.append(value)
+            elif isinstance(value, datetime.datetime):
+                encoded.append({'datetime': value.isoformat()})
+            elif isinstance(value, datetime.date):
+                encoded.append({'date': value.isoformat()})
+            elif isinstance(value, bytes):
+                encoded.append({'bytes': value.decode('latin-1')})
+            else:
+                encoded.append(str(value))
+        os.makedirs(os.path.join(directory, 'attributes'), exist_ok=True)
+        with open(os.path.join(directory, 'attributes', f"{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(encoded, f, ensure_ascii=False)
+
+    @staticmethod
+    def _load_values(directory: str, name: str) -> list:
+        """
+        读取 _save_values 保存的对象列
+        """
+        with open(os.path.join(directory, 'attributes', f"{name}.json"), encoding='utf-8') as f:
+            encoded = json.load(f)
+        values = []
+        for value in encoded:
+            if isinstance(value, dict):
+                if 'datetime' in value:
+                    value = datetime.datetime.fromisoformat(value['datetime'])
+                elif 'date' in value:
+                    value = datetime.date.fromisoformat(value['date'])
+                elif 'bytes' in value:
+                    value = value['bytes'].encode('latin-1')
+                else:
+                    raise ValueError(f"Unknown attribute value in cache: {value}")
+            values.append(value)
+        return values
+
+    def _save_attributes(self, directory: str, records: AttributeStore) -> list:
+        """
+        写出属性列，返回写入 layer.json 的列说明
+        """
+        columns = []
+        for position, field in enumerate(records.fields):
+            column = records.columns[field]
+            name = f"{position}"
+            if isinstance(column, NumericColumn):
+                self._save(directory, 'attributes', name, column.values)
+                if column.null_mask is not None:
+                    self._save(directory, 'attributes', f"{name}.nulls", column.null_mask)
+                columns.append({'field': field, 'kind': 'numeric', 'nulls': column.null_mask is not None})
+            elif isinstance(column, DictionaryColumn):
+                self._save(directory, 'attributes', name, column.codes)
+                columns.append({'field': field, 'kind': 'dictionary', 'categories': list(column.categories)})
+            else:
+                self._save_values(directory, name, column.values)
+                columns.append({'field': field, 'kind': 'object'})
+        return columns
+
+    def _load_attributes(self, directory: str, meta: dict) -> AttributeStore:
+        """
+        读取属性列，没有缓存属性时返回 None
+        """
+        if meta.get('attributes') is None:
+            return None
+        columns = []
+        for position, spec in enumerate(meta['attributes']):
+            name = f"{position}"
+            if spec['kind'] == 'numeric':
+                null_mask = self._load(directory, 'attributes', f"{name}.nulls") if spec['nulls'] else None
+                column = NumericColumn(self._load(directory, 'attributes', name), null_mask)
+            elif spec['kind'] == 'dictionary':
+                column = DictionaryColumn(self._load(directory, 'attributes', name), spec['categories'])
+            else:
+                column = ObjectColumn(self._load_values(directory, name))
+            columns.append(column)
+        return AttributeStore([spec['field'] for spec in meta['attributes']], columns, meta['feature_count'])
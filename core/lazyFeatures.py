@@ -0,0 +1,90 @@
+# core/lazyFeatures.py
+# 功能：提供按需读取 Shapefile 要素的只读序列，几何通过 .shx 索引随机读取，属性按需从 .dbf 读取
+
+import numpy as np
+from shapely.geometry import shape, MultiPolygon, MultiLineString, GeometryCollection
+
+
+class _LazyReaderSequence:
+    """
+    基于保持打开状态的 shapefile.Reader 的只读序列
+    """
+    def __init__(self, reader):
+        self.reader = reader  # 保持打开的 shapefile.Reader
+        self._length = len(reader)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._read(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("feature index out of range")
+        return self._read(index)
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self._read(index)
+
+    def _read(self, index: int):
+        raise NotImplementedError
+
+
+class LazyShapeList(_LazyReaderSequence):
+    """
+    按需读取几何的序列，访问时通过 .shx 索引定位并转换为 shapely 几何
+    """
+    def _read(self, index: int):
+        return shape(self.reader.shape(index).__geo_interface__)
+
+
+class LazyRecordList(_LazyReaderSequence):
+    """
+    按需读取属性的序列，访问时从 .dbf 中读取单条记录并返回字典
+    """
+    def _read(self, index: int) -> dict:
+        return self.reader.record(index).as_dict()
+
+
+class GeometryArrayShapeList:
+    """
+    由 GeometryArray 按需生成 shapely 几何的只读序列（图层来自缓存、没有打开 Reader 时使用）
+    """
+    def __init__(self, geometry_array, length: int = None):
+        self.geometry_array = geometry_array
+        part_features = geometry_array.part_features
+        if length is None:
+            length = int(part_features.max()) + 1 if len(part_features) else 0
+        self._length = length
+        self.part_offsets = np.searchsorted(part_features, np.arange(length + 1))  # 每个要素的部件区间
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._read(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("feature index out of range")
+        return self._read(index)
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self._read(index)
+
+    def _read(self, index: int):
+        geometry_array = self.geometry_array
+        part_ids = np.arange(self.part_offsets[index], self.part_offsets[index + 1])
+        is_polygon = geometry_array.part_is_polygon[part_ids]
+        polygons = [p for p in geometry_array.to_polygons(geometry_array.coords, part_ids[is_polygon]) if p is not None]
+        lines = [l for l in geometry_array.to_lines(geometry_array.coords, part_ids[~is_polygon]) if l is not None]
+        if polygons and not lines:
+            return polygons[0] if len(polygons) == 1 else MultiPolygon(polygons)
+        if lines and not polygons:
+            return lines[0] if len(lines) == 1 else MultiLineString(lines)
+        return GeometryCollection(polygons + lines)
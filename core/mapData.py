@@ -2,47 +2,247 @@
 # 功能：提供加载 Shapefile、处理地图投影和转换几何形状的功能
 
 import shapefile
-from shapely.geometry import shape
+from shapely.geometry import shape, Point, box
+from shapely.strtree import STRtree
+import shapely
 from shapely.ops import transform
-from pyproj import Transformer, CRS
+from pyproj import Transformer
+import numpy as np
 import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from core.geometryArray import GeometryArray, GeometryArrayBuilder
+from core.lazyFeatures import LazyShapeList, LazyRecordList, GeometryArrayShapeList
+from core.attributeQuery import AttributeQueryEngine
+from core.attributeStore import AttributeStoreBuilder
+from core.featureRegistry import FeatureRegistry
+from core.layerCache import LayerCache
+from core.projection import default_transform_workers, get_transformer, get_epsg
+
+
+class LoadCancelledError(Exception):
+    """
+    Shapefile 加载被取消时抛出的异常
+    """
+    pass
+
 
 class MapData:
     def __init__(self):
         # 初始化 MapData 类，存储几何数据、属性数据和坐标参考系
         self.shapes = []  # 存储几何形状
         self.records = []  # 新增：用于存储属性数据
+        self.geometry_array = GeometryArray()  # 连续坐标数组形式的几何数据
         self.crs = 'EPSG:4326'  # 默认坐标参考系
         self.transformer = None  # 转换器，初始为 None
         self.proj_string = 'EPSG:4326'  # 当前投影字符串，默认值为 WGS84
+        self.projection_cache = {}  # 按投影字符串缓存转换后的几何数据
+        self.reader = None  # 延迟加载模式下保持打开的 shapefile.Reader
+        self.lazy_threshold = 512 * 1024 * 1024  # 超过该大小（字节）的 Shapefile 自动使用延迟加载
+        self.transform_workers = None  # 投影转换线程数，None 表示使用默认线程数（CPU 核数），1 表示不并行
+        self.lod_factors = (0.0, 0.0002, 0.001, 0.004)  # 各细节层级的简化容差（相对于图层范围对角线长度）
+        self.query_engine = None  # 属性查询引擎，首次查询时创建
+        self.features = FeatureRegistry()  # 要素索引 -> 属性记录、几何部件和场景项
+        self.cache = LayerCache()  # 解析结果和投影结果的磁盘缓存，None 表示不使用
+        self.source = None  # 当前图层的数据源 (文件路径, 编码)，用于定位磁盘缓存
 
-    def load_shapefile(self, filepath: str, encoding: str = 'utf-8') -> None:
+    def load_shapefile(self, filepath: str, encoding: str = 'utf-8', lazy: bool = None) -> None:
         """
         加载 Shapefile 并存储几何和属性数据
         参数:
             filepath (str): Shapefile 文件路径
             encoding (str): 文件编码方式，默认为 'utf-8'
+            lazy (bool): 是否使用延迟加载模式，None 表示按文件大小自动选择
         """
         try:
-            sf = shapefile.Reader(filepath, encoding=encoding)
-            self.shapes = []  # 清空几何形状列表
-            self.records = []  # 清空属性数据列表
-            for shaperec in sf.iterShapeRecords():
-                geom = shape(shaperec.shape.__geo_interface__)  # 获取几何形状
-                self.shapes.append(geom)  # 添加几何到 shapes 列表
-                self.records.append(shaperec.record.as_dict())  # 新增：存储属性数据
-            # 获取 CRS 信息，假设使用 .prj 文件
-            self.crs = self.get_crs_from_prj(filepath)
-            self.proj_string = self.crs
-            # 初始化转换器，从原始 CRS 到目标 CRS (初始为自身)
-            self.transformer = Transformer.from_crs(self.crs, self.crs, always_xy=True)
-            logging.info(f"Detected CRS: {self.crs}")
-            logging.info(f"Total shapes to process: {len(self.shapes)}")
-            logging.info(f"Imported {len(self.shapes)} features from shapefile.")
+            layer = self.read_shapefile(filepath, encoding=encoding, lazy=lazy)
+            self.apply_loaded_layer(layer)
         except Exception as e:
             logging.error(f"Error loading shapefile: {e}")
             raise e
 
+    def read_shapefile(self, filepath: str, encoding: str = 'utf-8', chunk_size: int = 1000,
+                       progress_callback=None, is_cancelled=None, lazy: bool = None) -> dict:
+        """
+        分块解析 Shapefile，不修改当前对象的状态，可在后台线程中调用
+        延迟加载模式下坐标按块写入磁盘并以内存映射方式读取（内存中只保留一块坐标和偏移数组），
+        Reader 保持打开，几何对象通过 .shx 索引随机读取，属性在需要时才从 .dbf 读取
+        参数:
+            filepath (str): Shapefile 文件路径
+            encoding (str): 文件编码方式，默认为 'utf-8'
+            chunk_size (int): 每处理多少个要素报告一次进度并检查取消
+            progress_callback (callable): 进度回调，参数为 (已处理数量, 总数量)
+            is_cancelled (callable): 返回 True 时中止解析并抛出 LoadCancelledError
+            lazy (bool): 是否使用延迟加载模式，None 表示按文件大小自动选择
+        返回:
+            dict: 解析结果，可交给 apply_loaded_layer 使用
+        """
+        if lazy is None:
+            lazy = self.get_shapefile_size(filepath) >= self.lazy_threshold
+        layer = self.read_cached_layer(filepath, encoding, lazy)
+        if layer is not None:
+            if is_cancelled is not None and is_cancelled():
+                layer['reader'] and layer['reader'].close()
+                raise LoadCancelledError(f"Loading cancelled: {filepath}")
+            if progress_callback is not None:
+                progress_callback(len(layer['shapes']), len(layer['shapes']))
+            return layer
+        shapes = []
+        spill_path = self.create_spill_file() if lazy else None
+        builder = GeometryArrayBuilder(spill_path)
+        try:
+            sf = shapefile.Reader(filepath, encoding=encoding)
+        except BaseException:
+            builder.close()
+            self.remove_spill_file(spill_path)
+            raise
+        attributes = AttributeStoreBuilder(sf.fields[1:])  # 跳过 DeletionFlag 字段
+        try:
+            total = len(sf)
+            if lazy:
+                if total > 0:
+                    sf.record(0)  # 预读第一条记录，尽早暴露编码错误
+                iterator = enumerate((shp, None) for shp in sf.iterShapes())  # 不读取 .dbf
+            else:
+                iterator = enumerate((shaperec.shape, shaperec.record) for shaperec in sf.iterShapeRecords())
+            for index, (shp, record) in iterator:
+                geo = shp.__geo_interface__
+                builder.add(index, geo)  # 写入连续坐标数组
+                if not lazy:
+                    shapes.append(shape(geo))  # 获取几何形状
+                    attributes.add(record)  # 属性按列存储
+                if (index + 1) % chunk_size == 0:
+                    if is_cancelled is not None and is_cancelled():
+                        raise LoadCancelledError(f"Loading cancelled: {filepath}")
+                    if progress_callback is not None:
+                        progress_callback(index + 1, total)
+            if is_cancelled is not None and is_cancelled():
+                raise LoadCancelledError(f"Loading cancelled: {filepath}")
+        except BaseException:
+            sf.close()
+            builder.close()
+            self.remove_spill_file(spill_path)
+            raise
+        if lazy:
+            shapes = LazyShapeList(sf)  # Reader 保持打开，按需读取
+            records = LazyRecordList(sf)
+            logging.info(f"Using lazy feature access for {filepath}.")
+        else:
+            sf.close()
+            records = attributes.build()
+        geometry_array = builder.build()
+        # 获取 CRS 信息，假设使用 .prj 文件
+        crs = self.get_crs_from_prj(filepath)
+        if self.cache is not None:
+            self.cache.store_layer(filepath, encoding, geometry_array, crs, total, None if lazy else records)
+        if spill_path is not None:
+            cached = self.cache.load_layer(filepath, encoding, attributes=False) if self.cache is not None else None
+            if cached is not None:
+                geometry_array = cached['geometry_array']  # 改用缓存中的坐标，临时文件可以删除
+            self.remove_spill_file(spill_path)  # 仍被映射时（只在 Windows 上）留在临时目录中
+        if progress_callback is not None:
+            progress_callback(total, total)
+        return {'shapes': shapes, 'records': records, 'geometry_array': geometry_array, 'crs': crs,
+                'reader': sf if lazy else None, 'source': (filepath, encoding)}
+
+    def read_cached_layer(self, filepath: str, encoding: str, lazy: bool) -> dict:
+        """
+        从磁盘缓存读取图层（坐标、偏移和属性列以内存映射方式打开，不重新解析 .shp/.dbf）
+        延迟加载模式下只使用缓存的几何，属性仍通过 Reader 按需读取
+        参数:
+            filepath (str): Shapefile 文件路径
+            encoding (str): 文件编码
+            lazy (bool): 是否使用延迟加载模式
+        返回:
+            dict: 与 read_shapefile 相同格式的解析结果，没有可用缓存时返回 None
+        """
+        if self.cache is None:
+            return None
+        cached = self.cache.load_layer(filepath, encoding, attributes=not lazy)
+        if cached is None or (not lazy and cached['records'] is None):
+            return None
+        geometry_array = cached['geometry_array']
+        if lazy:
+            sf = shapefile.Reader(filepath, encoding=encoding)
+            shapes, records = LazyShapeList(sf), LazyRecordList(sf)
+        else:
+            sf = None
+            shapes = GeometryArrayShapeList(geometry_array, cached['feature_count'])  # 几何对象按需生成
+            records = cached['records']
+        return {'shapes': shapes, 'records': records, 'geometry_array': geometry_array, 'crs': cached['crs'],
+                'reader': sf, 'source': (filepath, encoding)}
+
+    def apply_loaded_layer(self, layer: dict) -> None:
+        """
+        使用 read_shapefile 的解析结果替换当前地图数据
+        参数:
+            layer (dict): read_shapefile 返回的解析结果
+        """
+        self.close_reader()  # 关闭上一个延迟加载图层的文件
+        self.reader = layer.get('reader')
+        self.shapes = layer['shapes']
+        self.records = layer['records']
+        self.geometry_array = layer['geometry_array']
+        self.source = layer.get('source')
+        self.clear_projection_cache()  # 清空旧数据的投影缓存
+        self.query_engine = None  # 属性索引随数据一起失效
+        self.features = FeatureRegistry(self.geometry_array, self.records)
+        self.crs = layer['crs']
+        self.proj_string = self.crs
+        # 初始化转换器，从原始 CRS 到目标 CRS (初始为自身)
+        self.transformer = get_transformer(self.crs, self.crs)
+        logging.info(f"Detected CRS: {self.crs}")
+        logging.info(f"Total shapes to process: {len(self.shapes)}")
+        logging.info(f"Imported {len(self.shapes)} features from shapefile.")
+
+    def get_shapefile_size(self, filepath: str) -> int:
+        """
+        获取 Shapefile 的 .shp 与 .dbf 文件总大小
+        参数:
+            filepath (str): Shapefile 文件路径
+        返回:
+            int: 文件总字节数
+        """
+        base, _ = os.path.splitext(filepath)
+        size = 0
+        for ext in ('.shp', '.dbf'):
+            if os.path.exists(base + ext):
+                size += os.path.getsize(base + ext)
+        return size
+
+    def create_spill_file(self) -> str:
+        """
+        创建延迟加载时写出坐标的临时文件，位于缓存目录（没有缓存时为系统临时目录）
+        返回:
+            str: 临时文件路径
+        """
+        directory = self.cache.cache_dir if self.cache is not None else tempfile.gettempdir()
+        os.makedirs(directory, exist_ok=True)
+        handle, path = tempfile.mkstemp(prefix='coords-', suffix='.tmp', dir=directory)
+        os.close(handle)
+        return path
+
+    @staticmethod
+    def remove_spill_file(path: str) -> None:
+        """
+        删除写出坐标的临时文件，POSIX 系统上仍被内存映射的文件也可以删除
+        """
+        if path is None:
+            return
+        try:
+            os.remove(path)
+        except OSError as e:
+            logging.debug(f"Could not remove temporary coordinate file {path}: {e}")
+
+    def close_reader(self) -> None:
+        """
+        关闭延迟加载模式下保持打开的 Shapefile
+        """
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
     def get_crs_from_prj(self, shapefile_path: str) -> str:
         """
         从 .prj 文件获取 CRS
@@ -55,8 +255,7 @@ class MapData:
         try:
             with open(prj_path, 'r', encoding='utf-8') as prj_file:
                 prj_text = prj_file.read()  # 读取 .prj 文件内容
-                crs = CRS.from_wkt(prj_text)  # 从 WKT 中获取 CRS
-                epsg = crs.to_epsg()  # 尝试转换为 EPSG 代码
+                epsg = get_epsg(prj_text)  # 从 WKT 中获取 EPSG 代码（相同的 WKT 只解析一次）
                 if epsg:
                     return f"EPSG:{epsg}"
                 else:
@@ -77,29 +276,112 @@ class MapData:
         """
         try:
             self.proj_string = epsg_code  # 更新投影字符串
-            self.transformer = Transformer.from_crs(self.crs, self.proj_string, always_xy=True)  # 初始化转换器
+            self.transformer = get_transformer(self.crs, self.proj_string)  # 从对象池获取转换器
             logging.info(f"Projection changed to: {self.proj_string}")
         except Exception as e:
             logging.error(f"Error changing projection: {e}")
             raise e
 
+    def get_projected_geometry(self) -> dict:
+        """
+        获取当前投影下的几何数据，优先使用投影缓存
+        返回:
+            dict: 包含 'coords'（转换后的连续坐标数组）、'polygons'、'lines'（坐标视图列表）和 'bounds'（有效坐标范围）的字典
+        """
+        cached = self.projection_cache.get(self.proj_string)
+        if cached is not None:
+            return cached
+        cached = self.build_projected_geometry(self.geometry_array, self.source, self.crs, self.proj_string,
+                                               self.transformer)
+        self.projection_cache[self.proj_string] = cached  # 存入缓存，重绘或切回该投影时直接复用
+        logging.info(f"Cached projected geometry for {self.proj_string}.")
+        return cached
+
+    def build_projected_geometry(self, geometry_array: GeometryArray, source: tuple, crs: str, proj_string: str,
+                                 transformer: Transformer = None, workers: int = None) -> dict:
+        """
+        把几何数据转换到指定投影，优先读取磁盘缓存；不修改当前对象的状态，可在后台线程中调用
+        参数:
+            geometry_array (GeometryArray): 几何数据
+            source (tuple): 数据源 (文件路径, 编码)，None 表示不使用磁盘缓存
+            crs (str): 几何数据的坐标参考系
+            proj_string (str): 目标投影
+            transformer (Transformer): 转换器，默认按 crs 和 proj_string 创建
+            workers (int): 转换线程数，默认为 transform_workers
+        返回:
+            dict: 包含 'coords'、'polygons'、'lines' 和 'bounds' 的投影结果，格式同 get_projected_geometry
+        """
+        use_disk_cache = self.cache is not None and source is not None and proj_string != crs
+        coords = self.cache.load_projection(*source, proj_string) if use_disk_cache else None
+        if coords is None:
+            try:
+                transformer = transformer or get_transformer(crs, proj_string)
+                coords = geometry_array.transform(transformer, workers or self.transform_workers)  # 大图层按块并行
+                if use_disk_cache:
+                    self.cache.store_projection(*source, proj_string, coords)
+            except Exception as e:
+                logging.error(f"Error transforming geometry: {e}")
+                coords = np.full_like(geometry_array.coords, np.nan)
+        finite = coords[np.isfinite(coords).all(axis=1)]  # 忽略投影失败的坐标
+        bounds = None
+        if len(finite):
+            (min_x, min_y), (max_x, max_y) = finite.min(axis=0), finite.max(axis=0)
+            bounds = (float(min_x), float(min_y), float(max_x), float(max_y))
+        return {
+            'coords': coords,
+            'polygons': geometry_array.ring_views(coords, geometry_array.polygon_ring_ids),
+            'lines': geometry_array.ring_views(coords, geometry_array.line_ring_ids),
+            'bounds': bounds,
+        }
+
+    def precompute_projections(self, projections, max_workers: int = None, is_cancelled=None) -> list:
+        """
+        在线程池中把图层转换到多个投影并简化各细节层级，存入投影缓存（坐标同时写入磁盘缓存），
+        之后切换到这些投影时只需替换几何
+        可在后台线程中调用：每个投影的结果整体写入缓存，计算过程中图层被替换时丢弃结果
+        参数:
+            projections: 投影字符串列表
+            max_workers (int): 线程数，默认为投影数量和 CPU 核数中的较小值（pyproj 转换时释放 GIL）
+            is_cancelled (callable): 返回 True 时不再开始新的投影
+        返回:
+            list: 新写入缓存的投影
+        """
+        geometry_array, source, crs = self.geometry_array, self.source, self.crs
+        pending = [proj_string for proj_string in dict.fromkeys(projections)
+                   if proj_string not in self.projection_cache]
+        if len(geometry_array) == 0 or not pending:
+            return []
+
+        def project(proj_string: str) -> dict:
+            if is_cancelled is not None and is_cancelled():
+                return None
+            projected = self.build_projected_geometry(geometry_array, source, crs, proj_string, workers=workers)
+            lod_cache = projected.setdefault('lod', {})  # 各细节层级也一并简化
+            for level, tolerance in enumerate(self.lod_tolerances_for(projected['bounds'])):
+                if level > 0 and tolerance > 0:
+                    lod_cache[level] = self.build_lod_geometry(geometry_array, projected, tolerance)
+            return projected
+
+        done = []
+        max_workers = max_workers or min(len(pending), os.cpu_count() or 1)
+        # 各投影已并行计算，每个投影内部的分块转换只使用剩余的线程
+        workers = max(1, (self.transform_workers or default_transform_workers()) // max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for proj_string, projected in zip(pending, executor.map(project, pending)):
+                if projected is None or self.geometry_array is not geometry_array:
+                    continue  # 已取消或图层已被替换
+                self.projection_cache.setdefault(proj_string, projected)
+                done.append(proj_string)
+        logging.info(f"Precomputed projections: {', '.join(done) or 'none'}.")
+        return done
+
     def get_transformed_polygons(self) -> list:
         """
         获取转换后的多边形坐标列表
         返回:
             list: 包含所有转换后的多边形的坐标列表
         """
-        transformed_polygons = []
-        for geom in self.shapes:
-            if geom.geom_type in ['Polygon', 'MultiPolygon']:
-                transformed_geom = self.transform_geometry(geom)  # 转换几何形状
-                if transformed_geom:
-                    if transformed_geom.geom_type == 'Polygon':
-                        transformed_polygons.append(list(transformed_geom.exterior.coords))  # 添加转换后的外部边界
-                    elif transformed_geom.geom_type == 'MultiPolygon':
-                        for poly in transformed_geom.geoms:
-                            transformed_polygons.append(list(poly.exterior.coords))  # 添加每个多边形的外部边界
-        return transformed_polygons
+        return self.get_projected_geometry()['polygons']
 
     def get_transformed_lines(self) -> list:
         """
@@ -107,17 +389,173 @@ class MapData:
         返回:
             list: 包含所有转换后的线的坐标列表
         """
-        transformed_lines = []
-        for geom in self.shapes:
-            if geom.geom_type in ['LineString', 'MultiLineString']:
-                transformed_geom = self.transform_geometry(geom)  # 转换几何形状
-                if transformed_geom:
-                    if transformed_geom.geom_type == 'LineString':
-                        transformed_lines.append(list(transformed_geom.coords))  # 添加转换后的线坐标
-                    elif transformed_geom.geom_type == 'MultiLineString':
-                        for line in transformed_geom.geoms:
-                            transformed_lines.append(list(line.coords))  # 添加每个子线的坐标
-        return transformed_lines
+        return self.get_projected_geometry()['lines']
+
+    def get_transformed_bounds(self) -> tuple:
+        """
+        获取转换后所有几何的边界范围
+        返回:
+            tuple: (min_x, min_y, max_x, max_y)，没有有效坐标时返回 None
+        """
+        return self.get_projected_geometry()['bounds']
+
+    def get_spatial_index(self) -> dict:
+        """
+        获取当前投影下所有部件（多边形和线）的空间索引（STRtree），随投影缓存一起构建和失效
+        返回:
+            dict: 包含 'tree'（STRtree）、'geometries'（投影后的多边形和线）和 'part_ids'（对应的部件索引）的字典
+        """
+        cached = self.get_projected_geometry()
+        if 'spatial_index' not in cached:
+            geometry_array = self.geometry_array
+            part_ids = np.concatenate((geometry_array.polygon_part_ids, geometry_array.line_part_ids))
+            geometries = np.concatenate((
+                geometry_array.to_polygons(cached['coords'], geometry_array.polygon_part_ids),
+                geometry_array.to_lines(cached['coords'], geometry_array.line_part_ids)))
+            valid = np.array([geometry is not None for geometry in geometries], dtype=bool)
+            cached['spatial_index'] = {
+                'tree': STRtree(geometries[valid]),
+                'geometries': geometries[valid],
+                'part_ids': part_ids[valid],
+            }
+            logging.info(f"Built spatial index for {self.proj_string}.")
+        return cached['spatial_index']
+
+    def query_point(self, x: float, y: float, tolerance: float = 0.0) -> np.ndarray:
+        """
+        查询包含指定点（当前投影坐标）的多边形部件和经过该点的线部件
+        参数:
+            x (float): x 坐标
+            y (float): y 坐标
+            tolerance (float): 距离容差（当前投影坐标），线部件只有在容差大于 0 时才容易命中
+        返回:
+            np.ndarray: 命中的部件索引（升序）
+        """
+        index = self.get_spatial_index()
+        if tolerance > 0:
+            hits = index['tree'].query(Point(x, y), predicate='dwithin', distance=tolerance)
+        else:
+            hits = index['tree'].query(Point(x, y), predicate='intersects')  # 先用包围盒筛选候选，再做精确判断
+        return np.sort(index['part_ids'][hits])
+
+    def query_box(self, min_x: float, min_y: float, max_x: float, max_y: float) -> np.ndarray:
+        """
+        查询与矩形范围（当前投影坐标）相交的部件
+        参数:
+            min_x (float): 最小 x 坐标
+            min_y (float): 最小 y 坐标
+            max_x (float): 最大 x 坐标
+            max_y (float): 最大 y 坐标
+        返回:
+            np.ndarray: 命中的部件索引（升序）
+        """
+        index = self.get_spatial_index()
+        hits = index['tree'].query(box(min_x, min_y, max_x, max_y), predicate='intersects')
+        return np.sort(index['part_ids'][hits])
+
+    def get_lod_tolerances(self) -> list:
+        """
+        获取当前投影下各细节层级的简化容差（投影坐标单位）
+        返回:
+            list: 从精细到粗略排列的容差列表，第 0 级为原始几何
+        """
+        return self.lod_tolerances_for(self.get_transformed_bounds())
+
+    def lod_tolerances_for(self, bounds: tuple) -> list:
+        """
+        按投影后的范围计算各细节层级的简化容差
+        参数:
+            bounds (tuple): (min_x, min_y, max_x, max_y)，None 表示没有有效坐标
+        返回:
+            list: 从精细到粗略排列的容差列表
+        """
+        if bounds is None:
+            return [0.0]
+        diagonal = float(np.hypot(bounds[2] - bounds[0], bounds[3] - bounds[1]))
+        return [diagonal * factor for factor in self.lod_factors]
+
+    def get_lod_level_for(self, pixel_size: float) -> int:
+        """
+        选择简化容差不超过指定像素大小的最粗细节层级
+        参数:
+            pixel_size (float): 一个屏幕像素对应的投影坐标长度
+        返回:
+            int: 细节层级
+        """
+        level = 0
+        for index, tolerance in enumerate(self.get_lod_tolerances()):
+            if tolerance <= pixel_size:
+                level = index
+        return level
+
+    def get_lod_geometry(self, level: int) -> dict:
+        """
+        获取当前投影下指定细节层级的几何，简化结果随投影缓存一起保存
+        参数:
+            level (int): 细节层级，0 为原始几何，数值越大越粗略
+        返回:
+            dict: 包含 'polygons'、'lines' 坐标列表和 'tolerance' 的字典，顺序与 get_transformed_polygons 一致
+        """
+        cached = self.get_projected_geometry()
+        tolerances = self.get_lod_tolerances()
+        level = max(0, min(level, len(tolerances) - 1))
+        if level == 0 or tolerances[level] <= 0:
+            return {'polygons': cached['polygons'], 'lines': cached['lines'], 'tolerance': 0.0}
+        lod_cache = cached.setdefault('lod', {})
+        if level not in lod_cache:
+            tolerance = tolerances[level]
+            lod_cache[level] = self.build_lod_geometry(self.geometry_array, cached, tolerance)
+            logging.info(f"Built LOD level {level} (tolerance {tolerance:.4g}) for {self.proj_string}.")
+        return lod_cache[level]
+
+    def build_lod_geometry(self, geometry_array: GeometryArray, projected: dict, tolerance: float) -> dict:
+        """
+        简化投影后的几何，不修改当前对象的状态，可在后台线程中调用
+        参数:
+            geometry_array (GeometryArray): 几何数据
+            projected (dict): build_projected_geometry 的结果
+            tolerance (float): 简化容差
+        返回:
+            dict: 包含 'polygons'、'lines' 坐标列表和 'tolerance' 的字典
+        """
+        polygons = geometry_array.to_polygons(projected['coords'], geometry_array.polygon_part_ids)
+        lines = geometry_array.to_lines(projected['coords'], geometry_array.line_part_ids)
+        return {
+            'polygons': self._simplify_coords(polygons, projected['polygons'], tolerance, exterior=True),
+            'lines': self._simplify_coords(lines, projected['lines'], tolerance, exterior=False),
+            'tolerance': tolerance,
+        }
+
+    @staticmethod
+    def _simplify_coords(geometries: np.ndarray, originals: list, tolerance: float, exterior: bool) -> list:
+        """
+        保持拓扑地批量简化几何，并返回与原坐标列表顺序一致的坐标数组列表
+        参数:
+            geometries (np.ndarray): shapely 几何数组，None 表示无法简化
+            originals (list): 原始坐标列表，无法简化的几何保留原始坐标
+            tolerance (float): 简化容差
+            exterior (bool): 是否只取多边形外环
+        返回:
+            list: 简化后的坐标数组列表
+        """
+        result = list(originals)
+        valid = np.flatnonzero([geometry is not None for geometry in geometries])
+        if len(valid) == 0:
+            return result
+        simplified = shapely.simplify(geometries[valid], tolerance, preserve_topology=True)
+        if exterior:
+            simplified = shapely.get_exterior_ring(simplified)
+        coords, index = shapely.get_coordinates(simplified, return_index=True)
+        counts = np.bincount(index, minlength=len(valid))
+        for position, part_coords in zip(valid.tolist(), np.split(coords, np.cumsum(counts)[:-1])):
+            result[position] = part_coords
+        return result
+
+    def clear_projection_cache(self) -> None:
+        """
+        清空投影缓存
+        """
+        self.projection_cache = {}
 
     def transform_geometry(self, geom) -> shape:
         """
@@ -134,12 +572,38 @@ class MapData:
             logging.error(f"Error transforming geometry: {e}")
             return None
 
+    def get_query_engine(self) -> AttributeQueryEngine:
+        """
+        获取属性查询引擎，各字段的索引在首次查询时建立并在图层更换前一直复用
+        返回:
+            AttributeQueryEngine: 属性查询引擎
+        """
+        if self.query_engine is None:
+            self.query_engine = AttributeQueryEngine(self.records)
+        return self.query_engine
+
+    def query_attributes(self, expression: str) -> np.ndarray:
+        """
+        执行属性查询表达式
+        参数:
+            expression (str): 查询表达式，例如 "NAME LIKE 'Fr%' AND POP_EST > 1e6"
+        返回:
+            np.ndarray: 长度等于要素数的布尔掩码
+        """
+        return self.get_query_engine().query(expression)
+
     def clear_map(self) -> None:
         """
         清除地图数据
         """
+        self.close_reader()  # 关闭延迟加载的文件
         self.shapes = []  # 清空几何形状列表
         self.records = []  # 清空属性数据列表
-        self.transformer = Transformer.from_crs(self.crs, self.crs, always_xy=True)  # 重置转换器
+        self.geometry_array = GeometryArray()  # 清空坐标数组
+        self.clear_projection_cache()  # 清空投影缓存
+        self.query_engine = None  # 清空属性索引
+        self.features = FeatureRegistry()
+        self.source = None
+        self.transformer = get_transformer(self.crs, self.crs)  # 重置转换器
         self.proj_string = self.crs  # 重置投影字符串
         logging.info("Map data cleared.")
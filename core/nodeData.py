@@ -1,35 +1,138 @@
 # core/nodeData.py
 # 功能：提供加载节点数据、处理投影和获取转换后的节点坐标的功能
 
+import numpy as np
 import pandas as pd
-from shapely.geometry import Point
-from pyproj import Transformer
 import logging
+from core.nodeReaders import get_node_reader
+from core.projection import transform_coords, get_transformer
+from core.growableArray import GrowableArray
 
 class NodeData:
     def __init__(self):
         # 初始化 NodeData 类，存储节点数据和投影信息
-        self.nodes = []  # 存储节点坐标
+        # 流式导入时逐批追加，坐标数组按倍数扩容，属性表在读取时才合并
+        self._nodes = GrowableArray((2,))  # 节点坐标 (N, 2)，列为经度和纬度
+        self._invalid_mask = GrowableArray(dtype=bool)  # 坐标无效或无法投影的节点
+        self._transformed_nodes = None  # 当前投影下的节点坐标缓存（GrowableArray）
+        self._attribute_batches = []  # 尚未合并的属性表批次
+        self._attributes = None  # 可选的节点属性表（DataFrame），行与 nodes 一一对应
         self.transformer = None  # 转换器，初始为 None
         self.proj_string = 'EPSG:4326'  # 默认投影字符串，默认值为 WGS84
+        self.transform_workers = None  # 转换线程数，None 表示使用默认线程数
 
-    def import_nodes(self, filepath: str) -> None:
+    @property
+    def nodes(self) -> np.ndarray:
+        return self._nodes.values
+
+    @nodes.setter
+    def nodes(self, nodes: np.ndarray) -> None:
+        self._nodes.set(nodes)
+
+    @property
+    def invalid_mask(self) -> np.ndarray:
+        return self._invalid_mask.values
+
+    @invalid_mask.setter
+    def invalid_mask(self, mask: np.ndarray) -> None:
+        self._invalid_mask.set(mask)
+
+    @property
+    def transformed_nodes(self):
+        return None if self._transformed_nodes is None else self._transformed_nodes.values
+
+    @transformed_nodes.setter
+    def transformed_nodes(self, transformed) -> None:
+        if transformed is None:
+            self._transformed_nodes = None
+        else:
+            self._transformed_nodes = GrowableArray((2,))
+            self._transformed_nodes.set(transformed)
+
+    @property
+    def attributes(self):
+        if self._attribute_batches:  # 流式导入的批次只合并一次
+            batches = ([self._attributes] if self._attributes is not None else []) + self._attribute_batches
+            self._attributes = pd.concat(batches, ignore_index=True)
+            self._attribute_batches = []
+        return self._attributes
+
+    @attributes.setter
+    def attributes(self, attributes) -> None:
+        self._attributes = attributes
+        self._attribute_batches = []
+
+    def import_nodes(self, filepath: str, x_column: str = 'Longitude', y_column: str = 'Latitude',
+                     attribute_columns: list = None) -> None:
         """
-        导入节点数据（Excel 文件）
+        导入节点数据（CSV、Parquet/Arrow 或 Excel 文件），只读取需要的列
         参数:
-            filepath (str): Excel 文件路径，假设文件中有 Longitude 和 Latitude 列
+            filepath (str): 节点文件路径，按扩展名选择读取器
+            x_column (str): 经度列名
+            y_column (str): 纬度列名
+            attribute_columns (list): 需要一并读取的属性列，默认不读取
         """
         try:
-            df = pd.read_excel(filepath)  # 读取 Excel 文件
-            self.nodes = []  # 清空节点列表
-            for _, row in df.iterrows():
-                x, y = row['Longitude'], row['Latitude']  # 获取经纬度坐标
-                self.nodes.append((x, y))  # 添加到节点列表
+            attribute_columns = list(attribute_columns or [])
+            reader = get_node_reader(filepath, [x_column, y_column] + attribute_columns)  # 只读取需要的列
+            self.set_nodes(reader.read_all(), x_column, y_column, attribute_columns)
             logging.info(f"Imported {len(self.nodes)} nodes from {filepath}.")
         except Exception as e:
             logging.error(f"Error importing nodes: {e}")
             raise e
 
+    def set_nodes(self, df: pd.DataFrame, x_column: str = 'Longitude', y_column: str = 'Latitude',
+                  attribute_columns: list = None) -> None:
+        """
+        由 DataFrame 设置节点数据，坐标列转换为 float64 数组，无法解析的值记为 NaN
+        参数:
+            df (pd.DataFrame): 节点数据
+            x_column (str): 经度列名
+            y_column (str): 纬度列名
+            attribute_columns (list): 作为节点属性保留的列
+        """
+        self.nodes = self.parse_coordinates(df, x_column, y_column)
+        self.attributes = df[list(attribute_columns)].reset_index(drop=True) if attribute_columns else None
+        self.invalid_mask = ~np.isfinite(self.nodes).all(axis=1)
+        self.transformed_nodes = None
+        invalid = int(self.invalid_mask.sum())
+        if invalid:
+            logging.warning(f"{invalid} of {len(self.nodes)} nodes have invalid coordinates.")
+
+    def append_nodes(self, df: pd.DataFrame, x_column: str = 'Longitude', y_column: str = 'Latitude',
+                     attribute_columns: list = None) -> tuple:
+        """
+        追加一批节点（用于流式导入），已有的投影结果只对新节点增量转换
+        参数:
+            df (pd.DataFrame): 一批节点数据
+            x_column (str): 经度列名
+            y_column (str): 纬度列名
+            attribute_columns (list): 作为节点属性保留的列
+        返回:
+            tuple: 新节点在 nodes 中的区间 (起始位置, 结束位置)
+        """
+        start = len(self.nodes)
+        batch = self.parse_coordinates(df, x_column, y_column)
+        self._nodes.append(batch)
+        if attribute_columns:
+            self._attribute_batches.append(df[list(attribute_columns)])
+        if self._transformed_nodes is not None:
+            transformed = self.transform_coordinates(batch)
+            self._transformed_nodes.append(transformed)
+            self._invalid_mask.append(~np.isfinite(transformed).all(axis=1))
+        else:
+            self._invalid_mask.append(~np.isfinite(batch).all(axis=1))
+        return start, len(self.nodes)
+
+    @staticmethod
+    def parse_coordinates(df: pd.DataFrame, x_column: str, y_column: str) -> np.ndarray:
+        """
+        把坐标列转换为 (N, 2) float64 数组，无法解析的值记为 NaN
+        """
+        x = pd.to_numeric(df[x_column], errors='coerce').to_numpy(dtype=np.float64)
+        y = pd.to_numeric(df[y_column], errors='coerce').to_numpy(dtype=np.float64)
+        return np.column_stack((x, y))
+
     def set_projection(self, input_crs: str, target_crs: str) -> None:
         """
         设置节点数据的投影转换器
@@ -39,30 +142,49 @@ class NodeData:
         """
         try:
             self.proj_string = target_crs  # 更新投影字符串
-            self.transformer = Transformer.from_crs(input_crs, self.proj_string, always_xy=True)  # 初始化转换器
+            self.transformer = get_transformer(input_crs, self.proj_string)  # 从对象池获取转换器
+            self.transformed_nodes = None  # 投影改变后重新转换
             logging.info(f"Node projection set to: {self.proj_string}")
         except Exception as e:
             logging.error(f"Error setting node projection: {e}")
             raise e
 
-    def get_transformed_nodes(self) -> list:
+    def get_transformed_nodes(self) -> np.ndarray:
+        """
+        获取转换后的节点坐标，所有节点一次批量转换，结果按投影缓存
+        无效或无法投影的节点坐标为 NaN，并记录在 invalid_mask 中
+        返回:
+            np.ndarray: (N, 2) 转换后的节点坐标
+        """
+        if self.transformed_nodes is None:
+            transformed = self.transform_coordinates(self.nodes)
+            self.invalid_mask = ~np.isfinite(transformed).all(axis=1)
+            invalid = int(self.invalid_mask.sum())
+            if invalid:
+                logging.warning(f"{invalid} of {len(self.nodes)} nodes could not be transformed to {self.proj_string}.")
+            self.transformed_nodes = transformed
+        return self.transformed_nodes
+
+    def transform_coordinates(self, coords: np.ndarray) -> np.ndarray:
         """
-        获取转换后的节点坐标列表
+        批量转换坐标（坐标很多时按块并行），投影失败的结果（inf）统一记为 NaN
+        参数:
+            coords (np.ndarray): (N, 2) 经纬度坐标
         返回:
-            list: 包含所有转换后的节点坐标列表
+            np.ndarray: (N, 2) 转换后的坐标
         """
-        transformed_nodes = []
-        for x, y in self.nodes:
-            try:
-                transformed_x, transformed_y = self.transformer.transform(x, y)  # 转换节点坐标
-                transformed_nodes.append((transformed_x, transformed_y))  # 添加转换后的坐标
-            except Exception as e:
-                logging.error(f"Error transforming node ({x}, {y}): {e}")
-        return transformed_nodes
+        if self.transformer is None or len(coords) == 0:
+            return coords.copy()
+        transformed = transform_coords(self.transformer, coords, self.transform_workers)  # 整批转换，大批量时并行
+        transformed[~np.isfinite(transformed).all(axis=1)] = np.nan
+        return transformed
 
     def clear_nodes(self) -> None:
         """
         清除节点数据
         """
-        self.nodes = []  # 清空节点列表
-        logging.info("Node data cleared.")
\ No newline at end of file
+        self.nodes = np.empty((0, 2), dtype=np.float64)  # 清空节点坐标
+        self.attributes = None
+        self.invalid_mask = np.zeros(0, dtype=bool)
+        self.transformed_nodes = None
+        logging.info("Node data cleared.")
@@ -0,0 +1,144 @@
+# core/nodeReaders.py
+# 功能：提供可扩展的节点文件读取器（CSV、Parquet/Arrow、Excel），按批次读取所需的列
+
+import os
+import pandas as pd
+
+
+class NodeReader:
+    """
+    节点读取器基类：子类实现 iter_batches，逐批返回只包含所需列的 DataFrame
+    """
+    extensions = ()  # 支持的文件扩展名（小写，含点号）
+    description = ""  # 文件对话框中显示的类型名称
+
+    def __init__(self, filepath: str, columns: list, batch_size: int = 200000):
+        """
+        初始化读取器
+        参数:
+            filepath (str): 节点文件路径
+            columns (list): 需要读取的列
+            batch_size (int): 每批读取的行数
+        """
+        self.filepath = filepath
+        self.columns = list(columns)
+        self.batch_size = batch_size
+
+    def iter_batches(self):
+        """
+        逐批读取节点数据
+        返回:
+            generator: 每次产生一个 DataFrame
+        """
+        raise NotImplementedError
+
+    def read_all(self) -> pd.DataFrame:
+        """
+        读取全部节点数据
+        返回:
+            pd.DataFrame: 所有批次拼接后的数据
+        """
+        batches = list(self.iter_batches())
+        if not batches:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(batches, ignore_index=True)
+
+
+class CsvNodeReader(NodeReader):
+    """
+    CSV 读取器：按块流式读取，内存占用与批次大小成正比
+    """
+    extensions = ('.csv', '.txt')
+    description = "CSV Files"
+
+    def iter_batches(self):
+        for chunk in pd.read_csv(self.filepath, usecols=self.columns, chunksize=self.batch_size):
+            yield chunk
+
+
+class ParquetNodeReader(NodeReader):
+    """
+    Parquet 读取器：只读取所需的列，文件以内存映射方式打开
+    """
+    extensions = ('.parquet', '.pq')
+    description = "Parquet Files"
+
+    def iter_batches(self):
+        import pyarrow.parquet as pq  # 可选依赖，只在读取 Parquet 时需要
+        parquet_file = pq.ParquetFile(self.filepath, memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=self.batch_size, columns=self.columns):
+            yield batch.to_pandas()
+
+
+class ArrowNodeReader(NodeReader):
+    """
+    Arrow IPC（Feather）读取器：以内存映射方式打开，逐个记录批次读取所需的列
+    """
+    extensions = ('.arrow', '.feather', '.ipc')
+    description = "Arrow Files"
+
+    def iter_batches(self):
+        import pyarrow as pa  # 可选依赖，只在读取 Arrow 文件时需要
+        with pa.memory_map(self.filepath, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index).select(self.columns)
+                for offset in range(0, batch.num_rows, self.batch_size):
+                    yield batch.slice(offset, self.batch_size).to_pandas()
+
+
+class ExcelNodeReader(NodeReader):
+    """
+    Excel 读取器：Excel 无法流式解析，整表读取所需的列后再分批返回
+    """
+    extensions = ('.xls', '.xlsx')
+    description = "Excel Files"
+
+    def iter_batches(self):
+        df = pd.read_excel(self.filepath, usecols=self.columns)
+        for offset in range(0, len(df), self.batch_size):
+            yield df.iloc[offset:offset + self.batch_size]
+
+
+NODE_READERS = [CsvNodeReader, ParquetNodeReader, ArrowNodeReader, ExcelNodeReader]  # 已注册的读取器
+
+
+def register_node_reader(reader_class: type) -> type:
+    """
+    注册新的节点读取器，可作为类装饰器使用
+    参数:
+        reader_class (type): NodeReader 子类
+    返回:
+        type: 原样返回的读取器类
+    """
+    NODE_READERS.insert(0, reader_class)  # 后注册的读取器优先
+    return reader_class
+
+
+def get_node_reader(filepath: str, columns: list, batch_size: int = 200000) -> NodeReader:
+    """
+    按文件扩展名选择节点读取器
+    参数:
+        filepath (str): 节点文件路径
+        columns (list): 需要读取的列
+        batch_size (int): 每批读取的行数
+    返回:
+        NodeReader: 读取器实例
+    """
+    extension = os.path.splitext(filepath)[1].lower()
+    for reader_class in NODE_READERS:
+        if extension in reader_class.extensions:
+            return reader_class(filepath, columns, batch_size)
+    raise ValueError(f"Unsupported node file format: {extension}")
+
+
+def node_file_filter() -> str:
+    """
+    生成文件对话框使用的节点文件过滤器
+    返回:
+        str: 例如 "Node Files (*.csv *.xls);;CSV Files (*.csv)"
+    """
+    patterns = [' '.join(f"*{extension}" for extension in reader.extensions) for reader in NODE_READERS]
+    filters = [f"Node Files ({' '.join(patterns)})"]
+    filters += [f"{reader.description} ({pattern})" for reader, pattern in zip(NODE_READERS, patterns)]
+    return ';;'.join(filters)
@@ -0,0 +1,148 @@
+# core/projectFile.py
+# 功能：读写项目文件（zip 格式），保存会话状态、数据源引用，以及可选的内嵌几何缓存和节点数组
+
+import os
+import io
+import json
+import shutil
+import zipfile
+import logging
+import numpy as np
+
+PROJECT_VERSION = 1  # 项目文件格式版本
+PROJECT_EXTENSION = '.tgisproj'  # 项目文件扩展名
+PROJECT_FILTER = f"PyGISS Projects (*{PROJECT_EXTENSION})"  # 文件对话框的过滤器
+
+
+def source_reference(project_path: str, filepath: str) -> dict:
+    """
+    生成数据源引用：同时记录相对于项目文件的路径和绝对路径，项目目录整体移动后仍能找到数据源
+    参数:
+        project_path (str): 项目文件路径
+        filepath (str): 数据源路径
+    返回:
+        dict: {'path': 相对路径, 'absolute_path': 绝对路径}
+    """
+    absolute_path = os.path.abspath(filepath)
+    try:
+        relative_path = os.path.relpath(absolute_path, os.path.dirname(os.path.abspath(project_path)))
+    except ValueError:
+        relative_path = absolute_path  # Windows 下位于不同驱动器时无法使用相对路径
+    return {'path': relative_path.replace(os.sep, '/'), 'absolute_path': absolute_path}
+
+
+def resolve_source(project_path: str, reference: dict) -> str:
+    """
+    解析数据源引用，优先使用相对路径
+    参数:
+        project_path (str): 项目文件路径
+        reference (dict): source_reference 生成的引用
+    返回:
+        str: 存在的数据源路径
+    """
+    candidates = [os.path.join(os.path.dirname(os.path.abspath(project_path)), reference['path']),
+                  reference.get('absolute_path')]
+    for candidate in candidates:
+        if candidate and os.path.exists(candidate):
+            return os.path.normpath(candidate)
+    raise FileNotFoundError(f"Project source not found: {reference['path']}")
+
+
+def save_project(path: str, state: dict, arrays: dict = None, cache_dirs: dict = None) -> None:
+    """
+    写出项目文件（先写入临时文件再改名）
+    参数:
+        path (str): 项目文件路径
+        state (dict): 会话状态，写入 project.json
+        arrays (dict): 需要内嵌的数组，名称 -> np.ndarray
+        cache_dirs (dict): 需要内嵌的图层缓存目录（LayerCache.entry_dir），名称 -> 目录
+    """
+    state = dict(state, version=PROJECT_VERSION)
+    temporary = f"{path}.tmp-{os.getpid()}"
+    try:
+        # 数组本身已是二进制，不再压缩，打开项目时可以直接读取
+        with zipfile.ZipFile(temporary, 'w', zipfile.ZIP_STORED) as archive:
+            archive.writestr('project.json', json.dumps(state, ensure_ascii=False, indent=2))
+            for name, array in (arrays or {}).items():
+                buffer = io.BytesIO()
+                np.save(buffer, np.ascontiguousarray(array))
+                archive.writestr(f"arrays/{name}.npy", buffer.getvalue())
+            for cache_name, cache_dir in (cache_dirs or {}).items():
+                for root, _, files in os.walk(cache_dir):
+                    for name in files:
+                        filepath = os.path.join(root, name)
+                        arcname = os.path.relpath(filepath, cache_dir).replace(os.sep, '/')
+                        archive.write(filepath, f"cache/{cache_name}/{arcname}")
+        os.replace(temporary, path)
+        logging.info(f"Saved project to {path}.")
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def load_project(path: str) -> dict:
+    """
+    读取项目文件中的会话状态
+    参数:
+        path (str): 项目文件路径
+    返回:
+        dict: 会话状态
+    """
+    with zipfile.ZipFile(path) as archive:
+        state = json.loads(archive.read('project.json').decode('utf-8'))
+    if state.get('version', 0) > PROJECT_VERSION:
+        raise ValueError(f"Project file version {state['version']} is newer than supported ({PROJECT_VERSION})")
+    return state
+
+
+def load_project_array(path: str, name: str) -> np.ndarray:
+    """
+    读取项目文件中内嵌的数组
+    参数:
+        path (str): 项目文件路径
+        name (str): 数组名称
+    返回:
+        np.ndarray: 数组，不存在时返回 None
+    """
+    with zipfile.ZipFile(path) as archive:
+        try:
+            data = archive.read(f"arrays/{name}.npy")
+        except KeyError:
+            return None
+    return np.load(io.BytesIO(data), allow_pickle=False)
+
+
+def extract_embedded_cache(path: str, target_dir: str, name: str) -> bool:
+    """
+    把内嵌的图层缓存解压到缓存目录（目标目录已存在时不覆盖）
+    参数:
+        path (str): 项目文件路径
+        target_dir (str): 目标缓存目录（LayerCache.entry_dir）
+        name (str): 内嵌缓存的名称（save_project 的 cache_dirs 中的键）
+    返回:
+        bool: 是否解压了缓存
+    """
+    if os.path.exists(os.path.join(target_dir, 'layer.json')):
+        return False
+    temporary = f"{target_dir}.tmp-{os.getpid()}"
+    try:
+        with zipfile.ZipFile(path) as archive:
+            prefix = f"cache/{name}/"
+            members = [member for member in archive.namelist()
+                       if member.startswith(prefix) and not member.endswith('/')]
+            if not members:
+                return False
+            for member in members:
+                target = os.path.join(temporary, *member[len(prefix):].split('/'))
+                if not os.path.abspath(target).startswith(os.path.abspath(temporary) + os.sep):
+                    raise ValueError(f"Invalid cache entry in project: {member}")
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with archive.open(member) as source, open(target, 'wb') as destination:
+                    shutil.copyfileobj(source, destination)
+        if os.path.exists(target_dir):
+            shutil.rmtree(target_dir)  # 不完整的缓存
+        os.replace(temporary, target_dir)
+        logging.info(f"Extracted embedded layer cache to {target_dir}.")
+        return True
+    finally:
+        shutil.rmtree(temporary, ignore_errors=True)
@@ -0,0 +1,165 @@
+# core/projection.py
+# 功能：提供坐标批量投影转换，大数组按块在多个线程中并行转换（pyproj 转换时释放 GIL），
+#       以及地图和节点共用的 CRS 和 Transformer 对象池
+
+import os
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pyproj import CRS, Transformer
+
+TRANSFORM_CHUNK_SIZE = 1 << 20  # 并行转换时每块的坐标数量，小于该数量的数组直接一次转换
+MAX_POOLED_TRANSFORMERS = 32  # 对象池中最多保留的 Transformer 数量
+MAX_POOLED_CRS = 64  # 对象池中最多保留的 CRS 数量
+
+
+def default_transform_workers() -> int:
+    """
+    默认的转换线程数：环境变量 PYGISS_TRANSFORM_THREADS，否则为 CPU 核数
+    """
+    try:
+        return max(1, int(os.environ.get('PYGISS_TRANSFORM_THREADS') or os.cpu_count() or 1))
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+def transform_coords(transformer, coords: np.ndarray, workers: int = None,
+                     chunk_size: int = TRANSFORM_CHUNK_SIZE) -> np.ndarray:
+    """
+    批量转换坐标：坐标较多时把 x、y 复制到连续数组中按块原地转换，各线程写入同一块内存，不复制或序列化数据块
+    参数:
+        transformer (Transformer): pyproj 转换器（pyproj 为每个线程维护独立的内部对象，可在线程间共享）
+        coords (np.ndarray): (N, 2) 坐标数组（可以是只读的内存映射）
+        workers (int): 线程数，None 表示使用 default_transform_workers()，1 表示不并行
+        chunk_size (int): 每块的坐标数量
+    返回:
+        np.ndarray: (N, 2) 转换后的坐标数组
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    workers = default_transform_workers() if workers is None else max(1, int(workers))
+    chunks = range(0, len(coords), max(1, chunk_size))
+    if workers == 1 or len(chunks) <= 1:
+        xx, yy = transformer.transform(coords[:, 0], coords[:, 1])  # 整个数组一次转换
+        return np.column_stack((xx, yy))
+    xx = np.array(coords[:, 0], order='C')  # 复制到连续数组，转换结果直接写回，不修改输入
+    yy = np.array(coords[:, 1], order='C')
+
+    def transform_chunk(start: int) -> None:
+        end = start + chunk_size
+        transformer.transform(xx[start:end], yy[start:end], inplace=True)
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        list(executor.map(transform_chunk, chunks))  # 取出结果以抛出线程中的异常
+    logging.debug(f"Transformed {len(coords)} coordinates in {len(chunks)} chunks on {workers} threads.")
+    return np.column_stack((xx, yy))
+
+
+class ProjectionPool:
+    """
+    CRS 和 Transformer 对象池：创建 pyproj 对象的开销较大，相同参数的对象只创建一次并按最近使用淘汰
+    线程安全：对象在锁外创建（不同参数的对象可以同时创建），pyproj 对象本身可以在线程间共享
+    """
+    def __init__(self, max_transformers: int = MAX_POOLED_TRANSFORMERS, max_crs: int = MAX_POOLED_CRS):
+        """
+        参数:
+            max_transformers (int): 最多保留的 Transformer 数量
+            max_crs (int): 最多保留的 CRS 数量（EPSG 代码的查询结果使用相同的上限）
+        """
+        self.max_transformers = max_transformers
+        self.max_crs = max_crs
+        self._lock = threading.Lock()
+        self._transformers = OrderedDict()  # (源 CRS, 目标 CRS, always_xy) -> Transformer
+        self._crs = OrderedDict()  # CRS 定义（EPSG 代码、WKT 等） -> CRS
+        self._epsg = OrderedDict()  # CRS 定义 -> EPSG 代码（无法识别时为 None）
+
+    def get_transformer(self, src, dst, always_xy: bool = True) -> Transformer:
+        """
+        获取坐标转换器
+        参数:
+            src: 源坐标参考系（字符串或 CRS）
+            dst: 目标坐标参考系（字符串或 CRS）
+            always_xy (bool): 是否始终按 (x, y)（经度, 纬度）顺序处理坐标
+        返回:
+            Transformer: 转换器
+        """
+        key = (self._key(src), self._key(dst), bool(always_xy))
+        return self._get(self._transformers, key, self.max_transformers,
+                         lambda: Transformer.from_crs(self.get_crs(src), self.get_crs(dst), always_xy=always_xy))
+
+    def get_crs(self, definition) -> CRS:
+        """
+        获取坐标参考系对象
+        参数:
+            definition: EPSG 代码、WKT、PROJ 字符串或 CRS
+        返回:
+            CRS: 坐标参考系
+        """
+        if isinstance(definition, CRS):
+            return definition
+        return self._get(self._crs, self._key(definition), self.max_crs, lambda: CRS.from_user_input(definition))
+
+    def get_epsg(self, definition):
+        """
+        查询坐标参考系对应的 EPSG 代码（查询 PROJ 数据库较慢，结果一并缓存）
+        参数:
+            definition: EPSG 代码、WKT、PROJ 字符串或 CRS
+        返回:
+            int: EPSG 代码，无法识别时返回 None
+        """
+        return self._get(self._epsg, self._key(definition), self.max_crs,
+                         lambda: self.get_crs(definition).to_epsg())
+
+    def clear(self) -> None:
+        """
+        清空对象池
+        """
+        with self._lock:
+            self._transformers.clear()
+            self._crs.clear()
+            self._epsg.clear()
+
+    @staticmethod
+    def _key(definition) -> str:
+        return definition.srs if isinstance(definition, CRS) else str(definition)
+
+    def _get(self, cache: OrderedDict, key, limit: int, create):
+        """
+        从缓存中取出对象，不存在时创建并按最近使用淘汰最旧的对象
+        """
+        with self._lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        value = create()  # 在锁外创建，创建失败时抛出异常且不缓存
+        with self._lock:
+            value = cache.setdefault(key, value)  # 其他线程已创建时使用先放入的对象
+            cache.move_to_end(key)
+            while len(cache) > limit:
+                cache.popitem(last=False)
+        return value
+
+
+_pool = ProjectionPool()  # 进程内共享的对象池
+
+
+def get_transformer(src, dst, always_xy: bool = True) -> Transformer:
+    """
+    从共享对象池获取坐标转换器，参数见 ProjectionPool.get_transformer
+    """
+    return _pool.get_transformer(src, dst, always_xy)
+
+
+def get_crs(definition) -> CRS:
+    """
+    从共享对象池获取坐标参考系对象
+    """
+    return _pool.get_crs(definition)
+
+
+def get_epsg(definition):
+    """
+    从共享对象池查询坐标参考系对应的 EPSG 代码
+    """
+    return _pool.get_epsg(definition)
@@ -0,0 +1,221 @@
+# core/rasterWriter.py
+# 功能：逐行流式写出 RGBA 栅格（PNG 或带地理参考的 GeoTIFF）以及世界文件，导出超大图像时内存占用只与一个条带有关
+
+import struct
+import zlib
+import numpy as np
+
+
+class RasterWriter:
+    """
+    流式栅格写出器的基类：按从上到下的顺序多次调用 write_rows，最后调用 close
+    """
+    def __init__(self, path: str, width: int, height: int, dpi: float = None):
+        """
+        参数:
+            path (str): 输出文件路径
+            width (int): 图像宽度（像素）
+            height (int): 图像高度（像素）
+            dpi (float): 写入文件的分辨率，None 表示不写
+        """
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Invalid raster size: {width}x{height}")
+        self.path = path
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.rows_written = 0  # 已写出的行数
+        self.file = open(path, 'wb')
+
+    def write_rows(self, rows: np.ndarray) -> None:
+        """
+        写出一个条带
+        参数:
+            rows (np.ndarray): (行数, width, 4) 的 uint8 RGBA 数组
+        """
+        if rows.shape[1:] != (self.width, 4) or rows.dtype != np.uint8:
+            raise ValueError(f"Expected uint8 rows of shape (n, {self.width}, 4), got {rows.dtype} {rows.shape}")
+        if self.rows_written + len(rows) > self.height:
+            raise ValueError("More rows written than the raster height")
+        self._write_rows(np.ascontiguousarray(rows))
+        self.rows_written += len(rows)
+
+    def _write_rows(self, rows: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """
+        写出文件尾并关闭文件
+        """
+        try:
+            if self.rows_written != self.height:
+                raise ValueError(f"Only {self.rows_written} of {self.height} rows were written")
+            self._finish()
+        finally:
+            self.file.close()
+
+    def _finish(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()  # 出错时不写文件尾
+
+
+class PngWriter(RasterWriter):
+    """
+    流式 PNG 写出器：每个条带压缩后立即作为 IDAT 块写出
+    """
+    def __init__(self, path: str, width: int, height: int, dpi: float = None, level: int = 6):
+        super().__init__(path, width, height, dpi)
+        self.compressor = zlib.compressobj(level)
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        self.write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))  # 8 位 RGBA
+        if dpi:
+            pixels_per_meter = int(round(dpi / 0.0254))
+            self.write_chunk(b'pHYs', struct.pack('>IIB', pixels_per_meter, pixels_per_meter, 1))
+
+    def write_chunk(self, chunk_type: bytes, data: bytes) -> None:
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type)) & 0xffffffff))
+
+    def _write_rows(self, rows: np.ndarray) -> None:
+        scanlines = np.zeros((len(rows), self.width * 4 + 1), dtype=np.uint8)  # 每行前加过滤类型 0
+        scanlines[:, 1:] = rows.reshape(len(rows), -1)
+        data = self.compressor.compress(scanlines)
+        if data:
+            self.write_chunk(b'IDAT', data)
+
+    def _finish(self) -> None:
+        self.write_chunk(b'IDAT', self.compressor.flush())
+        self.write_chunk(b'IEND', b'')
+
+
+class GeoTiffWriter(RasterWriter):
+    """
+    流式 GeoTIFF 写出器：RGBA 条带逐个 Deflate 压缩后写出，目录（IFD）在所有条带之后写出
+    """
+    # TIFF 字段类型：(类型编号, struct 格式)
+    SHORT, LONG, RATIONAL, DOUBLE = (3, 'H'), (4, 'I'), (5, 'II'), (12, 'd')
+
+    def __init__(self, path: str, width: int, height: int, dpi: float = None, geotransform: tuple = None,
+                 epsg: int = None, geographic: bool = False, rows_per_strip: int = 64):
+        """
+        参数:
+            geotransform (tuple): (左上角 x, 像素宽度, 左上角 y, 像素高度（负值）)
+            epsg (int): 坐标参考系的 EPSG 代码
+            geographic (bool): 坐标参考系是否为地理坐标系
+            rows_per_strip (int): 每个压缩条带的行数
+        """
+        super().__init__(path, width, height, dpi)
+        self.geotransform = geotransform
+        self.epsg = epsg
+        self.geographic = geographic
+        self.rows_per_strip = rows_per_strip
+        self.strip_offsets = []  # 每个条带在文件中的位置
+        self.strip_byte_counts = []  # 每个条带压缩后的字节数
+        self.pending = np.empty((0, width, 4), dtype=np.uint8)  # 不足一个条带的行
+        self.file.write(b'II*\x00' + struct.pack('<I', 0))  # 小端序，目录位置在结束时回填
+
+    def _write_rows(self, rows: np.ndarray) -> None:
+        self.pending = np.concatenate((self.pending, rows)) if len(self.pending) else rows
+        while len(self.pending) >= self.rows_per_strip:
+            self.write_strip(self.pending[:self.rows_per_strip])
+            self.pending = self.pending[self.rows_per_strip:]
+
+    def write_strip(self, rows: np.ndarray) -> None:
+        data = zlib.compress(np.ascontiguousarray(rows), 6)
+        self.strip_offsets.append(self.file.tell())
+        self.strip_byte_counts.append(len(data))
+        self.file.write(data)
+        if self.file.tell() >= 2 ** 32:
+            raise ValueError("GeoTIFF output exceeds 4 GB; use PNG or a smaller size")
+
+    def geo_tags(self) -> list:
+        """
+        地理参考标签：像素大小、左上角坐标和 GeoKey 目录
+        """
+        if self.geotransform is None:
+            return []
+        x0, pixel_width, y0, pixel_height = self.geotransform
+        tags = [(33550, self.DOUBLE, [pixel_width, abs(pixel_height), 0.0]),  # ModelPixelScale
+                (33922, self.DOUBLE, [0.0, 0.0, 0.0, x0, y0, 0.0])]  # ModelTiepoint
+        keys = [(1024, 0, 1, 2 if self.geographic else 1),  # GTModelType
+                (1025, 0, 1, 1)]  # GTRasterType = PixelIsArea
+        if self.epsg:
+            keys.append((2048 if self.geographic else 3072, 0, 1, self.epsg))  # GeographicType / ProjectedCSType
+        directory = [1, 1, 0, len(keys)] + [value for key in keys for value in key]
+        tags.append((34735, self.SHORT, directory))  # GeoKeyDirectory
+        return tags
+
+    def _finish(self) -> None:
+        if len(self.pending):
+            self.write_strip(self.pending)
+        if self.file.tell() % 2:
+            self.file.write(b'\x00')  # 目录必须从偶数位置开始
+        tags = [
+            (256, self.LONG, [self.width]),  # ImageWidth
+            (257, self.LONG, [self.height]),  # ImageLength
+            (258, self.SHORT, [8, 8, 8, 8]),  # BitsPerSample
+            (259, self.SHORT, [8]),  # Compression = Deflate
+            (262, self.SHORT, [2]),  # Photometric = RGB
+            (273, self.LONG, self.strip_offsets),  # StripOffsets
+            (277, self.SHORT, [4]),  # SamplesPerPixel
+            (278, self.LONG, [self.rows_per_strip]),  # RowsPerStrip
+            (279, self.LONG, self.strip_byte_counts),  # StripByteCounts
+            (284, self.SHORT, [1]),  # PlanarConfiguration = Chunky
+            (338, self.SHORT, [2]),  # ExtraSamples = 非预乘的 Alpha
+        ]
+        if self.dpi:
+            resolution = [int(round(self.dpi * 100)), 100]
+            tags += [(282, self.RATIONAL, resolution), (283, self.RATIONAL, resolution),
+                     (296, self.SHORT, [2])]  # ResolutionUnit = 英寸
+        tags = sorted(tags + self.geo_tags(), key=lambda tag: tag[0])
+
+        ifd_offset = self.file.tell()
+        data_offset = ifd_offset + 2 + 12 * len(tags) + 4  # 超过 4 字节的取值写在目录之后
+        entries, extra = [], b''
+        for tag, (type_id, fmt), values in tags:
+            count = len(values) // 2 if type_id == 5 else len(values)
+            data = struct.pack('<' + fmt * count, *values) if type_id != 5 else struct.pack(f'<{len(values)}I', *values)
+            if len(data) <= 4:
+                entries.append(struct.pack('<HHI', tag, type_id, count) + data.ljust(4, b'\x00'))
+            else:
+                entries.append(struct.pack('<HHII', tag, type_id, count, data_offset + len(extra)))
+                extra += data + (b'\x00' if len(data) % 2 else b'')
+        self.file.write(struct.pack('<H', len(tags)) + b''.join(entries) + struct.pack('<I', 0) + extra)
+        self.file.seek(4)
+        self.file.write(struct.pack('<I', ifd_offset))  # 回填目录位置
+
+
+def world_file_path(path: str) -> str:
+    """
+    世界文件路径：扩展名取首尾字母加 w，例如 .png -> .pgw，.tif -> .tfw
+    """
+    base, extension = path.rsplit('.', 1) if '.' in path.replace('\\', '/').rsplit('/', 1)[-1] else (path, 'img')
+    return f"{base}.{extension[0]}{extension[-1]}w"
+
+
+def write_world_file(path: str, geotransform: tuple) -> str:
+    """
+    写出栅格的世界文件
+    参数:
+        path (str): 栅格文件路径
+        geotransform (tuple): (左上角 x, 像素宽度, 左上角 y, 像素高度（负值）)
+    返回:
+        str: 世界文件路径
+    """
+    x0, pixel_width, y0, pixel_height = geotransform
+    world_path = world_file_path(path)
+    with open(world_path, 'w') as f:
+        # 世界文件记录的是左上角像素中心的坐标
+        values = (pixel_width, 0.0, 0.0, pixel_height, x0 + pixel_width / 2, y0 + pixel_height / 2)
+        f.write('\n'.join(repr(float(value)) for value in values) + '\n')
+    return world_path
@@ -3,12 +3,16 @@
 
 import sys
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QMessageBox, QVBoxLayout, QWidget, QDockWidget, QTextEdit
+    QApplication, QMainWindow, QMessageBox, QVBoxLayout, QWidget, QDockWidget, QTextEdit, QTableView, QHeaderView,
+    QFileDialog
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QItemSelection, QItemSelectionModel
+import numpy as np
 import logging
 from ui.menu import TGISMenu
 from ui.mapWidget import MapWidget
+from ui.attributeTableModel import AttributeTableModel
+from core.projectFile import PROJECT_EXTENSION, PROJECT_FILTER
 from utils.utils import show_error_message
 
 
@@ -48,6 +52,8 @@ class TGIS_MainWindow(QMainWindow):
 
         # 创建属性表窗口
         self.attribute_table_window = None
+        self.attribute_table_view = None  # 属性表视图
+        self.syncing_selection = False  # 正在把地图选择同步到属性表
 
         # 连接菜单信号和槽
         self.menu.import_shapefile_clicked.connect(self.import_shapefile)
@@ -58,19 +64,37 @@ class TGIS_MainWindow(QMainWindow):
         self.menu.node_size_changed.connect(self.update_node_size)
         self.menu.output_button_clicked.connect(self.handle_output_button_clicked)
         self.menu.attribute_query_clicked.connect(self.perform_attribute_query)
+        self.menu.cancel_load_clicked.connect(self.map_widget.cancel_shapefile_load)
+        self.menu.tiled_rendering_toggled.connect(self.map_widget.set_tiled_mode)
+        self.menu.open_project_clicked.connect(self.open_project)
+        self.menu.save_project_clicked.connect(self.save_project)
+        self.menu.precompute_projections_toggled.connect(
+            lambda enabled: self.map_widget.set_precompute_projections(self.menu.projection_codes() if enabled else []))
 
         # 连接地图部件的信号和槽
         self.map_widget.shapefile_imported.connect(self.menu.enable_buttons)
         self.map_widget.attribute_table_requested.connect(self.show_attribute_table)
+        self.map_widget.features_selected.connect(self.select_table_rows)
         self.map_widget.feature_attributes_updated.connect(self.update_attribute_info)
+        self.map_widget.shapefile_load_started.connect(self.menu.on_load_started)
+        self.map_widget.shapefile_load_progress.connect(self.menu.update_load_progress)
+        self.map_widget.shapefile_load_finished.connect(self.menu.on_load_finished)
+        self.map_widget.layers_changed.connect(self.menu.set_layers)
+        self.map_widget.emit_layers_changed()  # 显示初始的空图层
+
+        # 连接图层列表的信号和槽
+        self.menu.layer_visibility_changed.connect(self.map_widget.set_layer_visible)
+        self.menu.layer_moved.connect(self.map_widget.move_layer)
+        self.menu.layer_removed.connect(self.map_widget.remove_layer)
+        self.menu.active_layer_changed.connect(self.map_widget.set_active_layer)
+        self.menu.layer_color_changed.connect(lambda index, color: self.map_widget.set_layer_style(index, fill=color))
 
     def import_shapefile(self) -> None:
         """
-        导入 Shapefile 文件
+        导入 Shapefile 文件（后台加载完成后由 shapefile_imported 信号启用节点导入）
         """
         try:
             self.map_widget.import_shapefile()
-            self.menu.import_nodes_button.setEnabled(True)
         except Exception as e:
             logging.error(f"Error importing shapefile: {e}")
             show_error_message(self, "导入错误", f"无法导入 Shapefile:\n{e}")
@@ -119,6 +143,53 @@ class TGIS_MainWindow(QMainWindow):
         """
         self.map_widget.update_node_size(value)
 
+    def open_project(self, path: str = None) -> None:
+        """
+        打开项目文件，恢复图层、投影、节点、视图和高亮
+        参数:
+            path (str): 项目文件路径，默认弹出文件对话框
+        """
+        if not path:
+            path, _ = QFileDialog.getOpenFileName(self, "Open Project", "", PROJECT_FILTER)
+            if not path:
+                return
+        try:
+            state = self.map_widget.open_project(path)
+            self.menu.apply_project_state(state)
+            self.attribute_info_text.clear()
+            self.setWindowTitle(f"地图应用 - {path}")
+        except Exception as e:
+            logging.error(f"Error opening project: {e}")
+            show_error_message(self, "项目错误", f"无法打开项目:\n{e}")
+
+    def save_project(self, path: str = None, embed: bool = None) -> None:
+        """
+        保存项目文件
+        参数:
+            path (str): 项目文件路径，默认弹出文件对话框
+            embed (bool): 是否内嵌几何缓存和节点坐标，默认询问用户
+        """
+        if self.map_widget.map_data.source is None and len(self.map_widget.node_data.nodes) == 0:
+            show_error_message(self, "项目错误", "当前没有可保存的图层或节点。")
+            return
+        if not path:
+            path, _ = QFileDialog.getSaveFileName(self, "Save Project", "", PROJECT_FILTER)
+            if not path:
+                return
+            if not path.lower().endswith(PROJECT_EXTENSION):
+                path += PROJECT_EXTENSION
+        if embed is None:
+            reply = QMessageBox.question(
+                self, "保存项目", "是否在项目文件中内嵌几何缓存和节点坐标？\n内嵌后文件更大，但在其他电脑上打开更快。",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            embed = reply == QMessageBox.Yes
+        try:
+            self.map_widget.save_project(path, embed=embed)
+            self.setWindowTitle(f"地图应用 - {path}")
+        except Exception as e:
+            logging.error(f"Error saving project: {e}")
+            show_error_message(self, "项目错误", f"无法保存项目:\n{e}")
+
     def handle_output_button_clicked(self) -> None:
         """
         处理输出按钮的点击事件
@@ -130,6 +201,10 @@ class TGIS_MainWindow(QMainWindow):
             self.export_to_pdf()
         elif format.upper() == "JPG":
             self.export_to_jpeg()
+        elif format.upper() == "GEOTIFF":
+            self.export_to_geotiff()
+        elif format.upper() == "SVG":
+            self.export_to_svg()
         else:
             show_error_message(self, "导出错误", f"不支持的导出格式: {format}")
 
@@ -155,6 +230,26 @@ class TGIS_MainWindow(QMainWindow):
             logging.error(f"Error exporting to PDF: {e}")
             show_error_message(self, "导出错误", f"无法导出地图为 PDF:\n{e}")
 
+    def export_to_svg(self) -> None:
+        """
+        导出地图为 SVG 文件
+        """
+        try:
+            self.map_widget.export_to_svg()
+        except Exception as e:
+            logging.error(f"Error exporting to SVG: {e}")
+            show_error_message(self, "导出错误", f"无法导出地图为 SVG:\n{e}")
+
+    def export_to_geotiff(self) -> None:
+        """
+        导出地图为 GeoTIFF 文件
+        """
+        try:
+            self.map_widget.export_to_geotiff()
+        except Exception as e:
+            logging.error(f"Error exporting to GeoTIFF: {e}")
+            show_error_message(self, "导出错误", f"无法导出地图为 GeoTIFF:\n{e}")
+
     def export_to_jpeg(self) -> None:
         """
         导出地图为 JPEG 文件
@@ -181,53 +276,87 @@ class TGIS_MainWindow(QMainWindow):
             logging.error(f"Error performing attribute query: {e}")
             show_error_message(self, "查询错误", f"执行属性查询时发生错误:\n{e}")
 
-    def show_attribute_table(self, records: list) -> None:
+    def show_attribute_table(self, feature_ids=None) -> None:
         """
-        显示属性表
+        显示属性表，已打开时原地更新显示的要素
         参数:
-            records (list): 属性记录列表
+            feature_ids: 要显示的要素索引，None 表示全部要素
         """
         try:
-            if not records:
+            map_data = self.map_widget.map_data
+            if len(map_data.records) == 0:
                 show_error_message(self, "属性表", "当前没有可用的属性表。")
                 return
 
-            # 如果属性表窗口已存在，先关闭它
-            if self.attribute_table_window is not None:
-                self.removeDockWidget(self.attribute_table_window)
-                self.attribute_table_window.deleteLater()
-                self.attribute_table_window = None
+            model = self.attribute_table_view.model() if self.attribute_table_view is not None else None
+            if model is not None and model.records is map_data.records:
+                model.set_feature_ids(feature_ids)  # 同一图层：只更新行，不重建表格
+                self.attribute_table_window.show()
+                self.attribute_table_window.raise_()
+                return
 
             # 创建属性表窗口
-            from PyQt5.QtWidgets import QDockWidget, QTableWidget, QTableWidgetItem
-            self.attribute_table_window = QDockWidget("属性表", self)
-            table_widget = QTableWidget()
-            table_widget.setEditTriggers(QTableWidget.NoEditTriggers)
-            table_widget.setSelectionBehavior(QTableWidget.SelectRows)
-            table_widget.setSelectionMode(QTableWidget.SingleSelection)
-
-            # 获取字段名称
-            field_names = list(records[0].keys())
-            table_widget.setColumnCount(len(field_names))
-            table_widget.setHorizontalHeaderLabels(field_names)
-
-            # 添加数据
-            table_widget.setRowCount(len(records))
-            for row, record in enumerate(records):
-                for col, field in enumerate(field_names):
-                    value = record.get(field, "")
-                    item = QTableWidgetItem(str(value))
-                    table_widget.setItem(row, col, item)
-
-            table_widget.resizeColumnsToContents()
-
-            self.attribute_table_window.setWidget(table_widget)
-            self.attribute_table_window.setAllowedAreas(Qt.BottomDockWidgetArea | Qt.TopDockWidgetArea)
-            self.addDockWidget(Qt.BottomDockWidgetArea, self.attribute_table_window)
+            if self.attribute_table_window is None:
+                self.attribute_table_window = QDockWidget("属性表", self)
+                self.attribute_table_window.setAllowedAreas(Qt.BottomDockWidgetArea | Qt.TopDockWidgetArea)
+                self.attribute_table_view = QTableView()
+                self.attribute_table_view.setEditTriggers(QTableView.NoEditTriggers)
+                self.attribute_table_view.setSelectionBehavior(QTableView.SelectRows)
+                self.attribute_table_view.setSelectionMode(QTableView.ExtendedSelection)
+                self.attribute_table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)  # 固定行高，不逐行测量
+                self.attribute_table_view.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+                self.attribute_table_window.setWidget(self.attribute_table_view)
+                self.addDockWidget(Qt.BottomDockWidgetArea, self.attribute_table_window)
+
+            # 模型只在需要显示时读取单元格
+            self.attribute_table_view.setSortingEnabled(False)
+            self.attribute_table_view.setModel(AttributeTableModel(map_data, feature_ids, self.attribute_table_view))
+            self.attribute_table_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+            self.attribute_table_view.setSortingEnabled(True)
+            self.attribute_table_view.selectionModel().selectionChanged.connect(self.on_table_selection_changed)
+            self.attribute_table_window.show()
         except Exception as e:
             logging.error(f"Error during showing attribute table: {e}")
             show_error_message(self, "属性表错误", f"显示属性表时发生错误:\n{e}")
 
+    def on_table_selection_changed(self, *args) -> None:
+        """
+        属性表中选中的行变化后，在地图上高亮对应的要素
+        """
+        if self.syncing_selection:
+            return  # 由地图选择引起的变化，不再回传
+        model = self.attribute_table_view.model()
+        rows = sorted(index.row() for index in self.attribute_table_view.selectionModel().selectedRows())
+        feature_ids = [model.feature_id(row) for row in rows]
+        items = self.map_widget.select_features(feature_ids, emit=False)
+        if items:
+            self.map_widget.centerOn(items[0])  # 把第一个选中的要素移到视图中心
+
+    def select_table_rows(self, feature_ids) -> None:
+        """
+        地图上选中要素后，在属性表中选中对应的行
+        参数:
+            feature_ids: 要素索引数组
+        """
+        if self.attribute_table_view is None or self.attribute_table_view.model() is None:
+            return
+        model = self.attribute_table_view.model()
+        rows = model.rows_of(feature_ids)
+        selection = QItemSelection()
+        last_column = model.columnCount() - 1
+        if len(rows):
+            # 连续的行合并为一个选择区间
+            breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+            for run in np.split(rows, breaks):
+                selection.select(model.index(int(run[0]), 0), model.index(int(run[-1]), last_column))
+        self.syncing_selection = True
+        try:
+            self.attribute_table_view.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect)
+            if len(rows):
+                self.attribute_table_view.scrollTo(model.index(int(rows[0]), 0))
+        finally:
+            self.syncing_selection = False
+
     def update_attribute_info(self, attributes: dict) -> None:
         """
         更新属性信息面板
@@ -246,6 +375,9 @@ class TGIS_MainWindow(QMainWindow):
         """
         reply = QMessageBox.question(self, "退出", "确定要退出程序吗？", QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
+            self.map_widget.cancel_shapefile_load(wait=True)  # 退出前停止后台加载线程
+            self.map_widget.cancel_node_load(wait=True)
+            self.map_widget.cancel_projection_precompute(wait=True)
             event.accept()
         else:
             event.ignore()
@@ -0,0 +1,9 @@
+# conftest.py
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_layer_cache(tmp_path, monkeypatch):
+    # 每个测试使用独立的缓存目录，不写入用户的 ~/.cache/pygiss，结果也不受之前运行留下的缓存影响
+    monkeypatch.setenv("PYGISS_CACHE_DIR", str(tmp_path / "pygiss-cache"))
@@ -2,10 +2,14 @@
 
 import pytest
 import os
+import pandas as pd
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QPointF, QRectF, Qt
+from PyQt5.QtGui import QColor
 from ui.mapWidget import MapWidget
 from core.mapData import MapData
 from core.nodeData import NodeData
+from ui.attributeTableModel import AttributeTableModel
 
 app = QApplication([])  # 创建应用程序实例
 
@@ -56,3 +60,321 @@ def test_projection_change():
     widget.map_data.load_shapefile(shapefile_path)
     widget.change_projection("EPSG:3395")
     assert widget.map_data.proj_string == "EPSG:3395"
+
+
+def test_one_item_per_feature():
+    widget = MapWidget(None)
+    widget.map_data = MapData()
+    shapefile_path = get_test_file_path("data", "ne_50m_admin_0_countries.shp")
+    assert os.path.exists(shapefile_path), f"Shapefile not found: {shapefile_path}"
+
+    widget.map_data.load_shapefile(shapefile_path)
+    widget.draw_map()
+    # 多部件要素只生成一个场景项，属性与要素索引对齐
+    assert len(widget.polygon_items) == len(widget.map_data.records)
+    for item in widget.polygon_items[:10]:
+        assert item.attributes == widget.map_data.records[item.feature_id]
+
+
+def test_node_layer_batched():
+    widget = MapWidget(None)
+    widget.node_data.set_nodes(pd.DataFrame({'Longitude': [2.35, 151.2, 'n/a'], 'Latitude': [48.85, -33.87, 0.0]}))
+    widget.node_data.set_projection('EPSG:4326', 'EPSG:4326')
+    widget.draw_nodes()
+    # 所有节点由一个图层项绘制，无效坐标被跳过
+    assert len(widget.node_layer) == 2
+    layer = widget.node_layer
+    widget.update_node_size(80)
+    assert widget.node_layer is layer  # 调整尺寸不重建节点
+    assert layer.node_at(QPointF(2.35, 48.85)) == 0
+    assert widget.select_nodes_in_rect(QRectF(0, -40, 160, 100)) == 2
+    widget.delete_selected_nodes()
+    assert len(widget.node_layer) == 0
+
+
+def test_attribute_table_model():
+    map_data = MapData()
+    map_data.load_shapefile(get_test_file_path("data", "ne_50m_admin_0_countries.shp"))
+    model = AttributeTableModel(map_data)
+    name_column = model.fields.index('NAME')
+    assert model.rowCount() == len(map_data.records)
+
+    model.sort(name_column, Qt.AscendingOrder)
+    names = [model.index(row, name_column).data() for row in range(model.rowCount())]
+    assert names == sorted(record['NAME'] for record in map_data.records)
+
+    # 查询结果原地更新，保留排序方式
+    model.set_feature_ids(map_data.query_attributes("CONTINENT = 'Europe'").nonzero()[0])
+    names = [model.index(row, name_column).data() for row in range(model.rowCount())]
+    assert names == sorted(record['NAME'] for record in map_data.records if record['CONTINENT'] == 'Europe')
+    assert map_data.records[model.feature_id(0)]['NAME'] == names[0]
+
+def test_attribute_table_rows_of():
+    map_data = MapData()
+    map_data.load_shapefile(get_test_file_path("data", "ne_50m_admin_0_countries.shp"))
+    model = AttributeTableModel(map_data)
+    model.sort(model.fields.index('NAME'), Qt.DescendingOrder)
+    rows = model.rows_of([0, 5])
+    assert sorted(model.feature_id(row) for row in rows) == [0, 5]
+
+
+def test_export_tiled(tmp_path):
+    from PyQt5.QtGui import QImage
+    widget = MapWidget(None)
+    widget.map_data.load_shapefile(get_test_file_path("data", "ne_50m_admin_0_countries.shp"))
+    widget.draw_map()
+    level = widget.lod_level
+
+    # 小的分块和内存上限使导出分成多个条带和多个块
+    png_path = str(tmp_path / "map.png")
+    size = widget.export_tiled(png_path, width=300, tile_size=128, memory_limit=300 * 4 * 50)
+    rect = widget.scene.itemsBoundingRect()
+    assert size == (300, round(rect.height() * 300 / rect.width()))
+    assert widget.lod_level == level  # 导出后恢复视图的细节层级
+    image = QImage(png_path)
+    assert (image.width(), image.height()) == size
+
+    with open(tmp_path / "map.pgw") as f:
+        pixel_width, _, _, pixel_height, x0, y0 = [float(line) for line in f]
+    assert pixel_width == pytest.approx(-pixel_height)
+    assert x0 == pytest.approx(rect.left() + pixel_width / 2)
+    # 按世界文件找到巴黎所在的像素，应为陆地填充色
+    paris = image.pixelColor(round((2.35 - x0) / pixel_width), round((48.85 - y0) / pixel_height))
+    assert (paris.red(), paris.green(), paris.blue()) == (0, 100, 0)
+
+    tif_path = str(tmp_path / "map.tif")
+    widget.export_tiled(tif_path, width=200, height=200, world_file=False)
+    image = QImage(tif_path)
+    assert (image.width(), image.height()) == (200, 200)
+    assert not (tmp_path / "map.tfw").exists()
+
+
+def test_export_vector(tmp_path):
+    widget = MapWidget(None)
+    widget.map_data.load_shapefile(get_test_file_path("data", "ne_50m_admin_0_countries.shp"))
+    item_count = len(widget.scene.items())
+
+    # 矢量导出直接绘制几何，不依赖视图和场景项
+    svg_path = str(tmp_path / "map.svg")
+    width, height = widget.export_vector(svg_path, page_width_mm=100, dpi=150)
+    assert width == round(100 / 25.4 * 150)
+    with open(svg_path, encoding='utf-8') as f:
+        svg = f.read()
+    assert svg.count('<path') >= len(widget.map_data.geometry_array.polygon_feature_runs)
+    assert len(widget.scene.items()) == item_count
+
+    pdf_path = str(tmp_path / "map.pdf")
+    widget.export_vector(pdf_path, page_width_mm=210, page_height_mm=297)
+    with open(pdf_path, 'rb') as f:
+        assert f.read(5) == b'%PDF-'
+
+
+def test_export_vector_deleted_nodes(tmp_path):
+    widget = MapWidget(None)
+    widget.map_data.load_shapefile(get_test_file_path("data", "ne_50m_admin_0_countries.shp"))
+    widget.node_data.set_nodes(pd.DataFrame({'Longitude': [2.35, 151.2], 'Latitude': [48.85, -33.87]}))
+    widget.node_data.set_projection('EPSG:4326', 'EPSG:4326')
+    widget.draw_nodes()
+    widget.select_nodes_in_rect(QRectF(140, -40, 20, 20))
+    widget.delete_selected_nodes()
+
+    # 已删除的节点不出现在导出结果中
+    svg_path = str(tmp_path / "nodes.svg")
+    widget.export_vector(svg_path, page_width_mm=100, dpi=96)
+    with open(svg_path, encoding='utf-8') as f:
+        assert f.read().count('<image') == 1
+
+def test_project_save_and_open(tmp_path):
+    import time
+    from core.layerCache import LayerCache
+    from core.projectFile import load_project
+    shapefile_path = get_test_file_path("data", "ne_50m_admin_0_countries.shp")
+    widget = MapWidget(None)
+    widget.resize(800, 600)
+    widget.map_data.cache = LayerCache(str(tmp_path / "cache"))
+    widget.map_data.load_shapefile(shapefile_path)
+    widget.change_projection("EPSG:3035")
+    widget.node_data.set_nodes(pd.DataFrame({'Longitude': [2.35, 4.83, 5.37], 'Latitude': [48.85, 45.76, 43.3]}))
+    widget.draw_nodes()
+    widget.node_layer.remove_nodes([1])  # 删除的节点不随项目恢复
+    widget.update_node_size(80)
+    widget.scale(8, 8)
+    widget.centerOn(QPointF(3.7e6, 2.6e6))
+    france = next(i for i, record in enumerate(widget.map_data.records) if record['NAME'] == 'France')
+    widget.select_features([france])
+
+    project_path = str(tmp_path / "session.tgisproj")
+    widget.save_project(project_path, embed=True)
+    state = load_project(project_path)
+    assert state['projection'] == "EPSG:3035" and state['highlights'] == [france]
+
+    restored = MapWidget(None)
+    restored.resize(800, 600)
+    restored.map_data.cache = LayerCache(str(tmp_path / "other_cache"))  # 模拟另一台电脑：使用内嵌的缓存
+    restored.fill_batch_size = 20
+    restored.open_project(project_path)
+    deadline = time.time() + 30
+    while restored.map_data.source is None and time.time() < deadline:
+        app.processEvents()
+    assert restored.map_data.cache.has_layer(shapefile_path)
+    assert restored.map_data.proj_string == "EPSG:3035"
+    assert restored.transform().m11() == pytest.approx(widget.transform().m11())
+    assert 0 < len(restored.polygon_items) < len(restored.map_data.features)  # 先只绘制视图范围内的要素
+    assert [item.feature_id for item in restored.highlighted_items] == [france]
+    assert restored.node_layer.node_ids.tolist() == [0, 2]
+    assert restored.node_scale_factor == pytest.approx(0.8)
+    while restored.is_filling() and time.time() < deadline:
+        app.processEvents()
+    assert len(restored.polygon_items) == len(widget.polygon_items)  # 其余要素在后台补齐
+
+
+def test_multiple_layers(tmp_path):
+    from core.layerCache import LayerCache
+    shapefile_path = get_test_file_path("data", "ne_50m_admin_0_countries.shp")
+    widget = MapWidget(None)
+    widget.resize(800, 600)
+    widget.map_data.cache = LayerCache(str(tmp_path / "cache"))
+    widget.on_shapefile_loaded(widget.map_data.read_shapefile(shapefile_path))
+    widget.change_projection("EPSG:3035")
+    widget.on_shapefile_loaded(widget.map_data.read_shapefile(shapefile_path))
+    assert len(widget.layers) == 2 and widget.active_layer is widget.layers[1]
+    bottom, top = widget.layers
+    assert top.map_data.proj_string == "EPSG:3035"  # 新图层使用当前地图的投影
+    assert len(bottom.polygon_items) == len(top.polygon_items) == len(top.map_data.records)
+    assert all(item.parentItem() is top.group for item in top.polygon_items)
+    assert top.group.zValue() > bottom.group.zValue()
+
+    # 隐藏图层只切换场景项组，要素项保持不变
+    items = list(bottom.polygon_items)
+    widget.set_layer_visible(0, False)
+    assert not bottom.group.isVisible() and not items[0].isVisible()
+    assert bottom.polygon_items == items
+    widget.set_layer_visible(0, True)
+    assert items[0].isVisible()
+
+    widget.move_layer(1, 0)
+    assert widget.layers == [top, bottom] and bottom.group.zValue() > top.group.zValue()
+    widget.set_layer_style(1, fill=QColor(Qt.red))
+    assert bottom.polygon_items[0].brush().color() == QColor(Qt.red) and bottom.polygon_items == items
+
+    widget.remove_layer(1)
+    assert widget.layers == [top] and widget.active_layer is top and bottom.group.scene() is None
+    widget.remove_layer(0)
+    assert len(widget.layers) == 1 and not widget.active_layer.has_data()  # 保留一个空图层
+
+
+def test_projection_change_in_place():
+    import numpy as np
+    widget = MapWidget(None)
+    widget.resize(800, 600)
+    widget.map_data.load_shapefile(get_test_file_path("data", "ne_50m_admin_0_countries.shp"))
+    widget.draw_map()
+    widget.node_data.set_nodes(pd.DataFrame({'Longitude': [2.35, 151.2], 'Latitude': [48.85, -33.87]}))
+    widget.draw_nodes()
+    widget.node_layer.set_selection(np.array([1]))
+    items, ocean = list(widget.polygon_items), widget.ocean_item
+    france = next(i for i, record in enumerate(widget.map_data.records) if record['NAME'] == 'France')
+    widget.select_features([france])
+    old_rect = widget.get_feature_item(france).boundingRect()
+
+    widget.change_projection("EPSG:3035")
+    # 要素项、海洋背景和节点图层原地更新，高亮和节点选择保持不变
+    assert widget.polygon_items == items and widget.ocean_item is ocean
+    assert [item.feature_id for item in widget.highlighted_items] == [france]
+    assert widget.get_feature_item(france).boundingRect() != old_rect
+    assert widget.node_layer.selected.tolist() == [False, True]
+    assert widget.node_layer.positions[0] == pytest.approx(widget.node_data.get_transformed_nodes()[0])
+
+    widget.change_projection("EPSG:3571")  # 圆形投影：海洋背景换为圆形
+    assert widget.polygon_items == items and widget.ocean_item is not ocean
+
+
+def test_node_layer_projection_round_trip():
+    import numpy as np
+    widget = MapWidget(None)
+    widget.map_data.load_shapefile(get_test_file_path("data", "ne_50m_admin_0_countries.shp"))
+    widget.draw_map()
+    widget.node_data.set_nodes(pd.DataFrame({'Longitude': [2.35, 0.0, 151.2], 'Latitude': [48.85, -90.0, -33.87]}))
+    widget.draw_nodes()
+    widget.node_layer.set_selection(np.array([1, 2]))
+
+    widget.change_projection("EPSG:3571")  # 南极点在北极方位投影中没有有限坐标，暂时不显示
+    assert len(widget.node_layer) == 2
+    assert widget.node_layer.node_ids.tolist() == [0, 1, 2]
+    assert widget.node_layer.node_at(QPointF(0, 0)) != 1
+    assert np.isfinite(widget.node_layer.boundingRect().width())
+
+    widget.change_projection("EPSG:4326")  # 投影改回后节点和选中状态都恢复
+    assert len(widget.node_layer) == 3
+    assert widget.node_layer.selected.tolist() == [False, True, True]
+    assert widget.node_layer.positions[1] == pytest.approx((0.0, -90.0))
+
+
+def test_line_features_selectable(tmp_path):
+    import shapefile
+    line_path = str(tmp_path / "rivers.shp")
+    with shapefile.Writer(line_path, shapeType=shapefile.POLYLINE) as writer:
+        writer.field('NAME', 'C')
+        writer.line([[(0.0, 0.0), (10.0, 0.0)]])
+        writer.record('A')
+        writer.line([[(0.0, 20.0), (10.0, 30.0)], [(20.0, 20.0), (30.0, 20.0)]])
+        writer.record('B')
+    widget = MapWidget(None)
+    widget.map_data.load_shapefile(line_path)
+    widget.draw_map()
+
+    # 线要素和多边形一样登记到要素登记表，可以点击、框选和从属性表高亮
+    assert widget.get_feature_item(1) is widget.line_items[1]
+    assert widget.find_feature_item_at(QPointF(25.0, 20.0)) is widget.line_items[1]
+    assert widget.find_feature_item_at(QPointF(25.0, 25.0)) is None
+    assert widget.find_feature_items_in_rect(QRectF(-1, -1, 5, 5)) == [widget.line_items[0]]
+    assert widget.select_features([1]) == [widget.line_items[1]]
+
+
+def test_node_layer_append_batches():
+    import numpy as np
+    from PyQt5.QtGui import QPixmap
+    from ui.mapWidget_components.nodeLayer import NodeLayerItem
+    layer = NodeLayerItem(QPixmap(4, 4))
+    for start in range(0, 30, 10):
+        positions = np.column_stack((np.arange(start, start + 10.0), np.zeros(10)))
+        positions[0] = np.nan  # 无效坐标保留在图层中但不显示
+        layer.append_nodes(positions, np.arange(start, start + 10))
+    assert len(layer) == 27 and layer.node_ids.tolist() == list(range(30))
+    assert layer.bounds == QRectF(1, 0, 28, 0)  # 包围盒逐批扩展
+    assert layer.node_at(QPointF(29, 0)) == 29
+
+
+def test_menu_buttons_after_load():
+    from ui.menu import TGISMenu
+    menu = TGISMenu()
+    menu.on_load_started()
+    menu.on_load_finished()  # 第一次加载失败或取消：仍然没有地图
+    assert menu.import_shapefile_button.isEnabled() and not menu.import_nodes_button.isEnabled()
+
+    menu.on_load_started()
+    menu.enable_buttons()  # 加载成功
+    menu.on_load_finished()
+    assert menu.import_nodes_button.isEnabled()
+
+    menu.on_load_started()
+    assert not menu.import_nodes_button.isEnabled()
+    menu.on_load_finished()  # 已有图层时加载失败或取消，Import Nodes 恢复启用
+    assert menu.import_nodes_button.isEnabled()
+
+
+def test_tiled_highlight_width():
+    shapefile_path = get_test_file_path("data", "ne_50m_admin_0_countries.shp")
+    widths = []
+    for tiled in (False, True):
+        widget = MapWidget(None)
+        widget.map_data.load_shapefile(shapefile_path)
+        widget.set_tiled_mode(tiled)
+        widget.draw_map()
+        items = widget.select_features([5])
+        widths.append(items[0].pen().widthF())
+        widget.clear_highlights()
+        assert items[0].pen().style() == (Qt.NoPen if tiled else Qt.SolidLine)
+    # 分块模式的透明要素项与普通模式的高亮线宽相同
+    assert widths[0] == pytest.approx(widths[1])
+    assert widths[0] < 1.0
@@ -48,3 +48,30 @@ def test_full_workflow():
     widget.node_data = node_data
     widget.draw_map()  # 绘制地图
     assert widget.scene is not None
+
+
+def test_batch_render(tmp_path):
+    from PyQt5.QtGui import QImage
+    from batchRender import run_jobs
+    shapefile_path = os.path.join(os.path.dirname(__file__), "data", "ne_50m_admin_0_countries.shp")
+    jobs = [
+        {'shapefile': shapefile_path, 'output': str(tmp_path / "world.png"), 'width': 400, 'height': 200},
+        {'shapefile': shapefile_path, 'output': str(tmp_path / "europe.jpg"), 'projection': 'EPSG:3035'},
+        {'shapefile': shapefile_path, 'output': str(tmp_path / "bad.png"), 'projection': 'EPSG:9999'},
+    ]
+    results = run_jobs(jobs, workers=1)
+    assert [error is None for _, error in results] == [True, True, False]
+    image = QImage(str(tmp_path / "world.png"))
+    assert (image.width(), image.height()) == (400, 200)
+    assert QImage(str(tmp_path / "europe.jpg")).width() == 1920
+
+    # 显式给出的格式优先于扩展名
+    jobs = [
+        {'shapefile': shapefile_path, 'output': str(tmp_path / "tiled.png"), 'format': 'tif', 'width': 100},
+        {'shapefile': shapefile_path, 'output': str(tmp_path / "vector.pdf"), 'format': 'svg', 'width': 100},
+    ]
+    assert [error for _, error in run_jobs(jobs, workers=1)] == [None, None]
+    with open(tmp_path / "tiled.png", 'rb') as f:
+        assert f.read(4) in (b'II*\x00', b'MM\x00*', b'II+\x00')
+    with open(tmp_path / "vector.pdf", encoding='utf-8') as f:
+        assert '<svg' in f.read()
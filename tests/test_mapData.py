@@ -2,7 +2,7 @@
 
 import pytest
 import os
-from core.mapData import MapData
+from core.mapData import MapData, LoadCancelledError
 from pathlib import Path
 
 def get_test_file_path(*paths):
@@ -52,3 +52,314 @@ def test_clear_map():
     map_data.clear_map()
     assert len(map_data.shapes) == 0
     assert len(map_data.records) == 0
+
+def test_projection_cache():
+    map_data = MapData()
+    shapefile_path = get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp")
+
+    map_data.load_shapefile(str(shapefile_path))
+    map_data.change_projection("EPSG:3395")
+    polygons = map_data.get_transformed_polygons()
+    assert map_data.get_transformed_polygons() is polygons  # 同一投影重复获取时复用缓存
+    map_data.change_projection("EPSG:4326")
+    map_data.get_transformed_polygons()
+    map_data.change_projection("EPSG:3395")
+    assert map_data.get_transformed_polygons() is polygons  # 切回之前的投影时不重新转换
+    map_data.clear_map()
+    assert map_data.projection_cache == {}
+
+def test_geometry_array_transform():
+    map_data = MapData()
+    shapefile_path = get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp")
+
+    map_data.load_shapefile(str(shapefile_path))
+    geometry_array = map_data.geometry_array
+    assert geometry_array.coords.dtype == "float64"
+    assert geometry_array.ring_offsets[-1] == len(geometry_array.coords)
+    map_data.change_projection("EPSG:3035")
+    projected = map_data.get_projected_geometry()
+    polygons = map_data.get_transformed_polygons()
+    assert len(polygons) == len(geometry_array.polygon_ring_ids)
+    assert polygons[0].base is projected['coords']  # 多边形坐标是转换结果的视图
+
+def test_parallel_transform():
+    import numpy as np
+    from core.projection import transform_coords
+    map_data = MapData()
+    map_data.load_shapefile(str(get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp")))
+    map_data.change_projection("EPSG:3035")
+    coords = map_data.geometry_array.coords
+    original = coords.copy()
+    serial = transform_coords(map_data.transformer, coords, workers=1)
+    parallel = transform_coords(map_data.transformer, coords, workers=4, chunk_size=1000)  # 按块在多个线程中转换
+    np.testing.assert_array_equal(serial, parallel)
+    np.testing.assert_array_equal(coords, original)  # 输入坐标不被修改
+
+
+def test_projection_pool():
+    from concurrent.futures import ThreadPoolExecutor
+    from core.projection import ProjectionPool
+    pool = ProjectionPool(max_transformers=2)
+    transformer = pool.get_transformer("EPSG:4326", "EPSG:3035")
+    assert pool.get_transformer("EPSG:4326", "EPSG:3035") is transformer  # 相同参数复用同一个对象
+    assert pool.get_transformer("EPSG:4326", "EPSG:3035", always_xy=False) is not transformer
+    pool.get_transformer("EPSG:4326", "EPSG:3395")  # 超过上限时淘汰最久未使用的对象
+    assert pool.get_transformer("EPSG:4326", "EPSG:3035") is not transformer
+    assert pool.get_epsg(pool.get_crs("EPSG:3035").to_wkt()) == 3035
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        transformers = list(executor.map(lambda _: pool.get_transformer("EPSG:4326", "EPSG:3571"), range(8)))
+    assert all(item is transformers[0] for item in transformers)
+
+    map_data = MapData()
+    map_data.change_projection("EPSG:3035")
+    first = map_data.transformer
+    map_data.change_projection("EPSG:4326")
+    map_data.change_projection("EPSG:3035")
+    assert map_data.transformer is first  # 切回之前的投影时不重新创建转换器
+
+
+def test_read_shapefile_progress_and_cancel():
+    map_data = MapData()
+    shapefile_path = get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp")
+
+    progress = []
+    layer = map_data.read_shapefile(str(shapefile_path), chunk_size=50,
+                                    progress_callback=lambda done, total: progress.append((done, total)))
+    assert len(map_data.shapes) == 0  # 解析过程不修改 MapData 的状态
+    assert progress[-1][0] == progress[-1][1] == len(layer['shapes'])
+    map_data.apply_loaded_layer(layer)
+    assert len(map_data.shapes) == len(layer['shapes'])
+
+    with pytest.raises(LoadCancelledError):
+        map_data.read_shapefile(str(shapefile_path), chunk_size=50, is_cancelled=lambda: True)
+
+def test_lazy_load_shapefile():
+    eager = MapData()
+    lazy = MapData()
+    shapefile_path = get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp")
+
+    eager.load_shapefile(str(shapefile_path), lazy=False)
+    lazy.load_shapefile(str(shapefile_path), lazy=True)
+    assert lazy.reader is not None  # 延迟加载模式下保持 Reader 打开
+    assert len(lazy.shapes) == len(eager.shapes)
+    assert len(lazy.records) == len(eager.records)
+    assert lazy.records[-1] == eager.records[-1]  # 按需从 .dbf 读取属性
+    assert lazy.shapes[5].equals(eager.shapes[5])  # 通过 .shx 索引随机读取几何
+    assert (lazy.geometry_array.coords == eager.geometry_array.coords).all()
+    lazy.clear_map()
+    assert lazy.reader is None
+
+def test_lazy_load_spills_coordinates(tmp_path, monkeypatch):
+    import tempfile
+    import numpy as np
+    import shapefile
+    from core.geometryArray import GeometryArrayBuilder
+    shapefile_path = str(get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp"))
+    eager = MapData()
+    eager.cache = None
+    eager.load_shapefile(shapefile_path, lazy=False)
+
+    # 坐标按块写入文件，内存中只保留一块
+    builder = GeometryArrayBuilder(str(tmp_path / "coords.tmp"), chunk_size=1000)
+    with shapefile.Reader(shapefile_path) as sf:
+        for index, shp in enumerate(sf.iterShapes()):
+            builder.add(index, shp.__geo_interface__)
+            assert builder._pending < 1000
+    spilled = builder.build()
+    assert isinstance(spilled.coords, np.memmap)
+    assert (spilled.coords == eager.geometry_array.coords).all()
+    assert (spilled.ring_offsets == eager.geometry_array.ring_offsets).all()
+
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "spill"))
+    (tmp_path / "spill").mkdir()
+    lazy = MapData()
+    lazy.cache = None
+    lazy.load_shapefile(shapefile_path, lazy=True)
+    assert isinstance(lazy.geometry_array.coords, np.memmap)
+    assert (lazy.geometry_array.coords == eager.geometry_array.coords).all()
+    assert not list((tmp_path / "spill").iterdir())  # 临时文件在映射后即被删除
+    lazy.clear_map()
+
+
+def test_spatial_index_queries():
+    map_data = MapData()
+    shapefile_path = get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp")
+
+    map_data.load_shapefile(str(shapefile_path))
+    part_ids = map_data.query_point(2.35, 48.85)  # 巴黎
+    assert len(part_ids) == 1
+    feature = map_data.geometry_array.part_features[part_ids[0]]
+    assert map_data.records[feature]["NAME"] == "France"
+    assert len(map_data.query_box(-10, 35, 30, 60)) > 10
+    map_data.change_projection("EPSG:3035")
+    assert map_data.get_spatial_index() is not map_data.projection_cache["EPSG:4326"]["spatial_index"]
+
+def test_lod_geometry():
+    map_data = MapData()
+    shapefile_path = get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp")
+
+    map_data.load_shapefile(str(shapefile_path))
+    full = map_data.get_lod_geometry(0)['polygons']
+    coarse = map_data.get_lod_geometry(len(map_data.lod_factors) - 1)['polygons']
+    assert len(coarse) == len(full)  # 各层级的多边形顺序和数量一致
+    assert sum(len(ring) for ring in coarse) < sum(len(ring) for ring in full) / 2
+    assert map_data.get_lod_geometry(2) is map_data.get_lod_geometry(2)  # 每个投影只简化一次
+
+def test_attribute_query_engine():
+    map_data = MapData()
+    shapefile_path = get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp")
+    map_data.load_shapefile(str(shapefile_path))
+
+    mask = map_data.query_attributes("NAME = 'France'")
+    assert mask.dtype == bool and len(mask) == len(map_data.records)
+    assert [map_data.records[i]['NAME'] for i in mask.nonzero()[0]] == ['France']
+
+    mask = map_data.query_attributes("CONTINENT IN ('Europe', 'Asia') AND POP_EST BETWEEN 1e8 AND 2e9")
+    expected = [record['CONTINENT'] in ('Europe', 'Asia') and 1e8 <= record['POP_EST'] <= 2e9
+                for record in map_data.records]
+    assert mask.tolist() == expected
+
+    mask = map_data.query_attributes("NAME LIKE 'fr%' OR POP_EST < 100")
+    assert {map_data.records[i]['NAME'] for i in mask.nonzero()[0]} >= {'France'}
+    assert (map_data.query_attributes("NAME != 'France'") == ~map_data.query_attributes("NAME = 'France'")).all()
+    with pytest.raises(ValueError):
+        map_data.query_attributes("NAME = ")
+
+def test_attribute_query_nulls():
+    from core.attributeQuery import AttributeQueryEngine
+    from core.attributeStore import AttributeStoreBuilder
+    records = [{'NAME': 'A', 'POP': 1.0}, {'NAME': None, 'POP': None}, {'NAME': 'B', 'POP': 3.0}]
+    builder = AttributeStoreBuilder([('NAME', 'C', 10, 0), ('POP', 'N', 10, 0)])
+    for record in records:
+        builder.add([record['NAME'], record['POP']])
+    for source in (records, builder.build()):
+        engine = AttributeQueryEngine(source)
+        # 空值不满足 !=、NOT 及其组合（SQL 三值逻辑）
+        assert engine.query("NAME != 'A'").tolist() == [False, False, True]
+        assert engine.query("POP <> 1").tolist() == [False, False, True]
+        assert engine.query("NOT NAME = 'A'").tolist() == [False, False, True]
+        assert engine.query("NAME NOT IN ('A')").tolist() == [False, False, True]
+        assert engine.query("NOT (POP > 2 AND NAME = 'B')").tolist() == [True, False, False]
+        assert engine.query("NAME = 'B' OR NOT POP = 1").tolist() == [False, False, True]
+        assert engine.query("NOT (POP = 1 OR NAME = 'B')").tolist() == [False, False, False]
+        assert engine.query("NOT (POP = 1 AND NAME = 'X')").tolist() == [True, False, True]
+
+def test_columnar_attribute_store():
+    import shapefile
+    map_data = MapData()
+    shapefile_path = get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp")
+    map_data.load_shapefile(str(shapefile_path))
+
+    with shapefile.Reader(str(shapefile_path)) as reader:
+        expected = [record.as_dict() for record in reader.iterRecords()]
+    assert len(map_data.records) == len(expected)
+    assert map_data.records[0] == expected[0]
+    assert map_data.records[-1] == expected[-1]
+    assert list(map_data.records)[:5] == expected[:5]
+    assert map_data.records.column('POP_EST').dtype.kind == 'f'
+
+def test_feature_registry():
+    import numpy as np
+    map_data = MapData()
+    map_data.load_shapefile(str(get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp")))
+    features = map_data.features
+
+    assert len(features) == len(map_data.records)
+    france = next(i for i, record in enumerate(map_data.records) if record['NAME'] == 'France')
+    assert features.record(france)['NAME'] == 'France'
+    parts = features.parts(france)
+    assert len(parts) > 1  # 法国包含海外领土
+    assert (map_data.geometry_array.part_features[parts] == france).all()
+    assert features.features_of_parts(parts).tolist() == [france]
+    assert features.item(france) is None
+
+def test_layer_cache(tmp_path):
+    import shutil
+    import numpy as np
+    from core.layerCache import LayerCache
+    source = get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp")
+    for extension in ('.shp', '.shx', '.dbf', '.prj', '.cpg'):
+        if source.with_suffix(extension).exists():
+            shutil.copy(source.with_suffix(extension), tmp_path / source.with_suffix(extension).name)
+    shapefile_path = str(tmp_path / source.name)
+    cache = LayerCache(str(tmp_path / "cache"))
+
+    parsed = MapData()
+    parsed.cache = cache
+    parsed.load_shapefile(shapefile_path, lazy=False)
+    assert cache.has_layer(shapefile_path)
+    parsed.change_projection("EPSG:3857")
+    expected = parsed.get_projected_geometry()['coords']  # 投影结果写入磁盘缓存
+
+    cached = MapData()
+    cached.cache = cache
+    cached.load_shapefile(shapefile_path, lazy=False)
+    assert isinstance(cached.geometry_array.coords, np.memmap)  # 从缓存以内存映射方式读取
+    assert (cached.geometry_array.coords == parsed.geometry_array.coords).all()
+    assert cached.records[-1] == parsed.records[-1]
+    assert cached.shapes[5].equals(parsed.shapes[5])
+    assert len(cached.shapes) == len(parsed.shapes)
+    cached.change_projection("EPSG:3857")
+    coords = cached.get_projected_geometry()['coords']
+    assert isinstance(coords, np.memmap)  # 投影结果也来自缓存
+    assert np.allclose(coords, expected, equal_nan=True)
+
+    stat = os.stat(shapefile_path)
+    os.utime(shapefile_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))  # 源文件修改后缓存失效
+    assert cache.has_layer(shapefile_path) is None
+    assert cache.load_projection(shapefile_path, 'utf-8', "EPSG:3857") is None
+
+
+
+def test_layer_cache_prune(tmp_path):
+    import shutil
+    from core.layerCache import LayerCache
+    source = get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp")
+    for extension in ('.shp', '.shx', '.dbf', '.prj', '.cpg'):
+        shutil.copy(source.with_suffix(extension), tmp_path / source.with_suffix(extension).name)
+    shapefile_path = str(tmp_path / source.name)
+    cache = LayerCache(str(tmp_path / "cache"))
+    map_data = MapData()
+    map_data.cache = cache
+    map_data.load_shapefile(shapefile_path, lazy=False)
+    old_entry = cache.entry_dir(shapefile_path)
+
+    stat = os.stat(shapefile_path)
+    os.utime(shapefile_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))  # 源文件修改后旧缓存被删除
+    map_data.load_shapefile(shapefile_path, lazy=False)
+    assert not os.path.exists(old_entry)
+    assert os.listdir(cache.cache_dir) == [os.path.basename(cache.entry_dir(shapefile_path))]
+
+    # 超过容量上限时删除最久未使用的缓存，刚写入的缓存保留
+    other_path = str(tmp_path / "other.shp")
+    for extension in ('.shp', '.shx', '.dbf', '.prj', '.cpg'):
+        shutil.copy(source.with_suffix(extension), tmp_path / f"other{extension}")
+    cache.max_size = 1
+    map_data.load_shapefile(other_path, lazy=False)
+    assert os.listdir(cache.cache_dir) == [os.path.basename(cache.entry_dir(other_path))]
+
+def test_layer_cache_object_values(tmp_path):
+    import datetime
+    from core.layerCache import LayerCache
+    values = [None, True, 3, 2.5, "名称", datetime.date(2020, 1, 2), datetime.datetime(2020, 1, 2, 3, 4), b"\xff"]
+    LayerCache._save_values(str(tmp_path), "0", values)
+    assert not list(tmp_path.rglob("*.npy"))  # 对象列不使用 pickle 保存
+    assert LayerCache._load_values(str(tmp_path), "0") == values
+
+def test_precompute_projections():
+    import numpy as np
+    map_data = MapData()
+    map_data.cache = None
+    map_data.load_shapefile(str(get_test_file_path("tests", "data", "ne_50m_admin_0_countries.shp")))
+    done = map_data.precompute_projections(["EPSG:3035", "EPSG:3395", "EPSG:3035"])
+    assert done == ["EPSG:3035", "EPSG:3395"]
+    precomputed = map_data.projection_cache["EPSG:3395"]
+
+    # 切换到预计算过的投影时直接使用缓存，结果与逐次转换一致
+    map_data.change_projection("EPSG:3395")
+    assert map_data.get_projected_geometry() is precomputed
+    assert map_data.get_lod_geometry(2) is precomputed['lod'][2]  # 细节层级也已简化
+    expected = map_data.geometry_array.transform(map_data.transformer)
+    np.testing.assert_allclose(precomputed['coords'], expected)
+    assert map_data.precompute_projections(["EPSG:3395"]) == []
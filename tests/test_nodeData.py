@@ -2,7 +2,10 @@
 
 import pytest
 import os
+import numpy as np
+import pandas as pd
 from core.nodeData import NodeData
+from core.nodeReaders import get_node_reader
 
 
 # 更新路径构造函数
@@ -47,3 +50,56 @@ def test_clear_nodes():
     node_data.import_nodes(node_file_path)
     node_data.clear_nodes()
     assert len(node_data.nodes) == 0
+
+
+def test_transformed_nodes_invalid_mask():
+    node_data = NodeData()
+    df = pd.DataFrame({'Longitude': [2.35, 'bad', 4.83], 'Latitude': [48.85, 45.0, 45.76], 'Name': ['Paris', '?', 'Lyon']})
+    node_data.set_nodes(df, attribute_columns=['Name'])
+    node_data.set_projection("EPSG:4326", "EPSG:3395")
+    transformed = node_data.get_transformed_nodes()
+    assert transformed.shape == (3, 2)
+    assert node_data.invalid_mask.tolist() == [False, True, False]
+    assert np.isnan(transformed[1]).all()
+    assert list(node_data.attributes['Name']) == ['Paris', '?', 'Lyon']
+
+
+def test_csv_node_reader_batches(tmp_path):
+    csv_path = tmp_path / "nodes.csv"
+    pd.DataFrame({'Longitude': np.arange(10.0), 'Latitude': np.arange(10.0), 'Extra': ['x'] * 10}).to_csv(csv_path, index=False)
+    reader = get_node_reader(str(csv_path), ['Longitude', 'Latitude'], batch_size=4)
+    batches = list(reader.iter_batches())
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert list(batches[0].columns) == ['Longitude', 'Latitude']  # 只读取需要的列
+
+    node_data = NodeData()
+    node_data.set_projection("EPSG:4326", "EPSG:3395")
+    node_data.get_transformed_nodes()
+    for batch in batches:
+        start, end = node_data.append_nodes(batch)
+    assert (start, end) == (8, 10)
+    assert node_data.get_transformed_nodes().shape == (10, 2)
+
+    node_data.import_nodes(str(csv_path))
+    assert len(node_data.nodes) == 10
+    with pytest.raises(ValueError):
+        get_node_reader("nodes.unknown", ['Longitude', 'Latitude'])
+
+
+def test_append_nodes_amortized():
+    node_data = NodeData()
+    node_data.set_projection("EPSG:4326", "EPSG:3395")
+    node_data.get_transformed_nodes()
+    capacities = set()
+    for index in range(100):
+        batch = pd.DataFrame({'Longitude': [float(index)], 'Latitude': [1.0], 'Name': [str(index)]})
+        node_data.append_nodes(batch, attribute_columns=['Name'])
+        capacities.add(node_data._nodes.capacity)
+    # 容量按倍数增长，100 批只扩容约 log2(100) 次
+    assert len(capacities) <= 8
+    assert node_data.nodes.shape == (100, 2) and node_data.nodes[-1].tolist() == [99.0, 1.0]
+    assert node_data.get_transformed_nodes().shape == (100, 2)
+    assert len(node_data.invalid_mask) == 100
+    assert list(node_data.attributes['Name'][-2:]) == ['98', '99']
+    node_data.clear_nodes()
+    assert len(node_data.nodes) == 0 and node_data.attributes is None
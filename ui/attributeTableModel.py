@@ -0,0 +1,140 @@
+# ui/attributeTableModel.py
+# 功能：提供虚拟化的属性表模型，只在视图请求时读取单元格，排序通过属性索引完成
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+import numpy as np
+
+
+class AttributeTableModel(QAbstractTableModel):
+    """
+    属性表模型：每一行对应一个要素索引，单元格内容在显示时才从 MapData.records 读取
+    """
+    def __init__(self, map_data, feature_ids=None, parent=None):
+        """
+        初始化属性表模型
+        参数:
+            map_data (MapData): 地图数据
+            feature_ids: 要显示的要素索引，None 表示全部要素
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self.map_data = map_data
+        self.records = map_data.records
+        self.fields = self.get_fields(self.records)  # 列名
+        self.feature_ids = self.normalize_ids(feature_ids)  # 每一行对应的要素索引
+        self.sort_column = -1  # 当前排序列，-1 表示按要素索引排列
+        self.sort_order = Qt.AscendingOrder
+        self._cached_row = (None, None)  # 最近读取的一条记录，同一行的多个单元格共用
+        self._rows_by_feature = None  # 要素索引 -> 行号，行顺序改变后重新计算
+
+    @staticmethod
+    def get_fields(records) -> list:
+        if hasattr(records, 'fields'):
+            return list(records.fields)
+        return list(records[0].keys()) if len(records) else []
+
+    def normalize_ids(self, feature_ids) -> np.ndarray:
+        if feature_ids is None:
+            return np.arange(len(self.records), dtype=np.int64)
+        return np.asarray(feature_ids, dtype=np.int64).reshape(-1)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.feature_ids)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.fields)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        value = self.get_record(int(self.feature_ids[index.row()])).get(self.fields[index.column()])
+        return "" if value is None else str(value)
+
+    def headerData(self, section: int, orientation: int, role: int = Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.fields[section] if section < len(self.fields) else None
+        return str(self.feature_ids[section]) if section < len(self.feature_ids) else None  # 行头显示要素索引
+
+    def get_record(self, feature_id: int) -> dict:
+        """
+        读取要素的属性字典，连续读取同一行的单元格时只读取一次
+        """
+        cached_id, record = self._cached_row
+        if cached_id != feature_id:
+            record = self.records[feature_id]
+            self._cached_row = (feature_id, record)
+        return record
+
+    def feature_id(self, row: int) -> int:
+        """
+        获取行对应的要素索引
+        参数:
+            row (int): 行号
+        返回:
+            int: 要素索引
+        """
+        return int(self.feature_ids[row])
+
+    def rows_of(self, feature_ids) -> np.ndarray:
+        """
+        获取要素所在的行号（不在表中的要素被忽略）
+        参数:
+            feature_ids: 要素索引数组
+        返回:
+            np.ndarray: 升序排列的行号
+        """
+        lookup = self.row_lookup()
+        feature_ids = np.asarray(feature_ids, dtype=np.int64).reshape(-1)
+        feature_ids = feature_ids[(feature_ids >= 0) & (feature_ids < len(lookup))]
+        rows = lookup[feature_ids]
+        return np.sort(rows[rows >= 0])
+
+    def row_lookup(self) -> np.ndarray:
+        """
+        要素索引 -> 行号的查找数组（不在表中的要素为 -1），行顺序改变后重新计算
+        """
+        if self._rows_by_feature is None:
+            size = max(len(self.records), int(self.feature_ids.max()) + 1 if len(self.feature_ids) else 0)
+            self._rows_by_feature = np.full(size, -1, dtype=np.int64)
+            self._rows_by_feature[self.feature_ids] = np.arange(len(self.feature_ids))
+        return self._rows_by_feature
+
+    def set_feature_ids(self, feature_ids=None) -> None:
+        """
+        原地更新显示的要素（例如属性查询缩小了范围），保留当前的排序方式
+        参数:
+            feature_ids: 要显示的要素索引，None 表示全部要素
+        """
+        self.beginResetModel()
+        self.feature_ids = self.normalize_ids(feature_ids)
+        if self.sort_column >= 0:
+            self.feature_ids = self.sorted_ids(self.feature_ids, self.sort_column, self.sort_order)
+        self._rows_by_feature = None
+        self.endResetModel()
+
+    def sort(self, column: int, order: int = Qt.AscendingOrder) -> None:
+        """
+        按列排序：使用查询引擎的排序索引，只重排行号，不读取记录
+        """
+        if not 0 <= column < len(self.fields):
+            return
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()  # 视图的选中行等持久索引，排序后按要素索引重新定位
+        persistent_ids = [self.feature_id(index.row()) for index in persistent]
+        self.sort_column, self.sort_order = column, order
+        self.feature_ids = self.sorted_ids(self.feature_ids, column, order)
+        self._rows_by_feature = None
+        if persistent:
+            rows = self.row_lookup()[persistent_ids].tolist()
+            self.changePersistentIndexList(
+                persistent, [self.index(row, index.column()) for row, index in zip(rows, persistent)])
+        self.layoutChanged.emit()
+
+    def sorted_ids(self, feature_ids: np.ndarray, column: int, order: int) -> np.ndarray:
+        index = self.map_data.get_query_engine().get_index(self.fields[column])
+        rank = np.empty(len(index), dtype=np.int64)
+        rank[index.sorted_order] = np.arange(len(index))  # 每个要素在排序索引中的位置
+        feature_ids = feature_ids[np.argsort(rank[feature_ids], kind='stable')]
+        return feature_ids[::-1].copy() if order == Qt.DescendingOrder else feature_ids
@@ -10,14 +10,20 @@ from PyQt5.QtCore import pyqtSignal, Qt, QRectF
 from ui.mapWidget_components.render import RenderMixin
 from ui.mapWidget_components.interaction import InteractionMixin
 from ui.mapWidget_components.tools import ToolsMixin
+from ui.mapWidget_components.projectManager import ProjectMixin
 import os
 import logging
 
 
-class MapWidget(QGraphicsView, RenderMixin, InteractionMixin, ToolsMixin):
+class MapWidget(QGraphicsView, RenderMixin, InteractionMixin, ToolsMixin, ProjectMixin):
     shapefile_imported = pyqtSignal()  # 信号：Shapefile 文件导入完成
-    attribute_table_requested = pyqtSignal(list)  # 信号：请求属性表
+    attribute_table_requested = pyqtSignal(object)  # 信号：请求属性表，携带要素索引数组（None 表示全部要素）
     feature_attributes_updated = pyqtSignal(dict)  # 信号：要素属性更新
+    shapefile_load_started = pyqtSignal()  # 信号：Shapefile 后台加载开始
+    shapefile_load_progress = pyqtSignal(int, int)  # 信号：Shapefile 加载进度 (已处理数量, 总数量)
+    shapefile_load_finished = pyqtSignal()  # 信号：Shapefile 后台加载结束（成功、失败或取消）
+    features_selected = pyqtSignal(object)  # 信号：地图上选中的要素，携带要素索引数组
+    layers_changed = pyqtSignal(object)  # 信号：图层列表变化，携带从下到上的图层信息列表
 
     def __init__(self, main_window):
         super().__init__(main_window)
@@ -27,6 +33,7 @@ class MapWidget(QGraphicsView, RenderMixin, InteractionMixin, ToolsMixin):
         self.setRenderHint(QPainter.Antialiasing)  # 启用抗锯齿
         self.init_ui()  # 初始化用户界面
         self.setup_scene()  # 初始化场景
+        self.setup_tiled_rendering()  # 初始化分块渲染模式
         self.load_node_image()  # 加载节点图片
         self.is_panning = False  # 是否处于平移模式
         self.last_pan_point = None  # 记录平移起点
@@ -86,6 +93,13 @@ class MapWidget(QGraphicsView, RenderMixin, InteractionMixin, ToolsMixin):
         container = self.findChild(QWidget)
         if container:
             container.move(10, 10)
+        self.schedule_visible_items_update()  # 分块模式下更新可见区域的矢量项
+
+    def wheelEvent(self, event) -> None:
+        """
+        鼠标滚轮缩放视图（QGraphicsView 在 MRO 中位于混入类之前，需显式调用 InteractionMixin 的实现）
+        """
+        InteractionMixin.wheelEvent(self, event)
 
     def highlight_feature(self, item) -> None:
         """
@@ -169,20 +183,10 @@ class MapWidget(QGraphicsView, RenderMixin, InteractionMixin, ToolsMixin):
         if event.button() == Qt.LeftButton and self.select_button.isChecked():
             selection_end = self.mapToScene(event.pos())
             selection_rect = QRectF(self.selection_start, selection_end).normalized()
-            selected_items = self.scene.items(selection_rect, Qt.IntersectsItemShape)
-
-            self.clear_highlights()
-            selected_features = []
-            for item in selected_items:
-                if isinstance(item, QGraphicsItem):
-                    self.highlight_feature(item)
-                    if hasattr(item, 'attributes'):
-                        selected_features.append(item.attributes)
-
-            if selected_features:
-                self.feature_attributes_updated.emit(selected_features[0])  # 发射第一个选中要素的属性
-            else:
-                self.feature_attributes_updated.emit({})
+            selected_items = self.find_feature_items_in_rect(selection_rect)  # 通过空间索引查找要素
+            self.select_nodes_in_rect(selection_rect)  # 节点图层自行完成命中测试
+            # 高亮所有选中的要素，并通知属性表同步选中对应的行
+            self.select_features([item.feature_id for item in selected_items])
         elif event.button() == Qt.MiddleButton or (event.button() == Qt.LeftButton and self.pan_button.isChecked()):
             # 结束平移
             self.is_panning = False
@@ -1,191 +1,493 @@
 # ui/mapWidget_components/baseRender.py
-# 功能：提供地图形状、多边形和线的绘制功能，包括背景和边界绘制
+# 功能：提供地图形状、多边形和线的绘制功能，包括背景和投影边界绘制，以及投影改变后原地更新场景项
 
-from PyQt5.QtGui import QPen, QBrush, QColor, QPolygonF, QPainterPath, QPixmap
-from PyQt5.QtWidgets import QGraphicsItem, QGraphicsPolygonItem, QGraphicsPixmapItem
+from PyQt5.QtGui import QPen, QBrush, QColor, QPolygonF, QPainterPath, QTransform
+from PyQt5.QtWidgets import QGraphicsItem, QGraphicsPathItem, QGraphicsRectItem, QGraphicsEllipseItem
 from PyQt5.QtCore import QPointF, QRectF, Qt
 import logging
-from utils.utils import is_valid_coordinate, show_error_message
+import numpy as np
+from utils.utils import show_error_message
+from ui.mapWidget_components.nodeLayer import NodeLayerItem
 
-class CustomPolygonItem(QGraphicsPolygonItem):
+OCEAN_COLOR = QColor(0, 105, 148)  # 海洋背景颜色
+BOUNDARY_WIDTH = 2.0  # 投影边框宽度
+
+def to_qpoints(coords) -> list:
     """
-    自定义多边形项，确保每个项都有 attributes 属性
+    将坐标数组转换为 QPointF 列表，跳过无效坐标
+    参数:
+        coords: (n, 2) 坐标数组或坐标列表
+    返回:
+        list: QPointF 列表
     """
-    def __init__(self, polygon: QPolygonF, attributes: dict, *args, **kwargs):
-        super().__init__(polygon, *args, **kwargs)
-        self.attributes = attributes  # 存储多边形属性
-        self.setPen(QPen(Qt.black, 0.01))  # 设置边框笔刷
-        self.setBrush(QBrush(QColor(0, 100, 0)))  # 设置填充颜色
-        self.setFlag(QGraphicsItem.ItemIsSelectable, True)  # 设置多边形可选中
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    coords = coords[np.isfinite(coords).all(axis=1)]
+    return [QPointF(x, y) for x, y in coords.tolist()]
+
 
-class NodeItem(QGraphicsPixmapItem):
+def rings_to_path(rings, closed: bool = True) -> QPainterPath:
     """
-    自定义节点项类，继承自 QGraphicsPixmapItem
+    由多个坐标数组创建一条路径，每个坐标数组为一个子路径
+    参数:
+        rings: 坐标数组列表
+        closed (bool): 是否闭合每个子路径（多边形为 True，线为 False）
+    返回:
+        QPainterPath: 路径对象，没有有效子路径时为空路径
+    """
+    path = QPainterPath()
+    min_points = 3 if closed else 2
+    for coords in rings:
+        points = to_qpoints(coords)  # 验证并添加有效坐标
+        if len(points) < min_points:
+            continue
+        path.addPolygon(QPolygonF(points))
+        if closed:
+            path.closeSubpath()
+    return path
+
+
+class FeatureItem(QGraphicsPathItem):
     """
-    def __init__(self, pixmap: QPixmap, *args, **kwargs):
-        super().__init__(pixmap, *args, **kwargs)
-        self.setFlag(QGraphicsItem.ItemIsSelectable, True)  # 设置节点可选中
-        self.setFlag(QGraphicsItem.ItemIsMovable, False)  # 禁止节点移动
-        self.setCursor(Qt.PointingHandCursor)  # 设置鼠标指针样式
+    要素项：一个要素的所有部件共用一条路径，填充和边界在一次绘制中完成
+    可直接传入属性字典，也可传入属性序列和索引，在访问 attributes 时才读取属性
+    """
+    def __init__(self, path: QPainterPath, attributes: dict = None, *args, records=None, record_index: int = None,
+                 **kwargs):
+        super().__init__(path, *args, **kwargs)
+        self._attributes = attributes  # 存储要素属性
+        self.records = records  # 属性序列（延迟读取时使用）
+        self.record_index = record_index  # 属性在序列中的索引
+        self.feature_id = record_index  # 要素索引
+        self.setPen(QPen(Qt.black, 0.2, Qt.SolidLine))  # 设置边界笔刷
+        self.setBrush(QBrush(QColor(0, 100, 0)))  # 设置填充颜色
+        self.setFlag(QGraphicsItem.ItemIsSelectable, True)  # 设置要素可选中
+
+    @property
+    def attributes(self) -> dict:
+        """
+        要素的属性字典，延迟加载模式下每次访问时从属性序列中读取
+        """
+        if self._attributes is None and self.records is not None and self.record_index is not None:
+            return self.records[self.record_index]
+        return self._attributes if self._attributes is not None else {}
+
+    @attributes.setter
+    def attributes(self, value: dict) -> None:
+        self._attributes = value
 
 class BaseRenderMixin:
-    def draw_map(self) -> None:
+    def draw_map(self, view: dict = None) -> None:
         """
-        绘制地图形状
+        绘制所有图层（每个图层的要素项放在自己的场景项组中）
+        参数:
+            view (dict): 要恢复的视图（项目文件中的 'transform'、'center' 和 'extent'），
+                         给定时先绘制该范围内的要素，其余要素在后台分批补齐；默认缩放到整个地图
         """
         # 不再清空整个场景，只清除地图相关的项
-        for item in self.polygon_items:
-            self.scene.removeItem(item)  # 从场景中移除多边形项
-        self.polygon_items.clear()  # 清空多边形项列表
+        for layer in self.layers:
+            self.clear_layer_items(layer)
         self.highlighted_items.clear()  # 清空高亮项列表
 
         self.draw_ocean_background()  # 绘制海洋背景
 
-        transformed_polygons = self.map_data.get_transformed_polygons()  # 获取转换后的多边形
-        logging.info(f"Drawing {len(transformed_polygons)} polygons.")
-
-        for index, coords in enumerate(transformed_polygons):
-            valid_coords = []
-            for point in coords:
-                if is_valid_coordinate(point[0], point[1]):
-                    valid_coords.append(QPointF(point[0], point[1]))  # 验证并添加有效坐标
-            if len(valid_coords) >= 3:
-                polygon = QPolygonF(valid_coords)  # 创建多边形
-                attributes = self.map_data.records[index] if index < len(self.map_data.records) else {}
-                polygon_item = CustomPolygonItem(polygon, attributes)  # 创建自定义多边形项
-                polygon_item.setZValue(1)  # 设置 Z 值，控制绘制顺序
-                self.scene.addItem(polygon_item)  # 添加到场景中
-                self.polygon_items.append(polygon_item)  # 添加到多边形项列表
+        if view is not None:
+            self.setTransform(QTransform(*view['transform']))  # 先恢复视图比例，细节层级按该比例选择
+        for layer in self.layers:
+            if layer.has_data():
+                self.draw_layer(layer, view)
+        self.scene.setSceneRect(self.scene.itemsBoundingRect())  # 更新场景边界（海洋背景覆盖整个投影范围）
+        self.draw_projection_boundary()  # 绘制投影边界
+        if view is not None:
+            self.centerOn(QPointF(*view['center']))
+        else:
+            self.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)  # 调整视图以适应场景
+        self.update_level_of_detail()  # 适应视图后按新的比例更新细节层级
+        self.update_node_layer_scale()  # 适应视图后更新节点图片占据的场景范围
+        self.update_visible_items()  # 分块模式下为可见区域创建矢量项
+
+    def reproject_map(self) -> None:
+        """
+        投影改变后原地更新场景（各图层的 MapData 已切换投影）：
+        保留要素项、海洋背景、投影边框和瓦片图层项，只替换它们的几何，选择和高亮随之保留
+        """
+        extent = self.get_projection_extent()
+        if extent is None:
+            return
+        self.draw_ocean_background()  # 形状不变时只修改范围
+        self.draw_projection_boundary()
+        self.fitInView(extent, Qt.KeepAspectRatio)  # 先按新范围缩放，细节层级按新比例选择
+        for layer in self.layers:
+            if not layer.has_data():
+                continue
+            if not layer.polygon_items and not layer.line_items and layer.tile_item is None and \
+                    layer.pending_feature_ids is None:
+                self.draw_layer(layer)  # 还没有绘制过的图层直接按新投影绘制
+                continue
+            if layer.tile_item is not None:
+                layer.tile_item.set_extent(extent)  # 丢弃按旧投影渲染的瓦片
+            self.apply_layer_style(layer)  # 线宽随投影变化
+            level = self.select_lod_level(layer)
+            layer.lod_level = level
+            self.replace_item_paths(layer, layer.map_data.get_lod_geometry(level), keep_empty=False)
+        self.scene.setSceneRect(self.scene.itemsBoundingRect())
+        self.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
+        self.update_level_of_detail()
+        self.update_node_layer_scale()
+        self.update_visible_items()
+        logging.info(f"Reprojected {sum(len(layer.polygon_items) + len(layer.line_items) for layer in self.layers)} "
+                     f"feature items in place.")
+
+    def draw_layer(self, layer, view: dict = None) -> None:
+        """
+        绘制一个图层的要素（由 draw_map 调用，也用于新增图层时只绘制该图层）
+        参数:
+            layer (MapLayer): 要绘制的图层
+            view (dict): 要恢复的视图，见 draw_map
+        """
+        self.clear_layer_items(layer)
+        layer.lod_level = self.select_lod_level(layer)  # 按当前视图比例选择细节层级
+        if self.tiled_mode:
+            self.draw_tiled_map(layer)  # 分块模式：多边形和线绘制到缓存的栅格瓦片中
+        elif view is not None:
+            self.draw_vector_map_progressively(QRectF(*view['extent']), view.get('priority'), layer)
+        else:
+            self.draw_vector_map(layer=layer)  # 矢量模式：每个要素一个场景项，填充和边界一起绘制
+
+    def clear_layer_items(self, layer) -> None:
+        """
+        移除图层的所有场景项，图层的场景项组保留
+        参数:
+            layer (MapLayer): 图层
+        """
+        layer.pending_feature_ids = None  # 取消未完成的分批绘制
+        for item in layer.polygon_items + layer.line_items:
+            self.scene.removeItem(item)
+        layer.polygon_items.clear()
+        layer.line_items.clear()
+        layer.map_data.features.clear_items()  # 注销要素登记表中的场景项
+        self.clear_tile_layer(layer)  # 移除分块栅格图层
+        if layer is self.active_layer:
+            self.highlighted_items.clear()
+
+    def draw_vector_map(self, feature_ids=None, layer=None) -> None:
+        """
+        以矢量场景项的方式绘制要素，多部件要素的所有部件合并为一个场景项（由 draw_layer 调用）
+        参数:
+            feature_ids: 只绘制这些要素（用于分批绘制），None 表示全部要素
+            layer (MapLayer): 要绘制的图层，默认为当前图层
+        """
+        layer = layer or self.active_layer
+        map_data = layer.map_data
+        geometry_array = map_data.geometry_array
+        lod_geometry = map_data.get_lod_geometry(layer.lod_level)
+        transformed_polygons = lod_geometry['polygons']  # 获取转换后的多边形
+        polygon_runs = geometry_array.polygon_feature_runs  # 每个要素的多边形区间
+        line_runs = geometry_array.line_feature_runs  # 每个要素的线区间
+        if feature_ids is None:
+            polygon_ids, line_ids = list(polygon_runs), list(line_runs)
+        else:
+            feature_ids = np.asarray(feature_ids, dtype=np.int64).tolist()
+            polygon_ids = [feature_id for feature_id in feature_ids if feature_id in polygon_runs]
+            line_ids = [feature_id for feature_id in feature_ids if feature_id in line_runs]
+        logging.info(f"Drawing {len(polygon_ids)} polygon features ({len(transformed_polygons)} parts) "
+                     f"of layer '{layer.name}' at LOD level {layer.lod_level}.")
+
+        for feature_id in polygon_ids:
+            start, end = polygon_runs[feature_id]
+            path = rings_to_path(transformed_polygons[start:end])  # 要素的所有部件共用一条路径
+            if not path.isEmpty():
+                feature_item = self.create_feature_item(feature_id, path, layer=layer)
+                layer.add_item(feature_item)  # 添加到图层的场景项组中
+                layer.polygon_items.append(feature_item)  # 添加到多边形要素项列表
+                map_data.features.register_item(feature_id, feature_item)
             else:
                 logging.warning("Not enough valid points to form a polygon.")
 
-        transformed_lines = self.map_data.get_transformed_lines()  # 获取转换后的线
-        logging.info(f"Drawing {len(transformed_lines)} lines.")
-
-        for coords in transformed_lines:
-            valid_coords = []
-            for point in coords:
-                if is_valid_coordinate(point[0], point[1]):
-                    valid_coords.append(QPointF(point[0], point[1]))  # 验证并添加有效坐标
-            if len(valid_coords) >= 2:
-                path = QPainterPath()
-                path.moveTo(valid_coords[0])  # 起点
-                for point in valid_coords[1:]:
-                    path.lineTo(point)  # 连接线段
-                line_item = self.scene.addPath(
-                    path, QPen(Qt.blue, self.line_pen.widthF(), Qt.SolidLine))  # 创建并添加线项
-                line_item.setZValue(1)  # 设置 Z 值
+        transformed_lines = lod_geometry['lines']  # 获取转换后的线
+        logging.info(f"Drawing {len(line_ids)} line features ({len(transformed_lines)} parts).")
+
+        for feature_id in line_ids:
+            start, end = line_runs[feature_id]
+            path = rings_to_path(transformed_lines[start:end], closed=False)  # 连接线段
+            if not path.isEmpty():
+                line_item = self.create_feature_item(feature_id, path, is_line=True, layer=layer)
+                layer.add_item(line_item)  # 添加到图层的场景项组中
+                layer.line_items.append(line_item)  # 添加到线项列表
+                map_data.features.register_item(feature_id, line_item)
             else:
                 logging.warning("Not enough valid points to form a line.")
 
-        self.draw_administrative_boundaries()  # 绘制行政边界
-        self.scene.setSceneRect(self.scene.itemsBoundingRect())  # 更新场景边界
-        self.draw_projection_boundary()  # 绘制投影边界
-        self.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)  # 调整视图以适应场景
+    def draw_vector_map_progressively(self, extent: QRectF, priority=None, layer=None) -> None:
+        """
+        先绘制视图范围内的要素，其余要素交给定时器在事件循环空闲时分批绘制
+        参数:
+            extent (QRectF): 优先绘制的场景范围
+            priority: 需要优先绘制的其他要素索引（例如高亮的要素）
+            layer (MapLayer): 要绘制的图层，默认为当前图层
+        """
+        layer = layer or self.active_layer
+        map_data = layer.map_data
+        part_ids = map_data.query_box(extent.left(), extent.top(), extent.right(), extent.bottom())
+        visible = map_data.features.features_of_parts(part_ids)
+        if priority is not None and len(priority) and layer is self.active_layer:
+            visible = np.union1d(visible, np.asarray(priority, dtype=np.int64))
+        self.draw_vector_map(visible, layer)
+        remaining = np.setdiff1d(np.arange(len(map_data.features), dtype=np.int64), visible)
+        logging.info(f"Drew {len(visible)} features in the view first, {len(remaining)} left for the background.")
+        if len(remaining):
+            layer.pending_feature_ids = remaining
+            self.fill_timer.start()
+
+    def draw_pending_features(self) -> None:
+        """
+        分批绘制剩余的要素，每次只处理一批以保持界面响应（由 fill_timer 调用）
+        """
+        layer = next((layer for layer in self.layers if layer.pending_feature_ids is not None), None)
+        if layer is None:
+            return
+        batch = layer.pending_feature_ids[:self.fill_batch_size]
+        layer.pending_feature_ids = layer.pending_feature_ids[self.fill_batch_size:]
+        self.draw_vector_map(batch, layer)
+        if not len(layer.pending_feature_ids):
+            layer.pending_feature_ids = None
+            logging.info(f"Finished drawing the remaining features of layer '{layer.name}'.")
+        if self.is_filling():
+            self.fill_timer.start()
+
+    def is_filling(self) -> bool:
+        """
+        是否还有等待分批绘制的要素
+        """
+        return any(layer.pending_feature_ids is not None for layer in self.layers)
+
+    def create_feature_item(self, feature_id: int, path: QPainterPath, is_line: bool = False,
+                            layer=None) -> FeatureItem:
+        """
+        创建要素项（不加入场景）
+        参数:
+            feature_id (int): 要素索引
+            path (QPainterPath): 要素所有部件组成的路径
+            is_line (bool): 是否为线要素
+            layer (MapLayer): 要素所属的图层，默认为当前图层
+        返回:
+            FeatureItem: 要素项
+        """
+        layer = layer or self.active_layer
+        records = layer.map_data.records
+        if feature_id < len(records):
+            # 只记录属性索引，属性在需要时才读取
+            feature_item = FeatureItem(path, records=records, record_index=feature_id)
+        else:
+            feature_item = FeatureItem(path, {})
+        feature_item.feature_id = feature_id
+        pen, brush = self.feature_style(is_line, layer)
+        feature_item.setPen(pen)
+        feature_item.setBrush(brush)
+        feature_item.setZValue(1)  # 设置 Z 值，控制绘制顺序
+        return feature_item
+
+    def feature_style(self, is_line: bool = False, layer=None) -> tuple:
+        """
+        要素的边界笔刷和填充（场景项和矢量导出共用）
+        参数:
+            is_line (bool): 是否为线要素
+            layer (MapLayer): 要素所属的图层，默认为当前图层
+        返回:
+            tuple: (QPen, QBrush)
+        """
+        return (layer or self.active_layer).feature_style(is_line, self.line_pen.widthF())
+
+    def apply_layer_style(self, layer) -> None:
+        """
+        把图层样式应用到已有的要素项或瓦片图层项，不重新创建场景项
+        参数:
+            layer (MapLayer): 图层
+        """
+        outline_pen, fill_brush = self.feature_style(False, layer)
+        line_pen, line_brush = self.feature_style(True, layer)
+        if layer.tile_item is not None:
+            layer.tile_item.set_style(fill_brush, outline_pen, line_pen)  # 矢量项只用于选择和高亮，保持透明
+            for items, pen in ((layer.polygon_items, outline_pen), (layer.line_items, line_pen)):
+                for item in items:
+                    item.style_width = pen.widthF()
+            return
+        for items, pen, brush in ((layer.polygon_items, outline_pen, fill_brush),
+                                  (layer.line_items, line_pen, line_brush)):
+            for item in items:
+                if hasattr(item, 'original_pen'):
+                    item.original_pen = pen  # 高亮项在取消高亮后使用新样式
+                else:
+                    item.setPen(pen)
+                item.setBrush(brush)
 
     def draw_ocean_background(self) -> None:
         """
-        绘制投影范围内的海洋背景
+        绘制投影范围内的海洋背景，已有的背景形状相同时只修改范围
         """
+        shape = self.projection_shape()
+        if self.reshape_item(self.ocean_item, shape):
+            return
         # 清除之前的海洋背景
-        if hasattr(self, 'ocean_item') and self.ocean_item:
+        if self.ocean_item is not None:
             self.scene.removeItem(self.ocean_item)
-        ocean_brush = QBrush(QColor(0, 105, 148))  # 设置海洋颜色
-        projection_extent = self.get_projection_extent()  # 获取投影范围
-        if projection_extent:
-            if self.is_circular_projection():
-                center = projection_extent.center()
-                radius = min(projection_extent.width(), projection_extent.height()) / 2
-                ellipse_rect = QRectF(center.x() - radius, center.y() - radius, 2 * radius, 2 * radius)
-                self.ocean_item = self.scene.addEllipse(
-                    ellipse_rect, QPen(Qt.NoPen), ocean_brush)  # 绘制圆形背景
-            else:
-                self.ocean_item = self.scene.addRect(
-                    projection_extent, QPen(Qt.NoPen), ocean_brush)  # 绘制矩形背景
-            self.ocean_item.setZValue(0)  # 设置 Z 值
+            self.ocean_item = None
+        if shape is None:
+            return
+        rect, circular = shape
+        ocean_brush = QBrush(OCEAN_COLOR)  # 设置海洋颜色
+        if circular:
+            self.ocean_item = self.scene.addEllipse(rect, QPen(Qt.NoPen), ocean_brush)  # 绘制圆形背景
+        else:
+            self.ocean_item = self.scene.addRect(rect, QPen(Qt.NoPen), ocean_brush)  # 绘制矩形背景
+        self.ocean_item.setZValue(0)  # 设置 Z 值
 
     def draw_projection_boundary(self) -> None:
         """
-        绘制投影范围的边框
+        绘制投影范围的边框，已有的边框形状相同时只修改范围
         """
+        shape = self.projection_shape()
+        if self.reshape_item(self.boundary_item, shape):
+            return
         # 清除之前的边框
-        if hasattr(self, 'boundary_item') and self.boundary_item:
+        if self.boundary_item is not None:
             self.scene.removeItem(self.boundary_item)
+            self.boundary_item = None
+        if shape is None:
+            return
+        rect, circular = shape
         boundary_pen = QPen(Qt.black)
-        boundary_pen.setWidthF(2.0)  # 设置边框宽度
+        boundary_pen.setWidthF(BOUNDARY_WIDTH)  # 设置边框宽度
+        if circular:
+            self.boundary_item = self.scene.addEllipse(rect, boundary_pen)  # 绘制圆形边框
+        else:
+            self.boundary_item = self.scene.addRect(rect, boundary_pen)  # 绘制矩形边框
+        self.boundary_item.setZValue(3)  # 设置 Z 值
+
+    def projection_shape(self):
+        """
+        投影范围的形状
+        返回:
+            tuple: (矩形或圆的外接矩形, 是否为圆形)，没有地图时返回 None
+        """
         projection_extent = self.get_projection_extent()  # 获取投影范围
-        if projection_extent:
-            if self.is_circular_projection():
-                center = projection_extent.center()
-                radius = min(projection_extent.width(), projection_extent.height()) / 2
-                ellipse_rect = QRectF(center.x() - radius, center.y() - radius, 2 * radius, 2 * radius)
-                self.boundary_item = self.scene.addEllipse(ellipse_rect, boundary_pen)  # 绘制圆形边框
-            else:
-                self.boundary_item = self.scene.addRect(projection_extent, boundary_pen)  # 绘制矩形边框
-            self.boundary_item.setZValue(3)  # 设置 Z 值
+        if not projection_extent:
+            return None
+        if self.is_circular_projection():
+            center = projection_extent.center()
+            radius = min(projection_extent.width(), projection_extent.height()) / 2
+            return QRectF(center.x() - radius, center.y() - radius, 2 * radius, 2 * radius), True
+        return projection_extent, False
 
-    def draw_administrative_boundaries(self) -> None:
+    @staticmethod
+    def reshape_item(item, shape) -> bool:
         """
-        绘制行政边界线
+        形状类型相同时原地修改矩形或圆形场景项的范围
+        参数:
+            item: 已有的场景项（可以为 None）
+            shape (tuple): projection_shape 的结果
+        返回:
+            bool: 是否已原地修改
         """
-        # 清除之前的行政边界
-        if hasattr(self, 'boundary_items') and self.boundary_items:
-            for item in self.boundary_items:
-                self.scene.removeItem(item)
-            self.boundary_items.clear()
-        else:
-            self.boundary_items = []
-        transformed_polygons = self.map_data.get_transformed_polygons()  # 获取转换后的多边形
-        logging.info(f"Drawing administrative boundaries.")
-        for coords in transformed_polygons:
-            valid_coords = []
-            for point in coords:
-                if is_valid_coordinate(point[0], point[1]):
-                    valid_coords.append(QPointF(point[0], point[1]))  # 验证并添加有效坐标
-            if len(valid_coords) >= 3:
-                path = QPainterPath()
-                path.moveTo(valid_coords[0])
-                for point in valid_coords[1:]:
-                    path.lineTo(point)  # 连接多边形的每个点
-                path.closeSubpath()  # 闭合路径
-                try:
-                    boundary_item = self.scene.addPath(
-                        path, QPen(Qt.black, 0.2, Qt.SolidLine))  # 创建并添加边界项
-                    boundary_item.setZValue(3)  # 设置 Z 值
-                    self.boundary_items.append(boundary_item)  # 添加到边界项列表
-                except Exception as e:
-                    logging.error(f"Failed to draw administrative boundary: {e}")
+        if item is None or shape is None:
+            return False
+        rect, circular = shape
+        if not isinstance(item, QGraphicsEllipseItem if circular else QGraphicsRectItem):
+            return False
+        item.setRect(rect)
+        return True
+
+    def update_level_of_detail(self, pixel_size: float = None) -> None:
+        """
+        视图缩放越过细节层级阈值时，原地替换各图层要素项的路径
+        参数:
+            pixel_size (float): 每个像素对应的场景距离（例如导出时按输出分辨率选择），默认按当前视图比例选择
+        """
+        for layer in self.layers:
+            if pixel_size is None:
+                level = self.select_lod_level(layer)
             else:
-                logging.warning("Not enough valid points to form a boundary.")
+                level = layer.map_data.get_lod_level_for(pixel_size)
+            self.update_layer_level_of_detail(layer, level)
+
+    def update_layer_level_of_detail(self, layer, level: int) -> None:
+        """
+        更新一个图层的细节层级
+        参数:
+            layer (MapLayer): 图层
+            level (int): 细节层级
+        """
+        if level == layer.lod_level:
+            return
+        layer.lod_level = level
+        lod_geometry = layer.map_data.get_lod_geometry(level)
+        self.replace_item_paths(layer, lod_geometry)
+        logging.info(f"Switched layer '{layer.name}' to LOD level {level} "
+                     f"(tolerance {lod_geometry['tolerance']:.4g}).")
+
+    def replace_item_paths(self, layer, lod_geometry: dict, keep_empty: bool = True) -> None:
+        """
+        用一次转换得到的坐标原地替换图层所有要素项的路径
+        参数:
+            layer (MapLayer): 图层
+            lod_geometry (dict): MapData.get_lod_geometry 的结果
+            keep_empty (bool): 新路径为空时是否保留原路径（切换细节层级时保留，切换投影时清空）
+        """
+        geometry_array = layer.map_data.geometry_array
+        for items, runs, rings, closed in ((layer.polygon_items, geometry_array.polygon_feature_runs,
+                                            lod_geometry['polygons'], True),
+                                           (layer.line_items, geometry_array.line_feature_runs,
+                                            lod_geometry['lines'], False)):
+            for item in items:
+                start, end = runs[item.feature_id]
+                path = rings_to_path(rings[start:end], closed)
+                if not path.isEmpty() or not keep_empty:
+                    item.setPath(path)
 
     def draw_nodes(self) -> None:
         """
-        绘制节点
+        绘制节点：所有节点由一个节点图层项批量绘制
         """
-        if not self.node_data.nodes:
+        if len(self.node_data.nodes) == 0:
             return
-        # 清除之前的节点项
-        for item in self.node_items:
-            self.scene.removeItem(item)
-        self.node_items.clear()
-        transformed_nodes = self.node_data.get_transformed_nodes()  # 获取转换后的节点
-        logging.info(f"Drawing {len(transformed_nodes)} nodes.")
         try:
-            for x, y in transformed_nodes:
-                if is_valid_coordinate(x, y):
-                    node_item = NodeItem(self.node_pixmap)  # 创建节点项
-                    node_item.setOffset(-self.node_pixmap.width() / 2, -self.node_pixmap.height() / 2)  # 设置偏移
-                    node_item.setPos(x, y)  # 设置节点位置
-                    node_item.setFlag(QGraphicsItem.ItemIgnoresTransformations, True)  # 设置忽略变换
-                    node_item.setZValue(4)  # 设置 Z 值
-                    self.scene.addItem(node_item)  # 添加到场景中
-                    self.node_items.append(node_item)  # 添加到节点项列表
-                else:
-                    logging.warning(f"Invalid node coordinates: ({x}, {y})")
+            transformed_nodes = self.node_data.get_transformed_nodes()  # 批量转换，无效节点为 NaN
+            self.get_node_layer().set_nodes(transformed_nodes)  # 原地替换节点位置
+            self.update_node_layer_scale()
+            logging.info(f"Drawing {len(self.node_layer)} nodes.")
         except Exception as e:
             logging.error(f"Error while drawing nodes: {e}")
             show_error_message(self, "绘制节点错误", f"绘制节点时发生错误:\n{e}")
 
+    def draw_node_batch(self, start: int, end: int) -> None:
+        """
+        把流式导入的一批节点追加到节点图层
+        参数:
+            start (int): 新节点在 NodeData 中的起始位置
+            end (int): 新节点在 NodeData 中的结束位置
+        """
+        transformed_nodes = self.node_data.get_transformed_nodes()[start:end]
+        self.get_node_layer().append_nodes(transformed_nodes, np.arange(start, end, dtype=np.int64))
+
+    def get_node_layer(self) -> NodeLayerItem:
+        """
+        获取节点图层项，不存在时创建并加入场景
+        返回:
+            NodeLayerItem: 节点图层项
+        """
+        if self.node_layer is None:
+            self.node_layer = NodeLayerItem(self.node_pixmap)  # 创建节点图层项
+            self.node_layer.setZValue(4)  # 设置 Z 值
+            self.scene.addItem(self.node_layer)  # 添加到场景中
+            self.update_node_layer_scale()
+        return self.node_layer
+
+    def update_node_layer_scale(self) -> None:
+        """
+        视图缩放后更新节点图层中图片占据的场景范围
+        """
+        if self.node_layer is not None:
+            self.node_layer.set_view_scale(abs(self.transform().m11()))
+
     def update_pen_width(self) -> None:
         """
         根据当前的投影更新地图笔的线宽
@@ -1,12 +1,15 @@
 # ui/mapWidget_components/interaction.py
 # 功能：提供与地图交互的功能，包括拖拽、缩放和选择等操作
 
-from PyQt5.QtCore import Qt, QPointF
+from PyQt5.QtCore import Qt, QPointF, QRectF
 from PyQt5.QtGui import QPen
 from PyQt5.QtWidgets import QGraphicsView
 import logging
+import numpy as np
 from utils.utils import show_error_message
-from ui.mapWidget_components.baseRender import CustomPolygonItem
+from ui.mapWidget_components.baseRender import FeatureItem
+
+PICK_TOLERANCE = 4  # 点击选择线要素时的容差（设备像素）
 
 class InteractionMixin:
     def set_drag_mode(self, mode: str) -> None:
@@ -41,6 +44,9 @@ class InteractionMixin:
         new_pos = self.mapToScene(event.pos())  # 记录缩放后的新位置
         delta = new_pos - old_pos  # 计算位置偏移量
         self.translate(delta.x(), delta.y())  # 将视图平移以保持原位置
+        self.update_level_of_detail()  # 缩放越过阈值时切换细节层级
+        self.update_node_layer_scale()  # 更新节点图片占据的场景范围
+        self.schedule_visible_items_update()  # 分块模式下更新可见区域的矢量项
 
     def mousePressEvent(self, event) -> None:
         """
@@ -49,14 +55,12 @@ class InteractionMixin:
         if event.button() == Qt.LeftButton:
             if self.select_button.isChecked():
                 scene_pos = self.mapToScene(event.pos())  # 获取场景坐标
-                items = self.scene.items(QPointF(scene_pos))  # 获取点击位置的项
                 try:
-                    for item in items:
-                        if isinstance(item, CustomPolygonItem):
-                            self.clear_highlights()  # 清除之前的高亮
-                            self.highlight_feature(item)  # 高亮选中的要素
-                            self.display_feature_attributes(item.attributes)  # 显示选中要素的属性
-                            break
+                    item = self.find_feature_item_at(scene_pos)  # 通过空间索引查找点击位置的要素
+                    if item is not None:
+                        self.clear_highlights()  # 清除之前的高亮
+                        self.highlight_feature(item)  # 高亮选中的要素
+                        self.display_feature_attributes(item.attributes)  # 显示选中要素的属性
                     else:
                         # 未找到匹配的要素
                         self.clear_highlights()
@@ -73,6 +77,54 @@ class InteractionMixin:
         else:
             QGraphicsView.mousePressEvent(self, event)  # 调用父类方法
 
+    def find_feature_item_at(self, scene_pos: QPointF):
+        """
+        通过空间索引查找指定场景坐标处的要素项
+        参数:
+            scene_pos (QPointF): 场景坐标
+        返回:
+            FeatureItem: 位于最上层的命中项，未命中时返回 None
+        """
+        scale = abs(self.transform().m11()) or 1.0
+        part_ids = self.map_data.query_point(scene_pos.x(), scene_pos.y(), PICK_TOLERANCE / scale)
+        is_polygon = self.map_data.geometry_array.part_is_polygon[part_ids]
+        part_ids = np.concatenate((part_ids[is_polygon], part_ids[~is_polygon]))  # 线要素绘制在多边形之后
+        feature_ids = self.map_data.features.part_features[part_ids]
+        for feature_id in feature_ids[::-1]:  # 后绘制的要素位于上层
+            item = self.get_feature_item(int(feature_id))
+            if item is not None:
+                return item
+        return None
+
+    def get_feature_item(self, feature_id: int):
+        """
+        获取要素对应的要素项，分块模式下按需创建
+        参数:
+            feature_id (int): 要素索引
+        返回:
+            FeatureItem: 要素项，不存在时返回 None
+        """
+        item = self.map_data.features.item(feature_id)
+        if item is None and self.tiled_mode and self.tile_item is not None:
+            item = self.create_overlay_item(feature_id)
+        return item
+
+    def find_feature_items_in_rect(self, rect: QRectF) -> list:
+        """
+        通过空间索引查找与矩形范围相交的要素项
+        参数:
+            rect (QRectF): 场景坐标中的矩形范围
+        返回:
+            list: 命中的要素项列表（多部件要素只出现一次）
+        """
+        if rect.width() == 0 or rect.height() == 0:
+            item = self.find_feature_item_at(rect.center())  # 单击时按点查询
+            return [item] if item is not None else []
+        part_ids = self.map_data.query_box(rect.left(), rect.top(), rect.right(), rect.bottom())
+        feature_ids = self.map_data.features.features_of_parts(part_ids)
+        items = [self.get_feature_item(feature_id) for feature_id in feature_ids.tolist()]
+        return [item for item in items if item is not None]
+
     def mouseMoveEvent(self, event) -> None:
         """
         鼠标移动事件
@@ -105,11 +157,11 @@ class InteractionMixin:
         else:
             QGraphicsView.mouseReleaseEvent(self, event)  # 调用父类方法
 
-    def highlight_feature(self, item: CustomPolygonItem) -> None:
+    def highlight_feature(self, item: FeatureItem) -> None:
         """
         高亮显示选中的要素
         参数:
-            item (CustomPolygonItem): 要高亮的多边形项
+            item (FeatureItem): 要高亮的要素项
         """
         try:
             # 清除之前的高亮
@@ -118,14 +170,63 @@ class InteractionMixin:
             if hasattr(item, 'original_pen'):
                 return  # 已经高亮，不需要再次处理
             item.original_pen = item.pen()  # 保存当前的笔刷
-            # 创建高亮的 Pen
-            highlighted_pen = QPen(Qt.red, item.pen().widthF() * 2)  # 设置高亮颜色和线宽
-            item.setPen(highlighted_pen)  # 应用高亮笔刷
+            item.setPen(self.highlight_pen(item))  # 应用高亮笔刷
             self.highlighted_items.append(item)  # 添加到高亮项列表
         except Exception as e:
             logging.error(f"Error during feature highlighting: {e}")
             show_error_message(self, "高亮错误", f"高亮要素时发生错误:\n{e}")
 
+    def select_features(self, feature_ids, emit: bool = True) -> list:
+        """
+        选中一组要素：高亮对应的要素项并显示第一个要素的属性，要素项和属性均通过要素登记表直接获取
+        参数:
+            feature_ids: 要素索引数组
+            emit (bool): 是否发射 features_selected 信号（由属性表发起的选择不再回传）
+        返回:
+            list: 被高亮的要素项列表
+        """
+        feature_ids = np.asarray(feature_ids, dtype=np.int64).reshape(-1)
+        items = self.highlight_features(feature_ids)
+        if len(feature_ids):
+            self.display_feature_attributes(self.map_data.features.record(int(feature_ids[0])))
+        else:
+            self.display_feature_attributes(None)
+        if emit:
+            self.features_selected.emit(feature_ids)
+        return items
+
+    def highlight_features(self, feature_ids) -> list:
+        """
+        高亮一组要素（例如属性查询的结果），要素项通过要素索引直接获取
+        参数:
+            feature_ids: 要素索引数组
+        返回:
+            list: 被高亮的要素项列表
+        """
+        self.clear_highlights()  # 清除之前的高亮
+        items = []
+        for feature_id in np.asarray(feature_ids).tolist():
+            item = self.get_feature_item(feature_id)
+            if item is None:
+                continue
+            item.original_pen = item.pen()  # 保存当前的笔刷
+            item.setPen(self.highlight_pen(item))  # 设置高亮颜色和线宽
+            self.highlighted_items.append(item)
+            items.append(item)
+        return items
+
+    def highlight_pen(self, item: FeatureItem) -> QPen:
+        """
+        要素项的高亮笔：红色，线宽为要素样式线宽的两倍
+        分块模式的透明要素项使用 NoPen，线宽取创建时记录的样式线宽
+        参数:
+            item (FeatureItem): 要素项
+        返回:
+            QPen: 高亮笔
+        """
+        width = getattr(item, 'style_width', None) or item.pen().widthF()
+        return QPen(Qt.red, width * 2)
+
     def clear_highlights(self) -> None:
         """
         清除高亮显示
@@ -145,11 +246,26 @@ class InteractionMixin:
         删除选中的节点
         """
         logging.info("Deleting selected nodes.")
-        selected_items = self.scene.selectedItems()  # 获取选中的项
-        for item in selected_items:
-            if item in self.node_items:
-                self.scene.removeItem(item)  # 从场景中移除节点项
-                self.node_items.remove(item)  # 从节点项列表中移除
+        if self.node_layer is not None:
+            self.node_layer.remove_nodes(np.flatnonzero(self.node_layer.selected))  # 从节点图层中移除选中的节点
+
+    def select_nodes_in_rect(self, rect: QRectF) -> int:
+        """
+        选中矩形范围内的节点，矩形退化为点时选中该点处最上层的节点
+        参数:
+            rect (QRectF): 场景坐标中的矩形范围
+        返回:
+            int: 选中的节点数量
+        """
+        if self.node_layer is None:
+            return 0
+        if rect.width() == 0 or rect.height() == 0:
+            index = self.node_layer.node_at(rect.center())
+            indices = np.array([index] if index >= 0 else [], dtype=np.int64)
+        else:
+            indices = self.node_layer.indices_in_rect(rect)
+        self.node_layer.set_selection(indices)
+        return len(indices)
 
     def display_feature_attributes(self, attributes: dict) -> None:
         """
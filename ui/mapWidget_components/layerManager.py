@@ -1,97 +1,505 @@
 # ui/mapWidget_components/layerManager.py
-# 功能：提供图层管理功能，包括导入 Shapefile、节点和更改地图投影的功能
+# 功能：提供图层管理功能，包括多图层的添加、删除、显示和排序，导入 Shapefile、节点和更改地图投影的功能
 
 from PyQt5.QtWidgets import QFileDialog
+from PyQt5.QtCore import QThread, QRectF
 import logging
 from utils.utils import show_error_message
+from core.nodeReaders import node_file_filter
+from ui.mapWidget_components.loadWorker import ShapefileLoadWorker, NodeLoadWorker, ProjectionPrecomputeWorker
+from ui.mapWidget_components.mapLayer import MapLayer
+from core.mapData import MapData
 
 class LayerManagerMixin:
+    # 以下属性指向当前图层，单图层的选择、查询和属性表代码直接使用
+    @property
+    def map_data(self) -> MapData:
+        return self.active_layer.map_data
+
+    @map_data.setter
+    def map_data(self, map_data: MapData) -> None:
+        self.active_layer.map_data = map_data
+
+    @property
+    def polygon_items(self) -> list:
+        return self.active_layer.polygon_items
+
+    @polygon_items.setter
+    def polygon_items(self, items: list) -> None:
+        self.active_layer.polygon_items = items
+
+    @property
+    def line_items(self) -> list:
+        return self.active_layer.line_items
+
+    @line_items.setter
+    def line_items(self, items: list) -> None:
+        self.active_layer.line_items = items
+
+    @property
+    def tile_item(self):
+        return self.active_layer.tile_item
+
+    @property
+    def lod_level(self) -> int:
+        return self.active_layer.lod_level
+
+    def add_layer(self, layer: MapLayer) -> MapLayer:
+        """
+        把图层加到最上层并设为当前图层
+        参数:
+            layer (MapLayer): 新图层
+        返回:
+            MapLayer: 新图层
+        """
+        self.layers.append(layer)
+        self.scene.addItem(layer.group)
+        self.update_layer_order()
+        self.active_layer = layer
+        self.emit_layers_changed()
+        return layer
+
+    def remove_layer(self, index: int) -> None:
+        """
+        删除图层，删除最后一个图层后保留一个空图层
+        参数:
+            index (int): 图层在 layers 中的位置
+        """
+        layer = self.layers[index]
+        logging.info(f"Removing layer '{layer.name}'.")
+        self.clear_layer_items(layer)
+        self.scene.removeItem(layer.group)
+        layer.map_data.clear_map()  # 关闭延迟加载的文件
+        del self.layers[index]
+        if layer is self.active_layer:
+            self.highlighted_items.clear()
+            self.active_layer = self.layers[-1] if self.layers else None
+        if not self.layers:
+            self.add_layer(MapLayer(self.new_map_data(layer.map_data), "Layer 1"))
+        self.update_layer_order()
+        self.update_map_extent()
+        self.emit_layers_changed()
+
+    def new_map_data(self, template: MapData = None) -> MapData:
+        """
+        为新图层创建 MapData，沿用现有图层的磁盘缓存、延迟加载和转换线程设置
+        """
+        map_data = MapData()
+        template = template or self.map_data
+        map_data.cache = template.cache
+        map_data.lazy_threshold = template.lazy_threshold
+        map_data.transform_workers = template.transform_workers
+        return map_data
+
+    def set_layer_visible(self, index: int, visible: bool) -> None:
+        """
+        显示或隐藏图层，只切换场景项组的可见性，不重新绘制
+        参数:
+            index (int): 图层位置
+            visible (bool): 是否显示
+        """
+        self.layers[index].set_visible(visible)
+        self.emit_layers_changed()
+
+    def move_layer(self, index: int, new_index: int) -> None:
+        """
+        调整图层顺序（位置越大越靠上），只修改场景项组的 Z 值
+        参数:
+            index (int): 图层当前位置
+            new_index (int): 图层新位置
+        """
+        new_index = max(0, min(new_index, len(self.layers) - 1))
+        if new_index == index:
+            return
+        self.layers.insert(new_index, self.layers.pop(index))
+        self.update_layer_order()
+        self.emit_layers_changed()
+
+    def set_active_layer(self, index: int) -> None:
+        """
+        设置当前图层，选择、属性查询和属性表作用于该图层
+        参数:
+            index (int): 图层位置
+        """
+        layer = self.layers[index]
+        if layer is self.active_layer:
+            return
+        self.clear_highlights()
+        self.active_layer = layer
+        self.update_visible_items()  # 分块模式下为新的当前图层创建可选择的矢量项
+        self.emit_layers_changed()
+
+    def set_layer_style(self, index: int, **style) -> None:
+        """
+        修改图层样式，已有的要素项原地更换笔刷，不重新创建
+        参数:
+            index (int): 图层位置
+            style: 样式键值（fill、outline、outline_width、line）
+        """
+        layer = self.layers[index]
+        layer.style.update(style)
+        self.apply_layer_style(layer)
+        self.emit_layers_changed()
+
+    def update_layer_order(self) -> None:
+        for position, layer in enumerate(self.layers):
+            layer.set_z_order(position)
+
+    def update_map_extent(self) -> None:
+        """
+        图层增减后按所有图层的范围更新海洋背景、投影边框和场景边界
+        """
+        self.draw_ocean_background()
+        self.draw_projection_boundary()
+        extent = self.get_projection_extent()
+        self.scene.setSceneRect(self.scene.itemsBoundingRect() if extent is not None else QRectF())
+
+    def emit_layers_changed(self) -> None:
+        """
+        通知图层列表变化，携带从下到上的图层信息
+        """
+        self.layers_changed.emit([{'name': layer.name, 'visible': layer.visible,
+                                   'active': layer is self.active_layer, 'fill': layer.style['fill']}
+                                  for layer in self.layers])
+
     def import_shapefile(self) -> None:
         """
-        导入 Shapefile 并绘制地图
+        导入 Shapefile 并绘制地图（在后台线程中解析）
         """
         options = QFileDialog.Options()
         filepath, _ = QFileDialog.getOpenFileName(
             self, "Open Shapefile", "", "Shapefiles (*.shp)", options=options)
         if filepath:
             logging.info(f"Importing shapefile: {filepath}")
-            try:
-                self.map_data.load_shapefile(filepath, encoding='utf-8')  # 尝试以 utf-8 编码加载
-            except UnicodeDecodeError:
-                logging.warning("Failed to decode with utf-8, trying gbk encoding.")
-                try:
-                    self.map_data.load_shapefile(filepath, encoding='gbk')  # 尝试以 gbk 编码加载
-                except Exception as e:
-                    logging.exception("Failed to import shapefile with gbk encoding.")
-                    show_error_message(self, "导入错误", f"无法导入 Shapefile:\n{e}")
-                    return
-            except Exception as e:
-                logging.exception("Failed to import shapefile.")
-                show_error_message(self, "导入错误", f"无法导入 Shapefile:\n{e}")
-                return
-
-            try:
-                self.update_pen_width()  # 更新线宽
-                self.draw_map()  # 绘制地图
-                self.shapefile_imported.emit()  # 发射导入完成信号
-                logging.info("Shapefile imported, enabling Import Nodes button.")
-            except Exception as e:
-                logging.exception("Failed to draw map after importing shapefile.")
-                show_error_message(self, "绘制错误", f"导入 Shapefile 后绘制地图时出错:\n{e}")
+            self.start_shapefile_load(filepath)
         else:
             logging.info("No shapefile selected.")
 
+    def start_shapefile_load(self, filepath: str, encodings: tuple = None) -> None:
+        """
+        启动后台线程解析 Shapefile，完成后在 GUI 线程中绘制
+        参数:
+            filepath (str): Shapefile 文件路径
+            encodings (tuple): 依次尝试的文件编码，默认使用加载器的设置
+        """
+        if self.load_thread is not None:
+            logging.warning("A shapefile is already being loaded.")
+            return
+        self.load_thread = QThread(self)
+        if encodings:
+            self.load_worker = ShapefileLoadWorker(self.map_data, filepath, encodings)
+        else:
+            self.load_worker = ShapefileLoadWorker(self.map_data, filepath)
+        self.load_worker.moveToThread(self.load_thread)
+        self.load_thread.started.connect(self.load_worker.run)
+        self.load_worker.progress.connect(self.shapefile_load_progress.emit)
+        self.load_worker.finished.connect(self.on_shapefile_loaded)
+        self.load_worker.failed.connect(self.on_shapefile_load_failed)
+        self.load_worker.cancelled.connect(self.on_shapefile_load_cancelled)
+        for signal in (self.load_worker.finished, self.load_worker.failed, self.load_worker.cancelled):
+            signal.connect(self.load_thread.quit)  # 任务结束后退出线程
+        self.load_thread.finished.connect(self.cleanup_shapefile_load)
+        self.shapefile_load_started.emit()
+        self.load_thread.start()
+
+    def cancel_shapefile_load(self, wait: bool = False) -> None:
+        """
+        取消正在进行的 Shapefile 加载
+        参数:
+            wait (bool): 是否等待后台线程退出
+        """
+        if self.load_worker is not None:
+            self.load_worker.cancel()
+        if wait and self.load_thread is not None:
+            self.load_thread.wait()
+
+    def on_shapefile_loaded(self, layer: dict) -> None:
+        """
+        后台解析完成后，在 GUI 线程中更新地图数据并绘制
+        参数:
+            layer (dict): MapData.read_shapefile 的解析结果
+        """
+        try:
+            map_layer = self.add_loaded_layer(layer)
+            if self.pending_project is not None:
+                self.restore_project_layer(map_layer)  # 打开项目：所有图层加载后恢复投影和视图
+            elif sum(layer.has_data() for layer in self.layers) == 1:
+                self.update_pen_width()  # 更新线宽
+                self.draw_map()  # 第一个图层：绘制地图并缩放到地图范围
+            else:
+                self.draw_layer(map_layer)  # 只绘制新图层，其他图层和视图保持不变
+                self.update_map_extent()
+            self.shapefile_imported.emit()  # 发射导入完成信号
+            self.start_projection_precompute(map_layer.map_data)
+            logging.info("Shapefile imported, enabling Import Nodes button.")
+        except Exception as e:
+            logging.exception("Failed to draw map after importing shapefile.")
+            show_error_message(self, "绘制错误", f"导入 Shapefile 后绘制地图时出错:\n{e}")
+        finally:
+            self.shapefile_load_finished.emit()
+
+    def add_loaded_layer(self, layer: dict) -> MapLayer:
+        """
+        把解析结果放入图层：当前图层为空时直接使用，否则在最上层新建图层，并投影到当前地图的投影
+        参数:
+            layer (dict): MapData.read_shapefile 的解析结果
+        返回:
+            MapLayer: 接收数据的图层
+        """
+        name = MapLayer.name_for(layer['source'][0]) if layer.get('source') else f"Layer {len(self.layers) + 1}"
+        if not self.active_layer.has_data():
+            map_layer = self.active_layer
+            map_layer.name = name
+            map_layer.map_data.apply_loaded_layer(layer)
+            self.emit_layers_changed()
+            return map_layer
+        projection = self.map_data.proj_string  # 所有图层使用同一投影
+        map_data = self.new_map_data()
+        map_data.apply_loaded_layer(layer)
+        map_data.change_projection(projection)
+        return self.add_layer(MapLayer(map_data, name, MapLayer.default_style(len(self.layers))))
+
+    def on_shapefile_load_failed(self, message: str) -> None:
+        """
+        后台加载失败
+        参数:
+            message (str): 错误信息
+        """
+        self.pending_project = None
+        self.shapefile_load_finished.emit()
+        show_error_message(self, "导入错误", f"无法导入 Shapefile:\n{message}")
+
+    def on_shapefile_load_cancelled(self) -> None:
+        """
+        后台加载已取消
+        """
+        logging.info("Shapefile import cancelled by user.")
+        self.pending_project = None
+        self.shapefile_load_finished.emit()
+
+    def cleanup_shapefile_load(self) -> None:
+        """
+        后台线程退出后释放加载器和线程对象
+        """
+        if self.load_worker is not None:
+            self.load_worker.deleteLater()
+        if self.load_thread is not None:
+            self.load_thread.deleteLater()
+        self.load_worker = None
+        self.load_thread = None
+        if self.pending_project is not None and self.pending_project['queue']:
+            self.load_next_project_layer()  # 打开项目：依次加载下一个图层
+
+    def set_precompute_projections(self, projections: list) -> None:
+        """
+        设置导入图层后预先计算的投影，并为已导入的图层开始预计算
+        参数:
+            projections (list): 投影字符串列表，为空时关闭预计算
+        """
+        self.precompute_projections = list(projections)
+        if not self.precompute_projections:
+            self.cancel_projection_precompute()
+            return
+        for layer in self.layers:
+            if layer.has_data():
+                self.start_projection_precompute(layer.map_data)
+
+    def start_projection_precompute(self, map_data: MapData) -> None:
+        """
+        在后台预先计算图层在 precompute_projections 中各投影下的几何，之后切换投影时只需替换场景项的路径
+        参数:
+            map_data (MapData): 刚导入的图层数据
+        """
+        if not self.precompute_projections:
+            return
+        self.precompute_queue.append(map_data)
+        if self.precompute_thread is None:  # 否则在当前预计算结束后处理
+            self.run_next_projection_precompute()
+
+    def run_next_projection_precompute(self) -> None:
+        """
+        启动后台线程预计算队列中下一个图层的投影
+        """
+        map_data = self.precompute_queue.pop(0)
+        self.precompute_thread = QThread(self)
+        self.precompute_worker = ProjectionPrecomputeWorker(map_data, list(self.precompute_projections))
+        self.precompute_worker.moveToThread(self.precompute_thread)
+        self.precompute_thread.started.connect(self.precompute_worker.run)
+        self.precompute_worker.finished.connect(self.precompute_thread.quit)
+        self.precompute_worker.failed.connect(self.precompute_thread.quit)
+        self.precompute_thread.finished.connect(self.cleanup_projection_precompute)
+        self.precompute_thread.start()
+
+    def cancel_projection_precompute(self, wait: bool = False) -> None:
+        """
+        取消投影预计算，等待中的图层一并取消
+        参数:
+            wait (bool): 是否等待后台线程退出
+        """
+        self.precompute_queue.clear()
+        if self.precompute_worker is not None:
+            self.precompute_worker.cancel()
+        if wait and self.precompute_thread is not None:
+            self.precompute_thread.wait()
+
+    def cleanup_projection_precompute(self) -> None:
+        """
+        后台线程退出后释放预计算器和线程对象，并开始下一个图层的预计算
+        """
+        if self.precompute_worker is not None:
+            self.precompute_worker.deleteLater()
+        if self.precompute_thread is not None:
+            self.precompute_thread.deleteLater()
+        self.precompute_worker = None
+        self.precompute_thread = None
+        if self.precompute_queue:
+            self.run_next_projection_precompute()
+
     def import_nodes(self) -> None:
         """
-        导入节点文件并绘制节点
+        导入节点文件并绘制节点（在后台线程中逐批读取）
         """
         options = QFileDialog.Options()
         filepath, _ = QFileDialog.getOpenFileName(
-            self, "Open Nodes File", "", "Excel Files (*.xls *.xlsx)",
+            self, "Open Nodes File", "", node_file_filter(),
             options=options)
         if filepath:
             logging.info(f"Importing nodes from: {filepath}")
-            try:
-                self.node_data.import_nodes(filepath)  # 导入节点数据
-                self.node_data.set_projection(self.map_data.crs, self.map_data.proj_string)  # 设置节点投影
-                self.draw_nodes()  # 绘制节点
-            except Exception as e:
-                logging.exception("导入节点时发生错误")
-                show_error_message(self, "导入错误", f"无法导入节点:\n{e}")
+            self.start_node_load(filepath)
         else:
             logging.info("No nodes file selected.")
 
+    def start_node_load(self, filepath: str, x_column: str = 'Longitude', y_column: str = 'Latitude') -> None:
+        """
+        启动后台线程逐批读取节点，每批读取完成后立即投影并追加到节点图层
+        参数:
+            filepath (str): 节点文件路径
+            x_column (str): 经度列名
+            y_column (str): 纬度列名
+        """
+        if self.node_load_thread is not None:
+            logging.warning("A node file is already being loaded.")
+            return
+        try:
+            self.node_data.clear_nodes()
+            self.node_data.set_projection(self.map_data.crs, self.map_data.proj_string)  # 设置节点投影
+            self.node_data.get_transformed_nodes()  # 空缓存，后续批次增量转换
+            self.get_node_layer().set_nodes(self.node_data.nodes)
+        except Exception as e:
+            logging.exception("导入节点时发生错误")
+            show_error_message(self, "导入错误", f"无法导入节点:\n{e}")
+            return
+        self.node_columns = (x_column, y_column)
+        self.node_source = filepath
+        self.node_load_thread = QThread(self)
+        self.node_load_worker = NodeLoadWorker(filepath, [x_column, y_column])
+        self.node_load_worker.moveToThread(self.node_load_thread)
+        self.node_load_thread.started.connect(self.node_load_worker.run)
+        self.node_load_worker.batch_loaded.connect(self.on_node_batch_loaded)
+        self.node_load_worker.finished.connect(self.on_node_load_finished)
+        self.node_load_worker.failed.connect(self.on_node_load_failed)
+        for signal in (self.node_load_worker.finished, self.node_load_worker.failed,
+                       self.node_load_worker.cancelled):
+            signal.connect(self.node_load_thread.quit)  # 任务结束后退出线程
+        self.node_load_thread.finished.connect(self.cleanup_node_load)
+        self.node_load_thread.start()
+
+    def cancel_node_load(self, wait: bool = False) -> None:
+        """
+        取消正在进行的节点加载，已读取的节点保留在图层中
+        参数:
+            wait (bool): 是否等待后台线程退出
+        """
+        if self.node_load_worker is not None:
+            self.node_load_worker.cancel()
+        if wait and self.node_load_thread is not None:
+            self.node_load_thread.wait()
+
+    def on_node_batch_loaded(self, batch) -> None:
+        """
+        在 GUI 线程中追加一批节点并绘制
+        参数:
+            batch (pd.DataFrame): 一批节点数据
+        """
+        if self.node_load_worker is None or self.node_load_worker.is_cancelled():
+            return  # 取消后仍在队列中的批次直接丢弃
+        try:
+            start, end = self.node_data.append_nodes(batch, *self.node_columns)
+            self.draw_node_batch(start, end)
+        except Exception as e:
+            logging.exception("Failed to draw node batch.")
+            self.cancel_node_load()
+            show_error_message(self, "导入错误", f"绘制节点时出错:\n{e}")
+
+    def on_node_load_finished(self) -> None:
+        """
+        全部节点读取完成
+        """
+        invalid = int(self.node_data.invalid_mask.sum())
+        if invalid:
+            logging.warning(f"{invalid} of {len(self.node_data.nodes)} nodes have invalid coordinates.")
+        logging.info(f"Imported {len(self.node_data.nodes)} nodes.")
+        if self.pending_node_ids is not None:
+            self.keep_nodes(self.pending_node_ids)  # 打开项目：去掉保存项目前已删除的节点
+            self.pending_node_ids = None
+
+    def on_node_load_failed(self, message: str) -> None:
+        """
+        节点后台加载失败
+        参数:
+            message (str): 错误信息
+        """
+        self.pending_node_ids = None
+        show_error_message(self, "导入错误", f"无法导入节点:\n{message}")
+
+    def cleanup_node_load(self) -> None:
+        """
+        后台线程退出后释放加载器和线程对象
+        """
+        if self.node_load_worker is not None:
+            self.node_load_worker.deleteLater()
+        if self.node_load_thread is not None:
+            self.node_load_thread.deleteLater()
+        self.node_load_worker = None
+        self.node_load_thread = None
+
     def change_projection(self, new_proj: str) -> None:
         """
-        更改投影并重新绘制地图和节点
+        更改投影，原地更新地图和节点的场景项（不重新创建），选择和高亮保持不变
         参数:
             new_proj (str): 新的投影字符串，例如 'EPSG:4326'
         """
         try:
             logging.info(f"Changing projection to: {new_proj}")
             epsg_code = new_proj.split(' - ')[0]  # 获取 EPSG 代码
-            self.map_data.change_projection(epsg_code)  # 更改地图投影
+            for layer in self.layers:
+                layer.map_data.change_projection(epsg_code)  # 更改各图层的投影
             self.node_data.set_projection(self.map_data.crs, self.map_data.proj_string)  # 更新节点投影
             self.update_pen_width()  # 更新线宽
-            self.draw_map()  # 重新绘制地图
-            self.draw_nodes()  # 重新绘制节点
+            self.reproject_map()  # 原地替换要素项的路径
+            if self.node_layer is not None and len(self.node_data.nodes):
+                self.node_layer.move_nodes(self.node_data.get_transformed_nodes())  # 原地移动节点
+                self.update_node_layer_scale()
         except Exception as e:
             logging.error(f"Failed to change projection: {e}")
             show_error_message(self, "投影错误", f"无法更改地图投影:\n{e}")
 
     def delete_map(self) -> None:
         """
-        删除地图和节点
+        删除所有图层和节点，保留一个空图层
         """
         logging.info("Deleting map and nodes.")
-        # 清除地图项
-        for item in self.polygon_items:
-            self.scene.removeItem(item)
-        self.polygon_items.clear()
+        self.cancel_node_load()  # 停止正在进行的节点导入
+        self.cancel_projection_precompute()  # 被删除图层的预计算结果不再需要
+        self.pending_node_ids = None
+        self.node_source = None
+        # 清除图层（同时停止分批绘制）
+        for index in reversed(range(len(self.layers))):
+            self.remove_layer(index)
         # 清除节点项
-        for item in self.node_items:
-            self.scene.removeItem(item)
-        self.node_items.clear()
+        if self.node_layer is not None:
+            self.scene.removeItem(self.node_layer)
+            self.node_layer = None
         # 清除其他项
         if hasattr(self, 'ocean_item') and self.ocean_item:
             self.scene.removeItem(self.ocean_item)
@@ -99,10 +507,5 @@ class LayerManagerMixin:
         if hasattr(self, 'boundary_item') and self.boundary_item:
             self.scene.removeItem(self.boundary_item)
             self.boundary_item = None
-        if hasattr(self, 'boundary_items') and self.boundary_items:
-            for item in self.boundary_items:
-                self.scene.removeItem(item)
-            self.boundary_items.clear()
         self.highlighted_items.clear()  # 清空高亮项
-        self.map_data.clear_map()  # 清空地图数据
         self.node_data.clear_nodes()  # 清空节点数据
@@ -0,0 +1,158 @@
+# ui/mapWidget_components/loadWorker.py
+# 功能：在后台线程中解析 Shapefile 和节点文件、预先计算常用投影，报告进度并支持取消
+
+from PyQt5.QtCore import QObject, pyqtSignal
+import logging
+import threading
+from core.mapData import LoadCancelledError
+from core.nodeReaders import get_node_reader
+
+
+class ShapefileLoadWorker(QObject):
+    """
+    Shapefile 后台加载器，需移动到 QThread 中运行
+    """
+    progress = pyqtSignal(int, int)  # 信号：加载进度 (已处理数量, 总数量)
+    finished = pyqtSignal(object)  # 信号：解析完成，携带 MapData.read_shapefile 的结果
+    failed = pyqtSignal(str)  # 信号：加载失败，携带错误信息
+    cancelled = pyqtSignal()  # 信号：加载已取消
+
+    def __init__(self, map_data, filepath: str, encodings=('utf-8', 'gbk'), chunk_size: int = 1000):
+        """
+        初始化后台加载器
+        参数:
+            map_data (MapData): 负责解析的 MapData 对象（解析过程中不修改其状态）
+            filepath (str): Shapefile 文件路径
+            encodings (tuple): 依次尝试的文件编码
+            chunk_size (int): 每处理多少个要素报告一次进度
+        """
+        super().__init__()
+        self.map_data = map_data
+        self.filepath = filepath
+        self.encodings = encodings
+        self.chunk_size = chunk_size
+        self._cancel_event = threading.Event()  # 取消标志，可从 GUI 线程设置
+
+    def cancel(self) -> None:
+        """
+        请求取消加载，解析会在下一个数据块结束时停止
+        """
+        self._cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def run(self) -> None:
+        """
+        在后台线程中解析 Shapefile，依次尝试各个编码
+        """
+        for encoding in self.encodings:
+            try:
+                layer = self.map_data.read_shapefile(
+                    self.filepath, encoding=encoding, chunk_size=self.chunk_size,
+                    progress_callback=self.progress.emit, is_cancelled=self.is_cancelled)
+                self.finished.emit(layer)
+                return
+            except LoadCancelledError:
+                logging.info(f"Shapefile loading cancelled: {self.filepath}")
+                self.cancelled.emit()
+                return
+            except UnicodeDecodeError:
+                logging.warning(f"Failed to decode with {encoding}, trying next encoding.")
+            except Exception as e:
+                logging.exception("Failed to import shapefile.")
+                self.failed.emit(str(e))
+                return
+        self.failed.emit(f"无法使用以下编码解码文件: {', '.join(self.encodings)}")
+
+
+class NodeLoadWorker(QObject):
+    """
+    节点文件后台加载器，逐批读取并发送给 GUI 线程，需移动到 QThread 中运行
+    """
+    batch_loaded = pyqtSignal(object)  # 信号：读取到一批节点，携带 DataFrame
+    finished = pyqtSignal()  # 信号：全部节点读取完成
+    failed = pyqtSignal(str)  # 信号：加载失败，携带错误信息
+    cancelled = pyqtSignal()  # 信号：加载已取消
+
+    def __init__(self, filepath: str, columns: list, batch_size: int = 200000):
+        """
+        初始化后台加载器
+        参数:
+            filepath (str): 节点文件路径，按扩展名选择读取器
+            columns (list): 需要读取的列
+            batch_size (int): 每批读取的行数
+        """
+        super().__init__()
+        self.filepath = filepath
+        self.columns = columns
+        self.batch_size = batch_size
+        self._cancel_event = threading.Event()  # 取消标志，可从 GUI 线程设置
+
+    def cancel(self) -> None:
+        """
+        请求取消加载，读取会在当前批次结束时停止
+        """
+        self._cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def run(self) -> None:
+        """
+        在后台线程中逐批读取节点文件
+        """
+        try:
+            reader = get_node_reader(self.filepath, self.columns, self.batch_size)
+            for batch in reader.iter_batches():
+                if self.is_cancelled():
+                    logging.info(f"Node loading cancelled: {self.filepath}")
+                    self.cancelled.emit()
+                    return
+                self.batch_loaded.emit(batch)
+            self.finished.emit()
+        except Exception as e:
+            logging.exception("Failed to import nodes.")
+            self.failed.emit(str(e))
+
+
+class ProjectionPrecomputeWorker(QObject):
+    """
+    投影预计算器：在后台把图层转换到菜单中的各个投影并存入 MapData 的投影缓存，需移动到 QThread 中运行
+    """
+    finished = pyqtSignal(list)  # 信号：预计算完成，携带新缓存的投影
+    failed = pyqtSignal(str)  # 信号：预计算失败，携带错误信息
+
+    def __init__(self, map_data, projections: list, max_workers: int = None):
+        """
+        初始化预计算器
+        参数:
+            map_data (MapData): 要预计算的图层数据
+            projections (list): 投影字符串列表
+            max_workers (int): 线程池大小，默认按投影数量和 CPU 核数选择
+        """
+        super().__init__()
+        self.map_data = map_data
+        self.projections = projections
+        self.max_workers = max_workers
+        self._cancel_event = threading.Event()  # 取消标志，可从 GUI 线程设置
+
+    def cancel(self) -> None:
+        """
+        请求取消预计算，已经开始的投影会继续完成
+        """
+        self._cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def run(self) -> None:
+        """
+        在后台线程中预计算各个投影
+        """
+        try:
+            done = self.map_data.precompute_projections(self.projections, self.max_workers, self.is_cancelled)
+            self.finished.emit(done)
+        except Exception as e:
+            logging.exception("Failed to precompute projections.")
+            self.failed.emit(str(e))
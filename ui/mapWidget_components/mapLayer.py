@@ -0,0 +1,102 @@
+# ui/mapWidget_components/mapLayer.py
+# 功能：提供地图图层对象，每个图层保存自己的地图数据、显示状态、样式和场景项组
+
+from PyQt5.QtGui import QPen, QBrush, QColor
+from PyQt5.QtWidgets import QGraphicsItemGroup
+from PyQt5.QtCore import Qt
+import os
+
+DEFAULT_STYLE = {
+    'fill': QColor(0, 100, 0),  # 多边形填充颜色
+    'outline': QColor(Qt.black),  # 多边形边界颜色
+    'outline_width': 0.2,  # 多边形边界宽度（像素）
+    'line': QColor(Qt.blue),  # 线要素颜色
+}
+LAYER_FILLS = [QColor(0, 100, 0), QColor(214, 160, 60, 180), QColor(170, 80, 80, 160),
+               QColor(110, 90, 170, 160), QColor(60, 150, 170, 160)]  # 新图层依次使用的填充颜色
+LAYER_LINES = [QColor(Qt.blue), QColor(200, 40, 40), QColor(90, 90, 90), QColor(230, 120, 0)]  # 新图层的线颜色
+LAYER_Z_BASE = 1.0  # 最下层图层的 Z 值（海洋背景为 0，投影边框为 3）
+LAYER_Z_STEP = 0.001  # 相邻图层的 Z 值间隔
+
+
+class MapLayer:
+    """
+    地图图层：一个 MapData 及其在场景中的表示
+    图层的所有要素项属于同一个 QGraphicsItemGroup，切换可见性和调整顺序只需修改该组
+    """
+    def __init__(self, map_data, name: str = "", style: dict = None):
+        """
+        参数:
+            map_data (MapData): 图层的地图数据
+            name (str): 图层名称
+            style (dict): 图层样式，缺少的键使用 DEFAULT_STYLE
+        """
+        self.map_data = map_data
+        self.name = name
+        self.style = dict(DEFAULT_STYLE, **(style or {}))
+        self.visible = True
+        self.group = QGraphicsItemGroup()  # 图层的场景项组
+        self.polygon_items = []  # 多边形要素项
+        self.line_items = []  # 线要素项
+        self.tile_item = None  # 分块模式下的栅格图层项
+        self.lod_level = 0  # 当前绘制使用的细节层级
+        self.pending_feature_ids = None  # 等待分批绘制的要素索引
+
+    @classmethod
+    def default_style(cls, position: int) -> dict:
+        """
+        第 position 个图层的默认样式，不同图层使用不同的颜色
+        """
+        return {'fill': QColor(LAYER_FILLS[position % len(LAYER_FILLS)]),
+                'line': QColor(LAYER_LINES[position % len(LAYER_LINES)])}
+
+    @staticmethod
+    def name_for(filepath: str) -> str:
+        return os.path.splitext(os.path.basename(filepath))[0]
+
+    def has_data(self) -> bool:
+        return len(self.map_data.geometry_array) > 0
+
+    def set_visible(self, visible: bool) -> None:
+        """
+        切换图层可见性，只隐藏场景项组，不重新绘制
+        """
+        self.visible = visible
+        self.group.setVisible(visible)
+
+    def set_z_order(self, position: int) -> None:
+        self.group.setZValue(LAYER_Z_BASE + position * LAYER_Z_STEP)
+
+    def add_item(self, item) -> None:
+        """
+        把场景项加入图层的场景项组
+        """
+        self.group.addToGroup(item)
+
+    def feature_style(self, is_line: bool = False, line_width: float = 1.5) -> tuple:
+        """
+        要素的边界笔刷和填充
+        参数:
+            is_line (bool): 是否为线要素
+            line_width (float): 线要素的线宽（随投影变化）
+        返回:
+            tuple: (QPen, QBrush)
+        """
+        if is_line:
+            return QPen(self.style['line'], line_width, Qt.SolidLine), QBrush(Qt.NoBrush)  # 线不填充颜色
+        return QPen(self.style['outline'], self.style['outline_width'], Qt.SolidLine), QBrush(self.style['fill'])
+
+    def style_state(self) -> dict:
+        """
+        可写入项目文件的样式（颜色为 #AARRGGBB 字符串）
+        """
+        return {key: value.name(QColor.HexArgb) if isinstance(value, QColor) else value
+                for key, value in self.style.items()}
+
+    @staticmethod
+    def parse_style(state: dict) -> dict:
+        """
+        由 style_state 的结果还原样式
+        """
+        return {key: QColor(value) if key in ('fill', 'outline', 'line') else value
+                for key, value in (state or {}).items()}
@@ -0,0 +1,248 @@
+# ui/mapWidget_components/nodeLayer.py
+# 功能：提供批量节点图层项，所有节点共用一个场景项，节点位置保存在 NumPy 数组中，一次 paint 调用绘制全部可见节点
+
+from PyQt5.QtGui import QPainter, QPixmap, QPen
+from PyQt5.QtWidgets import QGraphicsItem
+from PyQt5.QtCore import QPointF, QRectF, Qt
+from PyQt5 import sip
+import numpy as np
+from core.growableArray import GrowableArray
+
+
+class NodeLayerItem(QGraphicsItem):
+    """
+    节点图层项：节点图片按设备像素绘制，不随视图缩放（与 ItemIgnoresTransformations 的效果一致）
+    选择和命中测试由图层自己完成，不依赖场景的逐项索引
+    """
+    def __init__(self, pixmap: QPixmap, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pixmap = pixmap  # 节点图片
+        # 节点数组按倍数扩容，流式导入逐批追加时不重复复制已有节点
+        self._positions = GrowableArray((2,))  # (N, 2) 节点的场景坐标
+        self._node_ids = GrowableArray(dtype=np.int64)  # 每个位置对应的节点行号
+        self._valid = GrowableArray(dtype=bool)  # 每个位置是否为有限坐标，无效的节点保留在图层中但不绘制、不参与命中测试
+        self._selected = GrowableArray(dtype=bool)  # 每个节点是否被选中
+        self.view_scale = 1.0  # 每个场景单位对应的设备像素，用于换算图片占据的场景范围
+        self.bounds = QRectF()  # 所有节点位置的包围盒
+        self.extent = None  # 包围盒的 (min_x, min_y, max_x, max_y)，用于逐批扩展
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)  # 获取 exposedRect
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.valid))  # 可显示的节点数量
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self._positions.values
+
+    @positions.setter
+    def positions(self, positions: np.ndarray) -> None:
+        self._positions.set(positions)
+
+    @property
+    def node_ids(self) -> np.ndarray:
+        return self._node_ids.values
+
+    @node_ids.setter
+    def node_ids(self, node_ids: np.ndarray) -> None:
+        self._node_ids.set(node_ids)
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self._valid.values
+
+    @valid.setter
+    def valid(self, valid: np.ndarray) -> None:
+        self._valid.set(valid)
+
+    @property
+    def selected(self) -> np.ndarray:
+        return self._selected.values
+
+    @selected.setter
+    def selected(self, selected: np.ndarray) -> None:
+        self._selected.set(selected)
+
+    def set_nodes(self, positions: np.ndarray, node_ids: np.ndarray = None) -> None:
+        """
+        替换图层中的全部节点，无效坐标的节点保留但不显示
+        参数:
+            positions (np.ndarray): (N, 2) 节点的场景坐标
+            node_ids (np.ndarray): 每个位置对应的节点行号，默认为 0..N-1
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        if node_ids is None:
+            node_ids = np.arange(len(positions), dtype=np.int64)
+        self.prepareGeometryChange()
+        self.positions = np.ascontiguousarray(positions)
+        self.node_ids = np.asarray(node_ids, dtype=np.int64)
+        self.valid = np.isfinite(positions).all(axis=1)
+        self.selected = np.zeros(len(self.positions), dtype=bool)
+        self.update_bounds()
+
+    def append_nodes(self, positions: np.ndarray, node_ids: np.ndarray) -> None:
+        """
+        追加一批节点（用于流式导入），无效坐标的节点保留但不显示
+        参数:
+            positions (np.ndarray): (N, 2) 节点的场景坐标
+            node_ids (np.ndarray): 每个位置对应的节点行号
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        self.prepareGeometryChange()
+        self._positions.append(positions)
+        self._node_ids.append(node_ids)
+        self._valid.append(np.isfinite(positions).all(axis=1))
+        self._selected.append(np.zeros(len(positions), dtype=bool))
+        self.update_bounds(positions)
+
+    def move_nodes(self, positions: np.ndarray) -> None:
+        """
+        按节点行号更新所有节点的位置（例如投影改变后），选中状态保持不变
+        新坐标无效的节点只是暂时不显示，投影改回后重新出现
+        参数:
+            positions (np.ndarray): (M, 2) 按节点行号排列的场景坐标
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)[self.node_ids]
+        self.prepareGeometryChange()
+        self.positions = np.ascontiguousarray(positions)
+        self.valid = np.isfinite(positions).all(axis=1)
+        self.update_bounds()
+
+    def remove_nodes(self, indices: np.ndarray) -> None:
+        """
+        从图层中移除指定位置的节点
+        参数:
+            indices (np.ndarray): 要移除的节点在图层中的位置
+        """
+        keep = np.ones(len(self.positions), dtype=bool)
+        keep[indices] = False
+        self.prepareGeometryChange()
+        self.positions = self.positions[keep]
+        self.node_ids = self.node_ids[keep]
+        self.valid = self.valid[keep]
+        self.selected = self.selected[keep]
+        self.update_bounds()
+
+    def update_bounds(self, appended: np.ndarray = None) -> None:
+        """
+        重新计算有效节点位置的包围盒
+        参数:
+            appended (np.ndarray): 新追加的节点位置，给出时只用它们扩展已有的包围盒
+        """
+        if appended is None:
+            positions, extent = self.positions[self.valid], None
+        else:
+            positions, extent = appended[np.isfinite(appended).all(axis=1)], self.extent
+        if len(positions):
+            batch = np.concatenate((positions.min(axis=0), positions.max(axis=0)))
+            extent = batch if extent is None else np.concatenate((np.minimum(extent[:2], batch[:2]),
+                                                                  np.maximum(extent[2:], batch[2:])))
+        self.extent = extent  # (min_x, min_y, max_x, max_y)，没有有效节点时为 None
+        if extent is not None:
+            min_x, min_y, max_x, max_y = extent.tolist()
+            self.bounds = QRectF(min_x, min_y, max_x - min_x, max_y - min_y)
+        else:
+            self.bounds = QRectF()
+        self.update()
+
+    def set_pixmap(self, pixmap: QPixmap) -> None:
+        """
+        更换节点图片，不重建节点
+        参数:
+            pixmap (QPixmap): 新的节点图片
+        """
+        self.prepareGeometryChange()
+        self.pixmap = pixmap
+        self.update()
+
+    def set_view_scale(self, scale: float) -> None:
+        """
+        视图缩放后更新图片占据的场景范围
+        参数:
+            scale (float): 每个场景单位对应的设备像素
+        """
+        if scale > 0 and scale != self.view_scale:
+            self.prepareGeometryChange()
+            self.view_scale = scale
+
+    def half_extent(self) -> tuple:
+        """
+        节点图片一半宽高对应的场景距离
+        """
+        return self.pixmap.width() / 2 / self.view_scale, self.pixmap.height() / 2 / self.view_scale
+
+    def boundingRect(self) -> QRectF:
+        if not len(self):
+            return QRectF()
+        half_width, half_height = self.half_extent()
+        return self.bounds.adjusted(-half_width, -half_height, half_width, half_height)
+
+    def indices_in_rect(self, rect: QRectF, margin: bool = False) -> np.ndarray:
+        """
+        查找位于矩形范围内的有效节点
+        参数:
+            rect (QRectF): 场景坐标中的矩形范围
+            margin (bool): 是否把图片覆盖的范围也算在内
+        返回:
+            np.ndarray: 节点在图层中的位置
+        """
+        half_width, half_height = self.half_extent() if margin else (0.0, 0.0)
+        x, y = self.positions[:, 0], self.positions[:, 1]
+        inside = self.valid & (x >= rect.left() - half_width) & (x <= rect.right() + half_width) & \
+                 (y >= rect.top() - half_height) & (y <= rect.bottom() + half_height)
+        return np.flatnonzero(inside)
+
+    def node_at(self, scene_pos: QPointF) -> int:
+        """
+        查找图片覆盖指定场景坐标的最上层节点
+        参数:
+            scene_pos (QPointF): 场景坐标
+        返回:
+            int: 节点在图层中的位置，未命中时返回 -1
+        """
+        hits = self.indices_in_rect(QRectF(scene_pos, scene_pos), margin=True)
+        return int(hits[-1]) if len(hits) else -1  # 后绘制的节点位于上层
+
+    def set_selection(self, indices: np.ndarray) -> None:
+        """
+        设置选中的节点
+        参数:
+            indices (np.ndarray): 节点在图层中的位置
+        """
+        self.selected = np.zeros(len(self.positions), dtype=bool)
+        self.selected[indices] = True
+        self.update()
+
+    def paint(self, painter: QPainter, option, widget=None) -> None:
+        """
+        一次性绘制所有可见节点：坐标批量转换为设备坐标，同一像素上的节点只绘制一次
+        """
+        if not len(self):
+            return
+        visible = self.indices_in_rect(option.exposedRect, margin=True)
+        if not len(visible):
+            return
+        transform = painter.worldTransform()
+        x, y = self.positions[visible, 0], self.positions[visible, 1]
+        device_x = transform.m11() * x + transform.m21() * y + transform.dx()
+        device_y = transform.m12() * x + transform.m22() * y + transform.dy()
+        # 同一像素上的节点绘制结果相同，去重后绘制数量不超过视口像素数
+        pixel = (np.round(device_x).astype(np.int64) << 32) + np.round(device_y).astype(np.int64)
+        _, first = np.unique(pixel, return_index=True)
+        first.sort()  # 保持原有的绘制顺序
+        width, height = self.pixmap.width(), self.pixmap.height()
+        fragments = sip.array(QPainter.PixmapFragment, len(first))
+        # PixmapFragment: x, y, sourceLeft, sourceTop, width, height, scaleX, scaleY, rotation, opacity
+        fields = np.frombuffer(fragments, dtype=np.float64).reshape(len(first), 10)
+        fields[:] = (0.0, 0.0, 0.0, 0.0, width, height, 1.0, 1.0, 0.0, 1.0)
+        fields[:, 0] = device_x[first]
+        fields[:, 1] = device_y[first]
+        painter.save()
+        painter.resetTransform()  # 按设备像素绘制，图片不随视图缩放和翻转
+        painter.drawPixmapFragments(fragments, self.pixmap)
+        selected = np.flatnonzero(self.selected[visible])
+        if len(selected):
+            painter.setPen(QPen(Qt.red, 2))
+            painter.setBrush(Qt.NoBrush)
+            for index in selected.tolist():
+                painter.drawRect(QRectF(device_x[index] - width / 2, device_y[index] - height / 2, width, height))
+        painter.restore()
@@ -0,0 +1,188 @@
+# ui/mapWidget_components/projectManager.py
+# 功能：保存和恢复项目（各图层及其显示状态和样式、投影、节点、节点尺寸、视图和高亮），恢复时先绘制保存的视图范围
+
+import logging
+import numpy as np
+import pandas as pd
+from ui.mapWidget_components.mapLayer import MapLayer
+from core.projectFile import (
+    save_project, load_project, load_project_array, extract_embedded_cache, source_reference, resolve_source
+)
+
+
+class ProjectMixin:
+    def get_project_state(self, project_path: str) -> dict:
+        """
+        收集当前会话状态
+        参数:
+            project_path (str): 项目文件路径，数据源按相对于它的路径记录
+        返回:
+            dict: 会话状态
+        """
+        state = {
+            'layers': [],  # 从下到上的图层
+            'active': 0,  # 当前图层在 layers 中的位置
+            'projection': self.map_data.proj_string,
+            'tiled': self.tiled_mode,
+            'node_size': int(round(self.node_scale_factor * 100)),
+            'nodes': None,
+            'view': None,
+            'highlights': sorted({int(item.feature_id) for item in self.highlighted_items}),
+        }
+        for layer in self.layers:
+            if layer.map_data.source is None:
+                continue
+            filepath, encoding = layer.map_data.source
+            layer_state = {'source': source_reference(project_path, filepath), 'encoding': encoding,
+                           'name': layer.name, 'visible': layer.visible, 'style': layer.style_state()}
+            if layer.map_data.cache is not None:
+                layer_state['cache_key'] = layer.map_data.cache.source_key(filepath, encoding)
+            if layer is self.active_layer:
+                state['active'] = len(state['layers'])
+            state['layers'].append(layer_state)
+        if state['layers']:
+            transform = self.transform()
+            extent = self.mapToScene(self.viewport().rect()).boundingRect()
+            center = self.mapToScene(self.viewport().rect().center())
+            state['view'] = {
+                'transform': [transform.m11(), transform.m12(), transform.m13(), transform.m21(), transform.m22(),
+                              transform.m23(), transform.m31(), transform.m32(), transform.m33()],
+                'center': [center.x(), center.y()],
+                'extent': [extent.x(), extent.y(), extent.width(), extent.height()],
+            }
+        if len(self.node_data.nodes):
+            x_column, y_column = self.node_columns
+            state['nodes'] = {'source': source_reference(project_path, self.node_source) if self.node_source else None,
+                              'x_column': x_column, 'y_column': y_column, 'count': len(self.node_data.nodes)}
+        return state
+
+    def save_project(self, path: str, embed: bool = False) -> None:
+        """
+        保存项目文件
+        参数:
+            path (str): 项目文件路径
+            embed (bool): 是否内嵌几何缓存和节点坐标，内嵌后在其他机器上打开时不需要重新解析数据源
+        """
+        state = self.get_project_state(path)
+        arrays = {}
+        if state['nodes'] is not None:
+            if self.node_layer is not None:
+                arrays['node_ids'] = self.node_layer.node_ids  # 图层中剩余的节点（不含已删除的节点）
+            if embed or self.node_source is None:
+                arrays['nodes'] = self.node_data.nodes
+        cache_dirs = {}
+        if embed:
+            layers = [layer for layer in self.layers if layer.map_data.source is not None]
+            for position, (layer, layer_state) in enumerate(zip(layers, state['layers'])):
+                cache = layer.map_data.cache
+                filepath, encoding = layer.map_data.source
+                if cache is not None and cache.has_layer(filepath, encoding) is not None:
+                    cache_dirs[str(position)] = cache.entry_dir(filepath, encoding)
+                    layer_state['cache'] = str(position)
+                else:
+                    logging.warning(f"No layer cache for {filepath}; saving the project without its geometry.")
+        save_project(path, state, arrays, cache_dirs)
+
+    def open_project(self, path: str) -> dict:
+        """
+        打开项目：清空当前地图，在后台依次加载各图层，全部加载后由 restore_project_layer 恢复视图
+        参数:
+            path (str): 项目文件路径
+        返回:
+            dict: 项目的会话状态
+        """
+        state = load_project(path)
+        self.cancel_shapefile_load(wait=True)
+        self.delete_map()
+        self.update_node_size(state.get('node_size', 50))
+        self.tiled_mode = bool(state.get('tiled'))  # 地图已清空，只记录模式，绘制时生效
+        queue = []
+        cache = self.map_data.cache
+        for layer_state in state['layers']:
+            filepath = resolve_source(path, layer_state['source'])
+            encoding = layer_state.get('encoding', 'utf-8')
+            if cache is not None and 'cache' in layer_state and \
+                    layer_state.get('cache_key') == cache.source_key(filepath, encoding):
+                # 数据源未修改时使用内嵌的缓存
+                extract_embedded_cache(path, cache.entry_dir(filepath, encoding), layer_state['cache'])
+            queue.append((filepath, encoding, layer_state))
+        if not queue:
+            self.restore_project_nodes(path, state)
+            return state
+        self.pending_project = {'path': path, 'state': state, 'queue': queue, 'loading': None}
+        self.load_next_project_layer()
+        return state
+
+    def load_next_project_layer(self) -> None:
+        """
+        在后台加载项目中的下一个图层
+        """
+        filepath, encoding, layer_state = self.pending_project['queue'].pop(0)
+        self.pending_project['loading'] = layer_state
+        self.start_shapefile_load(filepath, (encoding,))
+
+    def restore_project_layer(self, layer: MapLayer) -> None:
+        """
+        恢复刚加载的图层的名称、可见性和样式；最后一个图层加载后恢复投影、视图、节点和高亮
+        （由 on_shapefile_loaded 调用）
+        参数:
+            layer (MapLayer): 刚加载的图层
+        """
+        layer_state = self.pending_project['loading']
+        layer.name = layer_state.get('name') or layer.name
+        layer.style.update(MapLayer.parse_style(layer_state.get('style')))
+        layer.set_visible(layer_state.get('visible', True))
+        self.emit_layers_changed()
+        if self.pending_project['queue']:
+            return  # 后台线程结束后加载下一个图层
+        path, state = self.pending_project['path'], self.pending_project['state']
+        self.pending_project = None
+        active = state.get('active', 0)
+        if 0 <= active < len(self.layers):
+            self.set_active_layer(active)
+        projection = state.get('projection') or self.map_data.crs
+        for map_layer in self.layers:
+            map_layer.map_data.change_projection(projection)
+        self.update_pen_width()
+        view = state.get('view')
+        if view is not None:
+            view = dict(view, priority=state.get('highlights'))  # 高亮的要素与视图范围一起先绘制
+        self.draw_map(view)
+        self.restore_project_nodes(path, state)
+        if state.get('highlights'):
+            self.select_features(state['highlights'])
+
+    def restore_project_nodes(self, path: str, state: dict) -> None:
+        """
+        恢复节点：优先使用内嵌的节点坐标，否则在后台重新导入节点文件
+        参数:
+            path (str): 项目文件路径
+            state (dict): 项目的会话状态
+        """
+        nodes = state.get('nodes')
+        if nodes is None:
+            return
+        x_column, y_column = nodes['x_column'], nodes['y_column']
+        node_ids = load_project_array(path, 'node_ids')
+        coords = load_project_array(path, 'nodes')
+        if coords is None:
+            self.pending_node_ids = node_ids  # 导入完成后去掉已删除的节点
+            self.start_node_load(resolve_source(path, nodes['source']), x_column, y_column)
+            return
+        self.node_columns = (x_column, y_column)
+        self.node_source = nodes['source']['absolute_path'] if nodes.get('source') else None
+        self.node_data.set_nodes(pd.DataFrame(coords, columns=[x_column, y_column]), x_column, y_column)
+        self.node_data.set_projection(self.map_data.crs, self.map_data.proj_string)
+        self.draw_nodes()
+        if node_ids is not None:
+            self.keep_nodes(node_ids)
+
+    def keep_nodes(self, node_ids) -> None:
+        """
+        节点图层只保留指定行号的节点
+        参数:
+            node_ids: 要保留的节点行号
+        """
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        node_ids = node_ids[(node_ids >= 0) & (node_ids < len(self.node_data.nodes))]
+        self.get_node_layer().set_nodes(self.node_data.get_transformed_nodes()[node_ids], node_ids)
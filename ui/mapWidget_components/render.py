@@ -4,9 +4,10 @@
 from .baseRender import BaseRenderMixin
 from .layerManager import LayerManagerMixin
 from .renderUtils import RenderUtilsMixin
+from .tileRender import TileRenderMixin
 
-class RenderMixin(BaseRenderMixin, LayerManagerMixin, RenderUtilsMixin):
+class RenderMixin(BaseRenderMixin, LayerManagerMixin, RenderUtilsMixin, TileRenderMixin):
     """
-    组合渲染相关的所有功能，包括基本渲染、图层管理和渲染工具的功能。
+    组合渲染相关的所有功能，包括基本渲染、图层管理、渲染工具和分块渲染的功能。
     """
     pass
@@ -3,11 +3,12 @@
 
 from PyQt5.QtGui import QPixmap, QTransform, QPen, QBrush, QColor
 from PyQt5.QtWidgets import QGraphicsItem
-from PyQt5.QtCore import QRectF, Qt
+from PyQt5.QtCore import QRectF, Qt, QTimer
 import logging
 import os
 from core.mapData import MapData
 from core.nodeData import NodeData
+from ui.mapWidget_components.mapLayer import MapLayer
 from utils.utils import is_valid_coordinate
 
 class RenderUtilsMixin:
@@ -16,7 +17,9 @@ class RenderUtilsMixin:
         初始化场景和基本设置
         """
         # 使用 MapWidget 中的 scene
-        self.map_data = MapData()  # 创建 MapData 对象，存储地图数据
+        self.layers = []  # 地图图层，按绘制顺序排列（最后一个在最上层）
+        self.active_layer = None  # 当前图层，选择、属性表和查询作用于该图层
+        self.add_layer(MapLayer(MapData(), "Layer 1"))  # 初始的空图层，导入的第一个 Shapefile 使用该图层
         self.node_data = NodeData()  # 创建 NodeData 对象，存储节点数据
         self.default_pen_width = 0.01  # 设置默认笔刷宽度
         self.map_pen = QPen(Qt.black, self.default_pen_width)  # 初始化地图边框笔刷
@@ -24,12 +27,27 @@ class RenderUtilsMixin:
         self.line_pen = QPen(Qt.blue, 1.5)  # 初始化线的笔刷
         self.line_brush = QBrush(Qt.NoBrush)  # 线不填充颜色
         self.node_scale_factor = 0.5  # 设置节点缩放因子
-        self.node_items = []  # 存储节点项
-        self.polygon_items = []  # 存储多边形项
+        self.node_layer = None  # 批量绘制所有节点的图层项
         self.highlighted_items = []  # 存储高亮项
         self.ocean_item = None  # 存储海洋项
         self.boundary_item = None  # 存储边界项
-        self.boundary_items = []  # 存储边界项列表
+        self.load_thread = None  # Shapefile 后台加载线程
+        self.load_worker = None  # Shapefile 后台加载器
+        self.node_load_thread = None  # 节点文件后台加载线程
+        self.node_load_worker = None  # 节点文件后台加载器
+        self.node_columns = ('Longitude', 'Latitude')  # 节点文件的经纬度列名
+        self.node_source = None  # 当前节点文件路径
+        self.pending_project = None  # 正在恢复的项目 (项目文件路径, 会话状态)
+        self.pending_node_ids = None  # 节点导入完成后保留的节点行号（恢复项目时使用）
+        self.precompute_projections = []  # 导入图层后在后台预先计算的投影，为空时不预计算
+        self.precompute_queue = []  # 等待预计算投影的图层数据
+        self.precompute_thread = None  # 投影预计算线程
+        self.precompute_worker = None  # 投影预计算器
+        self.fill_batch_size = 2000  # 每批绘制的要素数量
+        self.fill_timer = QTimer(self)  # 事件循环空闲时绘制下一批要素
+        self.fill_timer.setSingleShot(True)
+        self.fill_timer.setInterval(0)
+        self.fill_timer.timeout.connect(self.draw_pending_features)
 
     def load_node_image(self) -> None:
         """
@@ -54,18 +72,16 @@ class RenderUtilsMixin:
         """
         获取投影后的地图范围
         返回:
-            QRectF: 包含所有多边形和线的最小边界矩形
+            QRectF: 包含所有图层的多边形和线的最小边界矩形
         """
-        transformed_polygons = self.map_data.get_transformed_polygons()  # 获取转换后的多边形
-        transformed_lines = self.map_data.get_transformed_lines()  # 获取转换后的线
-        all_coords = [coord for shape in transformed_polygons for coord in shape] + [coord for shape in transformed_lines for coord in shape]
-        if not all_coords:
+        # 直接从转换后的坐标数组计算范围
+        bounds = [layer.map_data.get_transformed_bounds() for layer in self.layers if layer.has_data()]
+        bounds = [layer_bounds for layer_bounds in bounds if layer_bounds is not None]
+        if not bounds:
             return None
         try:
-            min_x = min([point[0] for point in all_coords])  # 获取最小 x 坐标
-            max_x = max([point[0] for point in all_coords])  # 获取最大 x 坐标
-            min_y = min([point[1] for point in all_coords])  # 获取最小 y 坐标
-            max_y = max([point[1] for point in all_coords])  # 获取最大 y 坐标
+            min_x, min_y = min(b[0] for b in bounds), min(b[1] for b in bounds)
+            max_x, max_y = max(b[2] for b in bounds), max(b[3] for b in bounds)
             buffer_x = (max_x - min_x) * 0.001  # x 方向添加缓冲
             buffer_y = (max_y - min_y) * 0.001  # y 方向添加缓冲
             min_x -= buffer_x
@@ -77,6 +93,17 @@ class RenderUtilsMixin:
             logging.error(f"Error calculating projection extent: {e}")
             return None
 
+    def select_lod_level(self, layer=None) -> int:
+        """
+        按当前视图比例选择细节层级：简化容差不超过一个屏幕像素的最粗层级
+        参数:
+            layer (MapLayer): 图层，默认为当前图层
+        返回:
+            int: 细节层级
+        """
+        pixel_size = 1.0 / max(abs(self.transform().m11()), 1e-12)  # 每个屏幕像素对应的场景单位
+        return (layer or self.active_layer).map_data.get_lod_level_for(pixel_size)
+
     def is_circular_projection(self) -> bool:
         """
         判断当前投影是否为圆形范围
@@ -90,7 +117,7 @@ class RenderUtilsMixin:
 
     def update_node_size(self, value: int) -> None:
         """
-        更新节点图片尺寸并重新绘制节点
+        更新节点图片尺寸
         参数:
             value (int): 新的节点尺寸百分比
         """
@@ -101,4 +128,5 @@ class RenderUtilsMixin:
             Qt.KeepAspectRatio,
             Qt.SmoothTransformation
         )  # 缩放节点图片
-        self.draw_nodes()  # 重新绘制节点
+        if self.node_layer is not None:
+            self.node_layer.set_pixmap(self.node_pixmap)  # 只更换图片，不重建节点
@@ -0,0 +1,268 @@
+# ui/mapWidget_components/tileRender.py
+# 功能：提供分块栅格渲染模式，按缩放级别缓存地图瓦片，只绘制与视口相交的瓦片，并按需为可见区域创建矢量项
+
+from PyQt5.QtGui import QImage, QPainter, QPen, QBrush
+from PyQt5.QtWidgets import QGraphicsItem
+from PyQt5.QtCore import QRectF, QTimer, Qt
+from collections import OrderedDict
+import logging
+import math
+import numpy as np
+from ui.mapWidget_components.baseRender import rings_to_path
+
+
+class TileLayerItem(QGraphicsItem):
+    """
+    分块栅格图层项：按缩放级别把地图渲染为固定像素大小的瓦片并缓存，绘制时只处理与暴露区域相交的瓦片
+    """
+    tile_size = 256  # 瓦片边长（像素）
+    max_cached_tiles = 1024  # 最多缓存的瓦片数量
+
+    def __init__(self, map_data, extent: QRectF, fill_brush: QBrush, outline_pen: QPen, line_pen: QPen):
+        super().__init__()
+        self.map_data = map_data
+        self.extent = extent  # 图层范围（场景坐标）
+        self.fill_brush = fill_brush  # 多边形填充
+        self.outline_pen = outline_pen  # 多边形边界
+        self.line_pen = line_pen  # 线要素
+        self.tiles = OrderedDict()  # (缩放级别, 列号, 行号) -> QImage，按最近使用排序
+        self.paths = {}  # (细节层级, 要素索引) -> QPainterPath
+        self.line_bounds = None  # 每条线的包围盒 (min_x, min_y, max_x, max_y)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)  # 获取 exposedRect
+
+    def boundingRect(self) -> QRectF:
+        return self.extent
+
+    def set_extent(self, extent: QRectF) -> None:
+        """
+        投影改变后更新图层范围，并丢弃按旧坐标缓存的路径和瓦片
+        参数:
+            extent (QRectF): 新的图层范围（场景坐标）
+        """
+        self.prepareGeometryChange()
+        self.extent = extent
+        self.paths.clear()
+        self.line_bounds = None
+        self.clear_tiles()
+
+    def set_style(self, fill_brush: QBrush, outline_pen: QPen, line_pen: QPen) -> None:
+        """
+        更换样式并丢弃已渲染的瓦片
+        """
+        self.fill_brush = fill_brush
+        self.outline_pen = outline_pen
+        self.line_pen = line_pen
+        self.clear_tiles()
+
+    def clear_tiles(self) -> None:
+        """
+        清空瓦片缓存
+        """
+        self.tiles.clear()
+        self.update()
+
+    def paint(self, painter: QPainter, option, widget=None) -> None:
+        """
+        绘制与暴露区域相交的瓦片，缺失的瓦片即时渲染并缓存
+        """
+        scale = abs(painter.worldTransform().m11())  # 每个场景单位对应的设备像素
+        if scale <= 0:
+            return
+        zoom = math.ceil(math.log2(scale))  # 向上取整，瓦片只会被缩小显示，保持清晰
+        tile_span = self.tile_size / 2.0 ** zoom  # 瓦片在场景坐标中的边长
+        exposed = option.exposedRect.intersected(self.extent)
+        if exposed.isEmpty():
+            return
+        first_column, last_column = math.floor(exposed.left() / tile_span), math.floor(exposed.right() / tile_span)
+        first_row, last_row = math.floor(exposed.top() / tile_span), math.floor(exposed.bottom() / tile_span)
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                image = self.get_tile(zoom, column, row, tile_span)
+                painter.drawImage(QRectF(column * tile_span, row * tile_span, tile_span, tile_span), image)
+
+    def get_tile(self, zoom: int, column: int, row: int, tile_span: float) -> QImage:
+        """
+        获取瓦片，优先使用缓存
+        """
+        key = (zoom, column, row)
+        image = self.tiles.get(key)
+        if image is None:
+            image = self.render_tile(zoom, column, row, tile_span)
+            self.tiles[key] = image
+            if len(self.tiles) > self.max_cached_tiles:
+                self.tiles.popitem(last=False)  # 淘汰最久未使用的瓦片
+        else:
+            self.tiles.move_to_end(key)
+        return image
+
+    def render_tile(self, zoom: int, column: int, row: int, tile_span: float) -> QImage:
+        """
+        渲染单个瓦片：通过空间索引只绘制与瓦片相交的要素
+        """
+        image = QImage(self.tile_size, self.tile_size, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        left, top = column * tile_span, row * tile_span
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.scale(2.0 ** zoom, 2.0 ** zoom)  # 瓦片的第 0 行对应场景坐标的最小 y
+        painter.translate(-left, -top)
+        level = self.map_data.get_lod_level_for(1.0 / 2.0 ** zoom)  # 简化误差不超过一个像素
+        lod_geometry = self.map_data.get_lod_geometry(level)
+        geometry_array = self.map_data.geometry_array
+        part_ids = self.map_data.query_box(left, top, left + tile_span, top + tile_span)
+        painter.setPen(self.outline_pen)
+        painter.setBrush(self.fill_brush)
+        part_ids = part_ids[geometry_array.part_is_polygon[part_ids]]  # 线由下面按包围盒绘制
+        for feature_id in np.unique(geometry_array.part_features[part_ids]).tolist():
+            painter.drawPath(self.get_path(level, feature_id, lod_geometry['polygons']))
+        lines = lod_geometry['lines']
+        if lines:
+            painter.setPen(self.line_pen)
+            painter.setBrush(Qt.NoBrush)
+            bounds = self.get_line_bounds()
+            visible = (bounds[:, 0] <= left + tile_span) & (bounds[:, 2] >= left) & \
+                      (bounds[:, 1] <= top + tile_span) & (bounds[:, 3] >= top)
+            for index in np.flatnonzero(visible).tolist():
+                painter.drawPath(rings_to_path([lines[index]], closed=False))
+        painter.end()
+        return image
+
+    def get_path(self, level: int, feature_id: int, polygons: list):
+        """
+        获取要素的多边形路径（包含所有部件），同一细节层级的路径在各瓦片之间共享
+        """
+        key = (level, feature_id)
+        path = self.paths.get(key)
+        if path is None:
+            start, end = self.map_data.geometry_array.polygon_feature_runs[feature_id]
+            path = rings_to_path(polygons[start:end])
+            self.paths[key] = path
+        return path
+
+    def get_line_bounds(self) -> np.ndarray:
+        """
+        计算每条线的包围盒
+        """
+        if self.line_bounds is None:
+            lines = self.map_data.get_transformed_lines()
+            bounds = np.full((len(lines), 4), np.nan)
+            for index, coords in enumerate(lines):
+                finite = coords[np.isfinite(coords).all(axis=1)]
+                if len(finite):
+                    bounds[index, :2] = finite.min(axis=0)
+                    bounds[index, 2:] = finite.max(axis=0)
+            self.line_bounds = bounds
+        return self.line_bounds
+
+
+class TileRenderMixin:
+    def setup_tiled_rendering(self) -> None:
+        """
+        初始化分块渲染模式的状态
+        """
+        self.tiled_mode = False  # 是否使用分块渲染模式
+        self.max_visible_items = 5000  # 可见要素超过该数量时不创建矢量项
+        self.visible_items_timer = QTimer(self)  # 合并平移和缩放过程中的多次更新
+        self.visible_items_timer.setSingleShot(True)
+        self.visible_items_timer.setInterval(50)
+        self.visible_items_timer.timeout.connect(self.update_visible_items)
+        self.horizontalScrollBar().valueChanged.connect(self.schedule_visible_items_update)
+        self.verticalScrollBar().valueChanged.connect(self.schedule_visible_items_update)
+
+    def set_tiled_mode(self, enabled: bool) -> None:
+        """
+        切换分块渲染模式并重新绘制地图
+        参数:
+            enabled (bool): 是否启用分块渲染
+        """
+        if enabled == self.tiled_mode:
+            return
+        self.tiled_mode = enabled
+        logging.info(f"Tiled rendering {'enabled' if enabled else 'disabled'}.")
+        if len(self.map_data.geometry_array):
+            self.draw_map()
+
+    def draw_tiled_map(self, layer=None) -> None:
+        """
+        以分块栅格方式绘制图层（由 draw_layer 在分块模式下调用）
+        参数:
+            layer (MapLayer): 要绘制的图层，默认为当前图层
+        """
+        layer = layer or self.active_layer
+        self.clear_tile_layer(layer)
+        extent = self.get_projection_extent()
+        if extent is None:
+            return
+        outline_pen, fill_brush = self.feature_style(False, layer)
+        line_pen, _ = self.feature_style(True, layer)
+        layer.tile_item = TileLayerItem(layer.map_data, extent, fill_brush, outline_pen, line_pen)
+        layer.tile_item.setZValue(1)
+        layer.add_item(layer.tile_item)
+        logging.info(f"Drawing layer '{layer.name}' as cached raster tiles.")
+
+    def clear_tile_layer(self, layer=None) -> None:
+        """
+        移除分块栅格图层项
+        参数:
+            layer (MapLayer): 图层，默认为所有图层
+        """
+        for layer in [layer] if layer is not None else self.layers:
+            if layer.tile_item is not None:
+                self.scene.removeItem(layer.tile_item)
+                layer.tile_item = None
+
+    def schedule_visible_items_update(self, *args) -> None:
+        """
+        视口变化后延迟更新可见区域的矢量项
+        """
+        if self.tiled_mode:
+            self.visible_items_timer.start()
+
+    def update_visible_items(self) -> None:
+        """
+        只为视口内的要素保留矢量项（用于选择和高亮），视口外的矢量项被移除
+        """
+        if not self.tiled_mode or self.tile_item is None:
+            return
+        rect = self.mapToScene(self.viewport().rect()).boundingRect()
+        part_ids = self.map_data.query_box(rect.left(), rect.top(), rect.right(), rect.bottom())
+        feature_ids = self.map_data.features.features_of_parts(part_ids)
+        if len(feature_ids) > self.max_visible_items:
+            feature_ids = feature_ids[:0]  # 可见要素过多时只保留高亮项，点击时再按需创建
+        keep = set(feature_ids.tolist()) | {item.feature_id for item in self.highlighted_items}
+        features = self.map_data.features
+        for feature_id in list(features.items):
+            if feature_id not in keep:
+                self.scene.removeItem(features.remove_item(feature_id))
+        self.polygon_items = [item for item in self.polygon_items if item.feature_id in features.items]
+        self.line_items = [item for item in self.line_items if item.feature_id in features.items]
+        for feature_id in keep:
+            if features.item(feature_id) is None:
+                self.create_overlay_item(feature_id)
+
+    def create_overlay_item(self, feature_id: int):
+        """
+        为分块模式创建透明的要素项，只用于选择和高亮，填充由瓦片负责
+        参数:
+            feature_id (int): 要素索引
+        返回:
+            FeatureItem: 创建的要素项，要素没有有效几何时返回 None
+        """
+        geometry_array = self.map_data.geometry_array
+        is_line = feature_id not in geometry_array.polygon_feature_runs
+        run = (geometry_array.line_feature_runs if is_line else geometry_array.polygon_feature_runs).get(feature_id)
+        if run is None:
+            return None
+        start, end = run
+        parts = self.map_data.get_lod_geometry(self.lod_level)['lines' if is_line else 'polygons']
+        path = rings_to_path(parts[start:end], closed=not is_line)
+        if path.isEmpty():
+            return None
+        item = self.create_feature_item(feature_id, path, is_line=is_line)
+        item.style_width = item.pen().widthF()  # 样式线宽，高亮时按它计算线宽
+        item.setPen(QPen(Qt.NoPen))  # 未高亮时不绘制任何内容
+        item.setBrush(QBrush(Qt.NoBrush))
+        self.active_layer.add_item(item)
+        (self.line_items if is_line else self.polygon_items).append(item)
+        self.map_data.features.register_item(feature_id, item)
+        return item
@@ -1,37 +1,42 @@
 # ui/mapWidget_components/tools.py
 # 功能：提供地图工具的功能，包括属性查询、导出地图为图片或 PDF 文件等
 
-from PyQt5.QtWidgets import QFileDialog, QMessageBox
-from PyQt5.QtGui import QImage, QPainter, QImageWriter, QPen
-from PyQt5.QtCore import QRectF, Qt
-from PyQt5.QtPrintSupport import QPrinter
+from PyQt5.QtWidgets import QFileDialog, QMessageBox, QInputDialog, QStyleOptionGraphicsItem
+from PyQt5.QtGui import QImage, QPainter, QImageWriter, QPen, QPdfWriter, QPageSize, QTransform, QPainterPath, QBrush
+from PyQt5.QtCore import QRectF, QSizeF, QSize, QRect, QMarginsF, Qt
+from PyQt5.QtSvg import QSvgGenerator
+import os
 import logging
+import numpy as np
 from utils.utils import show_error_message
+from core.projection import get_crs, get_epsg
+from core.rasterWriter import PngWriter, GeoTiffWriter, write_world_file
+from ui.mapWidget_components.baseRender import rings_to_path, OCEAN_COLOR, BOUNDARY_WIDTH
+from ui.mapWidget_components.nodeLayer import NodeLayerItem
 
 class ToolsMixin:
     def perform_attribute_query(self, field: str, value: str) -> list:
         """
         执行属性查询并高亮符合条件的要素
         参数:
-            field (str): 要查询的字段名
-            value (str): 要匹配的字段值
+            field (str): 要查询的字段名，为空时 value 作为完整的查询表达式
+            value (str): 要匹配的字段值，或查询表达式（例如 "POP_EST > 1e7 AND CONTINENT = 'Asia'"）
         返回:
             list: 符合条件的要素项列表
         """
         try:
-            matching_items = []
-            for item in self.polygon_items:
-                if field in item.attributes and str(item.attributes[field]) == value:
-                    matching_items.append(item)
-            if matching_items:
-                self.clear_highlights()  # 清除之前的高亮
-                for item in matching_items:
-                    self.highlight_feature(item)  # 高亮显示匹配的要素
-                # 显示属性表
-                self.attribute_table_requested.emit(
-                    [item.attributes for item in matching_items])
+            if field:
+                mask = self.map_data.get_query_engine().compare(field, '=', value)  # 字段等值查询（哈希索引）
+            else:
+                mask = self.map_data.query_attributes(value)
+            feature_ids = np.flatnonzero(mask)
+            logging.info(f"Attribute query matched {len(feature_ids)} features.")
+            if len(feature_ids):
+                matching_items = self.highlight_features(feature_ids)  # 高亮显示匹配的要素
+                # 属性表只显示匹配的要素
+                self.attribute_table_requested.emit(feature_ids)
                 # 显示第一个匹配要素的属性信息
-                self.display_feature_attributes(matching_items[0].attributes)
+                self.display_feature_attributes(self.map_data.features.record(int(feature_ids[0])))
                 return matching_items
             else:
                 self.clear_highlights()
@@ -48,14 +53,14 @@ class ToolsMixin:
         打开属性表
         """
         try:
-            if not hasattr(self.map_data, 'records') or not isinstance(self.map_data.records, list):
+            if not hasattr(self.map_data, 'records') or not hasattr(self.map_data.records, '__getitem__'):
                 raise ValueError("map_data.records 未定义或格式错误。")
-            if not self.map_data.records:
+            if len(self.map_data.records) == 0:
                 show_error_message(self, "属性表", "当前没有可用的属性表。请先导入 Shapefile。")
                 return
-            if not all(isinstance(record, dict) for record in self.map_data.records):
+            if not isinstance(self.map_data.records[0], dict):
                 raise ValueError("map_data.records 中存在非字典记录。")
-            self.attribute_table_requested.emit(self.map_data.records)  # 发射属性表请求信号
+            self.attribute_table_requested.emit(None)  # 显示全部要素，单元格由表格模型按需读取
         except Exception as e:
             logging.error(f"Error during opening attribute table: {e}")
             show_error_message(self, "属性表错误", f"打开属性表时发生错误:\n{e}")
@@ -68,31 +73,11 @@ class ToolsMixin:
         file_path, _ = QFileDialog.getSaveFileName(
             self, "导出为 PNG", "", "PNG Files (*.png)", options=options)
         if file_path:
+            width = self.ask_export_width()
+            if width is None:
+                return
             try:
-                rect = self.scene.itemsBoundingRect()  # 获取场景中所有项的边界矩形
-                width, height = int(rect.width()), int(rect.height())
-                if rect.isEmpty():
-                    raise ValueError("场景内容为空，无法导出图像")
-                if width <= 0 or height <= 0:
-                    raise ValueError(f"场景矩形区域的尺寸无效: 宽度={width}, 高度={height}")
-                max_size = 32767
-                width = min(width, max_size)
-                height = min(height, max_size)
-                image = QImage(width, height, QImage.Format_ARGB32)
-                image.fill(Qt.transparent)  # 填充透明色
-                if image.isNull():
-                    raise ValueError("创建的 QImage 对象为空")
-                painter = QPainter(image)
-                painter.scale(1, -1)  # 在垂直方向上翻转
-                painter.translate(0, -height)
-                self.scene.render(painter, QRectF(0, 0, width, height), rect)  # 将场景渲染到图像
-                painter.end()
-                if image.isNull():
-                    raise ValueError("渲染后的 QImage 对象为空")
-                image_writer = QImageWriter(file_path, b"PNG")
-                if not image_writer.write(image):
-                    error_string = image_writer.errorString()
-                    raise IOError(f"无法保存图像到文件: {file_path}\n错误详情: {error_string}")
+                self.export_tiled(file_path, width=width)
                 QMessageBox.information(self, "导出成功", f"地图已成功导出到 {file_path}")
             except Exception as e:
                 logging.error(f"导出地图失败: {e}")
@@ -107,17 +92,55 @@ class ToolsMixin:
             self, "导出为 PDF", "", "PDF Files (*.pdf)", options=options)
         if file_path:
             try:
-                printer = QPrinter(QPrinter.HighResolution)  # 创建高分辨率打印机对象
-                printer.setOutputFormat(QPrinter.PdfFormat)  # 设置输出格式为 PDF
-                printer.setOutputFileName(file_path)  # 设置输出文件名
-                painter = QPainter(printer)
-                self.render(painter)  # 渲染场景到 PDF
-                painter.end()
+                self.export_vector(file_path)
+                QMessageBox.information(self, "导出成功", f"地图已成功导出到 {file_path}")
+            except Exception as e:
+                logging.error(f"导出地图失败: {e}")
+                show_error_message(self, "导出错误", f"无法导出地图:\n{e}")
+
+    def export_to_svg(self) -> None:
+        """
+        导出地图为 SVG 矢量文件
+        """
+        options = QFileDialog.Options()
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出为 SVG", "", "SVG Files (*.svg)", options=options)
+        if file_path:
+            try:
+                self.export_vector(file_path)
+                QMessageBox.information(self, "导出成功", f"地图已成功导出到 {file_path}")
+            except Exception as e:
+                logging.error(f"导出地图失败: {e}")
+                show_error_message(self, "导出错误", f"无法导出地图:\n{e}")
+
+    def export_to_geotiff(self) -> None:
+        """
+        导出地图为带地理参考的 GeoTIFF 文件（同时写出世界文件）
+        """
+        options = QFileDialog.Options()
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出为 GeoTIFF", "", "GeoTIFF Files (*.tif *.tiff)", options=options)
+        if file_path:
+            width = self.ask_export_width()
+            if width is None:
+                return
+            try:
+                self.export_tiled(file_path, width=width)
                 QMessageBox.information(self, "导出成功", f"地图已成功导出到 {file_path}")
             except Exception as e:
                 logging.error(f"导出地图失败: {e}")
                 show_error_message(self, "导出错误", f"无法导出地图:\n{e}")
 
+    def ask_export_width(self):
+        """
+        询问导出图像的宽度（像素），高度按地图比例计算
+        返回:
+            int: 图像宽度，取消时返回 None
+        """
+        width, ok = QInputDialog.getInt(self, "导出尺寸", "图像宽度（像素）:",
+                                        self.viewport().width() * 4, 16, 1000000)
+        return width if ok else None
+
     def export_to_jpeg(self) -> None:
         """
         导出地图为 JPEG 文件
@@ -127,31 +150,250 @@ class ToolsMixin:
             self, "导出为 JPEG", "", "JPEG Files (*.jpg;*.jpeg)", options=options)
         if file_path:
             try:
-                rect = self.scene.itemsBoundingRect()  # 获取场景中所有项的边界矩形
-                width, height = int(rect.width()), int(rect.height())
-                if rect.isEmpty():
-                    raise ValueError("场景内容为空，无法导出图像")
-                if width <= 0 or height <= 0:
-                    raise ValueError(f"场景矩形区域的尺寸无效: 宽度={width}, 高度={height}")
-                max_size = 32767
-                width = min(width, max_size)
-                height = min(height, max_size)
-                image = QImage(width, height, QImage.Format_ARGB32)
-                image.fill(Qt.transparent)  # 填充透明色
-                if image.isNull():
-                    raise ValueError("创建的 QImage 对象为空")
-                painter = QPainter(image)
-                painter.scale(1, -1)  # 在垂直方向上翻转
-                painter.translate(0, -height)
-                self.scene.render(painter, QRectF(0, 0, width, height), rect)  # 将场景渲染到图像
-                painter.end()
-                if image.isNull():
-                    raise ValueError("渲染后的 QImage 对象为空")
-                image_writer = QImageWriter(file_path, b"JPEG")
-                if not image_writer.write(image):
-                    error_string = image_writer.errorString()
-                    raise IOError(f"无法保存图像到文件: {file_path}\n错误详情: {error_string}")
+                self.save_image(file_path, b"JPEG")
                 QMessageBox.information(self, "导出成功", f"地图已成功导出到 {file_path}")
             except Exception as e:
                 logging.error(f"导出地图失败: {e}")
                 show_error_message(self, "导出错误", f"无法导出地图:\n{e}")
+
+    def render_image(self, width: int = None, height: int = None, background=Qt.transparent) -> QImage:
+        """
+        把场景中的所有项渲染为图像（不弹出对话框，供导出和批量渲染使用）
+        参数:
+            width (int): 图像宽度，默认使用场景范围的宽度
+            height (int): 图像高度，默认使用场景范围的高度
+            background: 背景颜色，默认透明
+        返回:
+            QImage: 渲染结果，地图按原比例居中
+        """
+        rect = self.scene.itemsBoundingRect()  # 获取场景中所有项的边界矩形
+        if rect.isEmpty():
+            raise ValueError("场景内容为空，无法导出图像")
+        width = int(width or rect.width())
+        height = int(height or rect.height())
+        if width <= 0 or height <= 0:
+            raise ValueError(f"场景矩形区域的尺寸无效: 宽度={width}, 高度={height}")
+        max_size = 32767
+        width = min(width, max_size)
+        height = min(height, max_size)
+        image = QImage(width, height, QImage.Format_ARGB32)
+        if image.isNull():
+            raise ValueError("创建的 QImage 对象为空")
+        image.fill(background)  # 填充背景色
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.scale(1, -1)  # 在垂直方向上翻转
+        painter.translate(0, -height)
+        self.scene.render(painter, QRectF(0, 0, width, height), rect)  # 将场景渲染到图像
+        painter.end()
+        return image
+
+    def save_image(self, file_path: str, image_format: bytes = b"PNG", width: int = None,
+                   height: int = None) -> None:
+        """
+        渲染场景并保存为图像文件
+        参数:
+            file_path (str): 输出文件路径
+            image_format (bytes): 图像格式，例如 b"PNG"、b"JPEG"
+            width (int): 图像宽度，默认使用场景范围的宽度
+            height (int): 图像高度，默认使用场景范围的高度
+        """
+        # JPEG 不支持透明，使用白色背景
+        background = Qt.white if image_format.upper() in (b"JPEG", b"JPG") else Qt.transparent
+        image = self.render_image(width, height, background)
+        image_writer = QImageWriter(file_path, image_format)
+        if not image_writer.write(image):
+            error_string = image_writer.errorString()
+            raise IOError(f"无法保存图像到文件: {file_path}\n错误详情: {error_string}")
+
+    def export_tiled(self, file_path: str, width: int = None, height: int = None, dpi: float = 96,
+                     print_size_mm: tuple = None, tile_size: int = 2048, memory_limit: int = 64 * 1024 * 1024,
+                     world_file: bool = True, file_format: str = None) -> tuple:
+        """
+        按输出尺寸或打印尺寸分块渲染地图并流式写出（tif/tiff 为 GeoTIFF，其他为 PNG），不受 QImage 尺寸限制
+        每次只渲染一个条带，内存占用不超过 memory_limit；细节层级按输出分辨率选择
+        参数:
+            file_path (str): 输出文件路径
+            width (int): 图像宽度（像素）
+            height (int): 图像高度（像素），只给出宽或高时另一边按地图比例计算，都给出时地图居中
+            dpi (float): 输出分辨率，与 print_size_mm 一起决定像素尺寸，并写入文件
+            print_size_mm (tuple): 打印尺寸 (宽, 高)，单位毫米，可只给出一边（另一边为 None）
+            tile_size (int): 单个渲染块的最大边长（像素）
+            memory_limit (int): 一个条带的最大字节数
+            world_file (bool): 是否同时写出世界文件（.pgw/.tfw）
+            file_format (str): 输出格式（'png'、'tif' 或 'tiff'），None 表示按扩展名选择
+        返回:
+            tuple: 输出图像的 (宽, 高)
+        """
+        rect = self.scene.itemsBoundingRect()  # 导出范围为场景中所有项
+        if rect.isEmpty():
+            raise ValueError("场景内容为空，无法导出图像")
+        if print_size_mm is not None:
+            width = int(round(print_size_mm[0] / 25.4 * dpi)) if print_size_mm[0] else width
+            height = int(round(print_size_mm[1] / 25.4 * dpi)) if print_size_mm[1] else height
+        if not width and not height:
+            width = self.viewport().width()
+        # 像素保持正方形：每个像素对应相同的场景距离，地图居中
+        scale = min(width / rect.width() if width else float('inf'), height / rect.height() if height else float('inf'))
+        width = int(width or round(rect.width() * scale))
+        height = int(height or round(rect.height() * scale))
+        if width <= 0 or height <= 0:
+            raise ValueError(f"导出尺寸无效: 宽度={width}, 高度={height}")
+        pixel_size = 1.0 / scale  # 每个像素对应的场景距离
+        left = rect.center().x() - width * pixel_size / 2
+        top = rect.center().y() + height * pixel_size / 2  # 场景 y 轴向上
+        geotransform = (left, pixel_size, top, -pixel_size)
+
+        file_format = (file_format or os.path.splitext(file_path)[1].lstrip('.')).lower()
+        if file_format in ('tif', 'tiff'):
+            crs = get_crs(self.map_data.proj_string)
+            writer = GeoTiffWriter(file_path, width, height, dpi, geotransform, get_epsg(crs), crs.is_geographic)
+        else:
+            writer = PngWriter(file_path, width, height, dpi)
+
+        self.update_level_of_detail(pixel_size)  # 按输出分辨率选择细节层级
+        if self.node_layer is not None:
+            self.node_layer.set_view_scale(scale)
+        strip_height = max(1, min(tile_size, memory_limit // (width * 4)))
+        logging.info(f"Exporting {width}x{height} map to {file_path} in strips of {strip_height} rows.")
+        try:
+            with writer:
+                tile = None
+                for row in range(0, height, strip_height):
+                    rows = min(strip_height, height - row)
+                    strip = np.empty((rows, width, 4), dtype=np.uint8)
+                    for column in range(0, width, tile_size):
+                        columns = min(tile_size, width - column)
+                        if tile is None or tile.width() != columns or tile.height() != rows:
+                            tile = QImage(columns, rows, QImage.Format_RGBA8888)
+                        tile.fill(Qt.transparent)
+                        source = QRectF(left + column * pixel_size, top - (row + rows) * pixel_size,
+                                        columns * pixel_size, rows * pixel_size)
+                        painter = QPainter(tile)
+                        painter.setRenderHint(QPainter.Antialiasing)
+                        painter.scale(1, -1)  # 在垂直方向上翻转
+                        painter.translate(0, -rows)
+                        self.scene.render(painter, QRectF(0, 0, columns, rows), source, Qt.IgnoreAspectRatio)
+                        painter.end()
+                        strip[:, column:column + columns] = self.image_to_array(tile)
+                    writer.write_rows(strip)
+        finally:
+            self.update_level_of_detail()  # 恢复视图的细节层级
+            self.update_node_layer_scale()
+        if world_file:
+            write_world_file(file_path, geotransform)
+        return width, height
+
+    @staticmethod
+    def image_to_array(image: QImage) -> np.ndarray:
+        """
+        把 RGBA8888 格式的 QImage 转换为 (高, 宽, 4) 的 uint8 数组（共享图像内存）
+        """
+        bits = image.constBits()
+        bits.setsize(image.bytesPerLine() * image.height())
+        data = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+        return data[:, :image.width() * 4].reshape(image.height(), image.width(), 4)
+
+    def export_vector(self, file_path: str, page_width_mm: float = 297.0, page_height_mm: float = None,
+                      dpi: float = 300, file_format: str = None) -> tuple:
+        """
+        把地图几何直接写为矢量 PDF 或 SVG（按 file_format 或扩展名选择），不经过视图控件，也不创建场景项
+        每个要素按输出分辨率选择的细节层级构建一条路径，填充和边界用同一路径一次绘制
+        参数:
+            file_path (str): 输出文件路径（.svg 为 SVG，其他为 PDF）
+            page_width_mm (float): 页面宽度（毫米）
+            page_height_mm (float): 页面高度（毫米），默认按地图比例计算，给出时地图居中
+            dpi (float): 输出分辨率，决定坐标精度和细节层级
+            file_format (str): 输出格式（'pdf' 或 'svg'），None 表示按扩展名选择
+        返回:
+            tuple: 页面的 (宽, 高)，单位为输出设备像素
+        """
+        extent = self.get_projection_extent()  # 导出范围为投影范围
+        if extent is None or extent.isEmpty():
+            raise ValueError("地图内容为空，无法导出")
+        width = int(round(page_width_mm / 25.4 * dpi))
+        scale = width / extent.width()  # 每个场景单位对应的输出像素
+        if page_height_mm:
+            height = int(round(page_height_mm / 25.4 * dpi))
+            scale = min(scale, height / extent.height())
+        else:
+            height = int(round(extent.height() * scale))
+            page_height_mm = height / dpi * 25.4
+        left = extent.center().x() - width / scale / 2
+        top = extent.center().y() + height / scale / 2  # 场景 y 轴向上
+
+        file_format = (file_format or os.path.splitext(file_path)[1].lstrip('.')).lower()
+        if file_format == 'svg':
+            device = QSvgGenerator()
+            device.setFileName(file_path)
+            device.setSize(QSize(width, height))
+            device.setViewBox(QRect(0, 0, width, height))
+            device.setResolution(int(dpi))
+        else:
+            device = QPdfWriter(file_path)
+            device.setResolution(int(dpi))
+            device.setPageSize(QPageSize(QSizeF(page_width_mm, page_height_mm), QPageSize.Millimeter))
+            device.setPageMargins(QMarginsF(0, 0, 0, 0))
+        painter = QPainter(device)
+        if not painter.isActive():
+            raise IOError(f"无法写入文件: {file_path}")
+        try:
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setTransform(QTransform(scale, 0, 0, -scale, -left * scale, top * scale))  # 场景坐标 -> 页面
+            self.draw_vector_export(painter, extent, 1.0 / scale, dpi)
+        finally:
+            painter.end()
+        logging.info(f"Exported vector map to {file_path} ({width}x{height} at {dpi} dpi).")
+        return width, height
+
+    def draw_vector_export(self, painter: QPainter, extent: QRectF, pixel_size: float, dpi: float) -> None:
+        """
+        按场景坐标绘制矢量导出的内容：海洋背景、各图层的要素、投影边框和节点（由 export_vector 调用）
+        参数:
+            painter (QPainter): 已设置场景坐标变换的画笔
+            extent (QRectF): 投影范围
+            pixel_size (float): 每个输出像素对应的场景距离
+            dpi (float): 输出分辨率
+        """
+        extent_path = QPainterPath()
+        if self.is_circular_projection():
+            radius = min(extent.width(), extent.height()) / 2
+            extent_path.addEllipse(extent.center(), radius, radius)
+        else:
+            extent_path.addRect(extent)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QBrush(OCEAN_COLOR))
+        painter.drawPath(extent_path)
+
+        for layer in self.layers:  # 按图层顺序绘制，隐藏的图层不导出
+            if not layer.visible or not layer.has_data():
+                continue
+            map_data = layer.map_data
+            geometry_array = map_data.geometry_array
+            lod_geometry = map_data.get_lod_geometry(map_data.get_lod_level_for(pixel_size))
+            for key, runs, is_line in (('polygons', geometry_array.polygon_feature_runs, False),
+                                       ('lines', geometry_array.line_feature_runs, True)):
+                pen, brush = self.feature_style(is_line, layer)
+                painter.setPen(pen)
+                painter.setBrush(brush)
+                parts = lod_geometry[key]
+                for start, end in runs.values():
+                    path = rings_to_path(parts[start:end], closed=not is_line)
+                    if not path.isEmpty():
+                        painter.drawPath(path)  # 填充和边界共用同一路径
+
+        painter.setPen(QPen(Qt.black, BOUNDARY_WIDTH))
+        painter.setBrush(Qt.NoBrush)
+        painter.drawPath(extent_path)
+
+        if self.node_layer is not None and len(self.node_layer):
+            # 节点图片按屏幕上的物理尺寸（96 dpi）换算到输出分辨率
+            pixmap = self.node_pixmap_original.scaled(
+                self.node_pixmap_original.size() * self.node_scale_factor * dpi / 96,
+                Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            layer = NodeLayerItem(pixmap)
+            layer.set_nodes(self.node_layer.positions, self.node_layer.node_ids)  # 只导出节点图层中的节点，已删除的节点不导出
+            layer.set_view_scale(1.0 / pixel_size)
+            option = QStyleOptionGraphicsItem()
+            option.exposedRect = layer.boundingRect()
+            layer.paint(painter, option)
@@ -3,8 +3,10 @@
 
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QPushButton, QComboBox, QGroupBox, QGridLayout,
-    QLabel, QSlider, QMessageBox, QLineEdit
+    QLabel, QSlider, QMessageBox, QLineEdit, QProgressBar, QCheckBox, QListWidget, QListWidgetItem,
+    QColorDialog
 )
+from PyQt5.QtGui import QPixmap, QIcon, QColor
 from PyQt5.QtCore import pyqtSignal, Qt
 
 class TGISMenu(QWidget):
@@ -17,6 +19,16 @@ class TGISMenu(QWidget):
     node_size_changed = pyqtSignal(int)  # 信号：节点图片尺寸调整
     output_button_clicked = pyqtSignal()  # 新增信号：输出按钮点击
     attribute_query_clicked = pyqtSignal(str, str)  # 信号：属性查询
+    cancel_load_clicked = pyqtSignal()  # 信号：取消 Shapefile 加载
+    tiled_rendering_toggled = pyqtSignal(bool)  # 信号：切换分块渲染模式
+    open_project_clicked = pyqtSignal()  # 信号：打开项目
+    save_project_clicked = pyqtSignal()  # 信号：保存项目
+    precompute_projections_toggled = pyqtSignal(bool)  # 信号：切换投影预计算
+    layer_visibility_changed = pyqtSignal(int, bool)  # 信号：切换图层可见性 (图层位置, 是否显示)
+    layer_moved = pyqtSignal(int, int)  # 信号：调整图层顺序 (图层位置, 新位置)
+    layer_removed = pyqtSignal(int)  # 信号：删除图层
+    active_layer_changed = pyqtSignal(int)  # 信号：切换当前图层
+    layer_color_changed = pyqtSignal(int, QColor)  # 信号：修改图层填充颜色
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -39,8 +51,32 @@ class TGISMenu(QWidget):
         self.import_nodes_button = QPushButton("Import Nodes")
         self.import_nodes_button.clicked.connect(self.import_nodes_clicked.emit)
         self.import_nodes_button.setEnabled(False)  # 默认禁用
+        self.nodes_import_enabled = False  # 加载 Shapefile 结束后 Import Nodes 按钮应恢复的状态
         self.object_management.layout().addWidget(self.import_nodes_button, 1, 0)
 
+        # Shapefile 加载进度，仅在后台加载时显示
+        self.load_progress_bar = QProgressBar()
+        self.load_progress_bar.setVisible(False)
+        self.object_management.layout().addWidget(self.load_progress_bar, 2, 0)
+
+        self.cancel_load_button = QPushButton("Cancel Loading")
+        self.cancel_load_button.clicked.connect(self.cancel_load_clicked.emit)
+        self.cancel_load_button.setVisible(False)
+        self.object_management.layout().addWidget(self.cancel_load_button, 3, 0)
+
+        # 项目管理部分
+        self.project_management = QGroupBox("Project")
+        self.project_management.setLayout(QGridLayout())
+        self.layout().addWidget(self.project_management)
+
+        open_project_button = QPushButton("Open Project")
+        open_project_button.clicked.connect(self.open_project_clicked.emit)
+        self.project_management.layout().addWidget(open_project_button, 0, 0)
+
+        save_project_button = QPushButton("Save Project")
+        save_project_button.clicked.connect(self.save_project_clicked.emit)
+        self.project_management.layout().addWidget(save_project_button, 0, 1)
+
         # 投影管理部分
         self.projection_management = QGroupBox("Projection Management")
         self.projection_management.setLayout(QGridLayout())
@@ -59,6 +95,11 @@ class TGISMenu(QWidget):
         change_projection_button.clicked.connect(self.on_change_projection)
         self.projection_management.layout().addWidget(change_projection_button, 1, 0)
 
+        self.precompute_projections_checkbox = QCheckBox("Precompute Projections")
+        self.precompute_projections_checkbox.setToolTip("导入图层后在后台计算列表中的所有投影，切换投影时不再等待转换")
+        self.precompute_projections_checkbox.toggled.connect(self.precompute_projections_toggled.emit)
+        self.projection_management.layout().addWidget(self.precompute_projections_checkbox, 2, 0)
+
         # 地图管理部分
         self.map_management = QGroupBox("Map Management")
         self.map_management.setLayout(QGridLayout())
@@ -72,6 +113,31 @@ class TGISMenu(QWidget):
         delete_selection_button.clicked.connect(self.delete_selected_nodes_clicked.emit)
         self.map_management.layout().addWidget(delete_selection_button, 1, 0)
 
+        self.tiled_rendering_checkbox = QCheckBox("Tiled Rendering")
+        self.tiled_rendering_checkbox.setToolTip("将地图渲染为缓存的栅格瓦片，适合顶点数很多的图层")
+        self.tiled_rendering_checkbox.toggled.connect(self.tiled_rendering_toggled.emit)
+        self.map_management.layout().addWidget(self.tiled_rendering_checkbox, 2, 0)
+
+        # 图层管理部分，列表中上方的图层绘制在上层
+        self.layer_management = QGroupBox("Layers")
+        self.layer_management.setLayout(QGridLayout())
+        self.layout().addWidget(self.layer_management)
+
+        self.layer_list = QListWidget()
+        self.layer_list.setMaximumHeight(100)
+        self.layer_list.itemChanged.connect(self.on_layer_item_changed)
+        self.layer_list.currentRowChanged.connect(self.on_layer_row_changed)
+        self.layer_management.layout().addWidget(self.layer_list, 0, 0, 1, 4)
+        self.layer_count = 0  # 列表中的图层数量
+
+        for column, (text, slot) in enumerate((("Up", lambda: self.on_move_layer(1)),
+                                               ("Down", lambda: self.on_move_layer(-1)),
+                                               ("Remove", self.on_remove_layer),
+                                               ("Color...", self.on_layer_color))):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            self.layer_management.layout().addWidget(button, 1, column)
+
         # 导出部分
         self.export_group_box = QGroupBox("Output View")
         self.export_group_box.setLayout(QGridLayout())
@@ -79,7 +145,7 @@ class TGISMenu(QWidget):
 
         # 添加新的 QComboBox 用以选择文件格式
         self.export_format_combo = QComboBox()
-        self.export_format_combo.addItems(["PDF", "PNG", "JPG"])
+        self.export_format_combo.addItems(["PDF", "SVG", "PNG", "JPG", "GeoTIFF"])
         # 移除导出格式选择时的即时触发
         # self.export_format_combo.currentIndexChanged.connect(self.on_export_format_changed)
 
@@ -123,9 +189,15 @@ class TGISMenu(QWidget):
         self.value_input = QLineEdit()
         self.query_group_box.layout().addWidget(self.value_input, 1, 1)
 
+        self.expression_label = QLabel("Where:")
+        self.query_group_box.layout().addWidget(self.expression_label, 2, 0)
+        self.expression_input = QLineEdit()
+        self.expression_input.setPlaceholderText("POP_EST > 1e7 AND NAME LIKE 'C%'")
+        self.query_group_box.layout().addWidget(self.expression_input, 2, 1)
+
         self.query_button = QPushButton("Query")
         self.query_button.clicked.connect(self.on_attribute_query)
-        self.query_group_box.layout().addWidget(self.query_button, 2, 0, 1, 2)
+        self.query_group_box.layout().addWidget(self.query_button, 3, 0, 1, 2)
 
     def on_change_projection(self) -> None:
         """
@@ -135,6 +207,94 @@ class TGISMenu(QWidget):
         self.projection_changed.emit(projection)
         self.current_projection_label.setText(f"Current Coordinate System:\n{projection}")
 
+    def projection_codes(self) -> list:
+        """
+        投影列表中的所有 EPSG 代码
+        """
+        return [self.projection_list.itemText(i).split(' - ')[0] for i in range(self.projection_list.count())]
+
+    def apply_project_state(self, state: dict) -> None:
+        """
+        打开项目后同步投影、节点尺寸和分块渲染控件（不发射信号，地图部件已恢复这些状态）
+        参数:
+            state (dict): 项目的会话状态
+        """
+        projection = state.get('projection') or ''
+        index = next((i for i in range(self.projection_list.count())
+                      if self.projection_list.itemText(i).split(' - ')[0] == projection), -1)
+        if index >= 0:
+            self.projection_list.setCurrentIndex(index)
+            projection = self.projection_list.itemText(index)
+        self.current_projection_label.setText(f"Current Coordinate System:\n{projection}")
+        for widget, setter, value in ((self.node_size_slider, 'setValue', state.get('node_size', 50)),
+                                      (self.tiled_rendering_checkbox, 'setChecked', bool(state.get('tiled')))):
+            widget.blockSignals(True)
+            getattr(widget, setter)(value)
+            widget.blockSignals(False)
+        self.node_size_label.setText(f"Node Size: {self.node_size_slider.value()}%")
+
+    def set_layers(self, layers: list) -> None:
+        """
+        刷新图层列表（不发射信号）
+        参数:
+            layers (list): 从下到上的图层信息，每项包含 name、visible、active、fill
+        """
+        self.layer_list.blockSignals(True)
+        self.layer_list.clear()
+        self.layer_count = len(layers)
+        for layer in reversed(layers):
+            item = QListWidgetItem(layer['name'])
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if layer['visible'] else Qt.Unchecked)
+            swatch = QPixmap(12, 12)
+            swatch.fill(layer['fill'])
+            item.setIcon(QIcon(swatch))
+            self.layer_list.addItem(item)
+            if layer['active']:
+                self.layer_list.setCurrentItem(item)
+        self.layer_list.blockSignals(False)
+
+    def layer_index(self, row: int) -> int:
+        """
+        列表行号转换为图层位置（列表从上到下，图层从下到上）
+        """
+        return self.layer_count - 1 - row
+
+    def on_layer_item_changed(self, item: QListWidgetItem) -> None:
+        row = self.layer_list.row(item)
+        self.layer_visibility_changed.emit(self.layer_index(row), item.checkState() == Qt.Checked)
+
+    def on_layer_row_changed(self, row: int) -> None:
+        if row >= 0:
+            self.active_layer_changed.emit(self.layer_index(row))
+
+    def on_move_layer(self, step: int) -> None:
+        """
+        上移或下移当前图层
+        参数:
+            step (int): 1 为上移，-1 为下移
+        """
+        row = self.layer_list.currentRow()
+        if row >= 0:
+            index = self.layer_index(row)
+            self.layer_moved.emit(index, index + step)
+
+    def on_remove_layer(self) -> None:
+        row = self.layer_list.currentRow()
+        if row >= 0:
+            self.layer_removed.emit(self.layer_index(row))
+
+    def on_layer_color(self) -> None:
+        """
+        选择当前图层的填充颜色
+        """
+        row = self.layer_list.currentRow()
+        if row < 0:
+            return
+        color = QColorDialog.getColor(parent=self, options=QColorDialog.ShowAlphaChannel)
+        if color.isValid():
+            self.layer_color_changed.emit(self.layer_index(row), color)
+
     def disable_buttons(self) -> None:
         """
         禁用所有按钮
@@ -149,8 +309,39 @@ class TGISMenu(QWidget):
         """
         self.import_shapefile_button.setEnabled(True)
         self.import_nodes_button.setEnabled(True)
+        self.nodes_import_enabled = True  # 已有地图数据，加载结束后保持启用
         # 启用其他按钮（如有）
 
+    def on_load_started(self) -> None:
+        """
+        Shapefile 开始后台加载时显示进度条，加载期间禁用导入按钮
+        """
+        self.nodes_import_enabled = self.import_nodes_button.isEnabled()  # 记录加载前的状态
+        self.disable_buttons()
+        self.load_progress_bar.setRange(0, 0)  # 总数未知前显示忙碌状态
+        self.load_progress_bar.setVisible(True)
+        self.cancel_load_button.setVisible(True)
+
+    def update_load_progress(self, done: int, total: int) -> None:
+        """
+        更新 Shapefile 加载进度
+        参数:
+            done (int): 已处理的要素数量
+            total (int): 要素总数
+        """
+        self.load_progress_bar.setRange(0, max(total, 1))
+        self.load_progress_bar.setValue(done)
+
+    def on_load_finished(self) -> None:
+        """
+        Shapefile 加载结束（成功、失败或取消）时隐藏进度条并恢复导入按钮
+        失败或取消时 Import Nodes 按钮恢复为加载前的状态，成功时已由 enable_buttons 启用
+        """
+        self.load_progress_bar.setVisible(False)
+        self.cancel_load_button.setVisible(False)
+        self.import_shapefile_button.setEnabled(True)
+        self.import_nodes_button.setEnabled(self.nodes_import_enabled)
+
     def on_node_size_changed(self, value: int) -> None:
         """
         当滑动条的值变化时，更新标签并发射信号
@@ -166,7 +357,10 @@ class TGISMenu(QWidget):
         """
         field = self.field_input.text()
         value = self.value_input.text()
-        if field and value:
+        expression = self.expression_input.text().strip()
+        if expression:
+            self.attribute_query_clicked.emit("", expression)  # 字段为空时按完整表达式查询
+        elif field and value:
             self.attribute_query_clicked.emit(field, value)
         else:
-            QMessageBox.warning(self, "Input Error", "Please enter both field and value.")
+            QMessageBox.warning(self, "Input Error", "Please enter both field and value, or a query expression.")